@@ -0,0 +1,381 @@
+"""JSON HTTP API for deal scoring, alongside the Streamlit UI.
+
+    python api.py --port 8080
+    curl 'http://127.0.0.1:8080/v1/score?property_type=Commercial&comm_purchase_price=2500000&comm_state=TX'
+    curl -X POST http://127.0.0.1:8080/v1/batch -d '{"deals": [{"purchase_price": 410000, "state": "MI"}]}'
+
+Requests use the query-param names of the app's shareable links, so the query
+string of a shared link can be sent to ``/v1/score`` as is, including a share
+token (``d=...``, see :mod:`calculator.sharing`). Missing params
+take the app defaults and params the formulas don't use (``property_url``,
+``debug``, ...) are ignored. Results carry the deal metrics; ``include=targets``
+adds the solver targets (:mod:`calculator.solver`) and ``include=projection``
+the hold-period returns of the pro forma (:mod:`calculator.proforma`), or
+``include=targets,projection`` both. ``target_return``, ``target_dscr`` and
+``hold_years`` override their defaults.
+
+    GET  /health                 liveness check
+    GET  /v1/score?...           one deal from query params (``property_type`` picks the formulas)
+    POST /v1/score               one deal from a JSON object of the same names
+    GET  /v1/residential?...     shorthand for property_type=Residential (also /v1/commercial)
+    POST /v1/batch               {"deals": [{...}, ...]} scored in one vectorized pass per property type;
+                                 a deal that can't be scored gets an ``error`` instead of failing the batch
+
+The server is a single asyncio loop with HTTP/1.1 keep-alive; single deals are
+served from an LRU cache keyed on the normalized params, and batches go
+through the NumPy engine a whole column at a time on a worker thread, so a
+large batch doesn't hold up the other connections.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl, urlsplit
+
+import numpy as np
+
+from calculator import rates, sharing
+from calculator.cache import ResultCache, normalize_params
+from calculator.params import COMMERCIAL_DEFAULTS, PROPERTY_TYPES, RESIDENTIAL_DEFAULTS, commercial_deal, residential_deal
+from calculator.proforma import DEFAULT_HOLD_YEARS, SUMMARY, commercial_proforma, residential_proforma
+from calculator.screening import RATE_INPUTS
+from calculator.solver import DEFAULT_TARGET_DSCR, DEFAULT_TARGET_RETURN, commercial_targets, residential_targets
+
+# Params each property type's formulas read (listing URLs are display-only)
+MODEL_PARAMS = {
+    "Residential": {name: default for name, default in RESIDENTIAL_DEFAULTS.items() if name != "property_url"},
+    "Commercial": {name: default for name, default in COMMERCIAL_DEFAULTS.items() if name != "comm_property_url"},
+}
+BUILDERS = {"Residential": residential_deal, "Commercial": commercial_deal}
+TARGETS = {"Residential": residential_targets, "Commercial": commercial_targets}
+PROFORMAS = {"Residential": residential_proforma, "Commercial": commercial_proforma}
+# Optional result sections; each costs more than the metrics themselves
+SECTIONS = ("targets", "projection")
+
+MAX_BODY_BYTES = 32 * 2**20
+MAX_BATCH = 1_000_000
+
+RESULT_CACHE = ResultCache(maxsize=int(os.environ.get("API_CACHE_SIZE", 4096)),
+                           ttl=float(os.environ.get("API_CACHE_TTL", 3600)))
+# Batches run here, one at a time, while the event loop keeps answering single deals
+BATCH_EXECUTOR = ThreadPoolExecutor(max_workers=int(os.environ.get("API_BATCH_WORKERS", 1)),
+                                    thread_name_prefix="api-batch")
+
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+               411: "Length Required", 413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def property_type_of(params, default="Residential"):
+    value = str(params.get("property_type") or default).strip().capitalize()
+    if value not in PROPERTY_TYPES:
+        raise ApiError(400, f"property_type must be one of {PROPERTY_TYPES}, got {params.get('property_type')!r}")
+    return value
+
+
+def _json_value(value):
+    value = value.item() if isinstance(value, np.generic) else value
+    return None if isinstance(value, float) and not np.isfinite(value) else value
+
+
+def target_options(params, property_type):
+    """Solver targets from the optional ``target_return`` / ``target_dscr`` params"""
+    options = {"target_return": params.get("target_return") or DEFAULT_TARGET_RETURN}
+    if property_type == "Commercial":
+        options["target_dscr"] = params.get("target_dscr") or DEFAULT_TARGET_DSCR
+    try:
+        return {name: float(value) for name, value in options.items()}
+    except (TypeError, ValueError) as exc:
+        raise ApiError(400, f"Bad target: {exc}") from None
+
+
+def sections_of(params):
+    """Optional result sections asked for with ``include=targets,projection``"""
+    names = {name.strip() for name in str(params.get("include") or "").split(",") if name.strip()}
+    unknown = names.difference(SECTIONS)
+    if unknown:
+        raise ApiError(400, f"include takes {', '.join(SECTIONS)}, got {', '.join(sorted(unknown))}")
+    return tuple(name for name in SECTIONS if name in names)
+
+
+def hold_years_of(params):
+    """Pro forma hold period from the optional ``hold_years`` param"""
+    value = params.get("hold_years") or DEFAULT_HOLD_YEARS
+    try:
+        years = float(value)
+    except (TypeError, ValueError):
+        years = 0
+    if not (1 <= years <= 50 and years == int(years)):
+        raise ApiError(400, f"hold_years must be a whole number from 1 to 50, got {value!r}")
+    return int(years)
+
+
+def _evaluate(property_type, inputs, targets, hold_years, sections):
+    """``{section: outputs}`` for one deal or one column batch: the metrics plus the requested sections"""
+    try:
+        deal = BUILDERS[property_type](inputs)
+        outputs = {"metrics": deal.metrics()}
+        if "targets" in sections:
+            outputs["targets"] = {**targets, **TARGETS[property_type](deal, **targets)}
+        if "projection" in sections:
+            projection = PROFORMAS[property_type](deal, hold_years)
+            outputs["projection"] = {"hold_years": hold_years, **{name: projection[name] for name in SUMMARY}}
+        return outputs
+    except (ValueError, TypeError) as exc:
+        raise ApiError(400, f"Bad input: {exc}") from None
+    except KeyError as exc:
+        raise ApiError(400, exc.args[0] if exc.args else str(exc)) from None
+
+
+def score(params, property_type=None):
+    """Metrics (and any ``include``-d sections) for one deal given as a query-param mapping"""
+    if params.get(sharing.TOKEN_PARAM):
+        try:
+            params = {**params, **sharing.decode(params[sharing.TOKEN_PARAM])}
+        except sharing.TokenError as exc:
+            raise ApiError(400, str(exc)) from None
+    property_type = property_type or property_type_of(params)
+    inputs = {name: params[name] for name in MODEL_PARAMS[property_type] if params.get(name) not in (None, "")}
+    sections = sections_of(params)
+    targets = target_options(params, property_type)
+    hold_years = hold_years_of(params)
+    key = (property_type, normalize_params(inputs), sections, normalize_params(targets), hold_years)
+
+    def compute():
+        outputs = _evaluate(property_type, inputs, targets, hold_years, sections)
+        return {"property_type": property_type, "inputs": {**MODEL_PARAMS[property_type], **inputs},
+                **{section: {name: _json_value(value) for name, value in values.items()}
+                   for section, values in outputs.items()}}
+
+    return RESULT_CACHE.get_or_compute(key, compute)
+
+
+def _batch_columns(deals, rows, property_type, errors):
+    """Input columns for ``rows`` of ``deals``; a row with a bad value or a state with no rate goes in ``errors``"""
+    columns = {}
+    for name, default in MODEL_PARAMS[property_type].items():
+        values = [deals[i].get(name) for i in rows]
+        if all(value in (None, "") for value in values):
+            continue
+        if isinstance(default, str):
+            columns[name] = np.array([default if value in (None, "") else str(value) for value in values])
+            continue
+        column = np.full(len(rows), np.nan)
+        for j, value in enumerate(values):
+            if value not in (None, ""):
+                try:
+                    column[j] = float(value)
+                except (TypeError, ValueError):
+                    errors.setdefault(rows[j], f"Bad input: {name} must be a number, got {value!r}")
+        columns[name] = column
+
+    state_name, zip_name, kinds, defaults = RATE_INPUTS[property_type]
+    states = np.broadcast_to(columns.get(state_name, defaults[state_name]), len(rows))
+    for kind in kinds:
+        missing = np.isnan(rates.lookup(kind, states, columns.get(zip_name), strict=False))
+        for j in np.flatnonzero(missing).tolist():
+            errors.setdefault(rows[j], f"No rate for state {str(states[j])!r}")
+    return columns
+
+
+def score_batch(deals, default_type="Residential", options=None):
+    """Metrics (and any ``include``-d sections) for a list of deals; each property type is scored in one vectorized call
+
+    A deal that can't be scored (not an object, an unknown property_type, a
+    non-numeric input or a state with no rate) gets ``{"error": ...}`` in its
+    place and the rest of the batch is scored as usual.
+    """
+    if not isinstance(deals, list):
+        raise ApiError(400, 'Batch body must be {"deals": [{...}, ...]}')
+    if len(deals) > MAX_BATCH:
+        raise ApiError(413, f"At most {MAX_BATCH:,} deals per batch")
+
+    options = options or {}
+    sections = sections_of(options)
+    hold_years = hold_years_of(options)
+    errors = {}
+    kinds = []
+    for i, deal in enumerate(deals):
+        try:
+            if not isinstance(deal, dict):
+                raise ApiError(400, "Deal must be a JSON object of query-param names")
+            kinds.append(property_type_of(deal, default_type))
+        except ApiError as exc:
+            errors[i] = str(exc)
+            kinds.append(None)
+
+    results = [None] * len(deals)
+    for property_type in PROPERTY_TYPES:
+        rows = [i for i, kind in enumerate(kinds) if kind == property_type]
+        if not rows:
+            continue
+        columns = _batch_columns(deals, rows, property_type, errors)
+        keep = [j for j, i in enumerate(rows) if i not in errors]
+        if len(keep) < len(rows):
+            rows = [rows[j] for j in keep]
+            columns = {name: column[keep] for name, column in columns.items()}
+        if not rows:
+            continue
+        outputs = _evaluate(property_type, columns, target_options(options, property_type), hold_years, sections)
+
+        def rows_of(outputs):
+            names = list(outputs)
+            values = [np.broadcast_to(outputs[name], len(rows)).tolist() for name in names]
+            return [{name: value if value == value and value not in (np.inf, -np.inf) else None
+                     for name, value in zip(names, row_values)} for row_values in zip(*values)]
+
+        names = list(outputs)
+        for i, *row in zip(rows, *(rows_of(outputs[name]) for name in names)):
+            results[i] = {"property_type": property_type, **dict(zip(names, row))}
+    for i, message in errors.items():
+        results[i] = {"property_type": kinds[i], "error": message}
+    return {"count": len(results), "errors": len(errors), "results": results}
+
+
+def handle(method, target, body):
+    """(status, payload) for one request"""
+    parts = urlsplit(target)
+    path = parts.path.rstrip("/") or "/"
+    query = dict(parse_qsl(parts.query, keep_blank_values=True))
+
+    if path == "/health":
+        return 200, {"status": "ok", "cache": RESULT_CACHE.stats()}
+    if path in ("/v1/score", "/v1/residential", "/v1/commercial"):
+        forced = {"/v1/residential": "Residential", "/v1/commercial": "Commercial"}.get(path)
+        if method == "GET":
+            params = query
+        elif method == "POST":
+            params = _json_body(body)
+            if not isinstance(params, dict):
+                raise ApiError(400, "Body must be a JSON object of query-param names")
+        else:
+            raise ApiError(405, f"{method} not allowed on {path}")
+        return 200, score(params, forced)
+    if path == "/v1/batch":
+        if method != "POST":
+            raise ApiError(405, f"{method} not allowed on {path}")
+        payload = _json_body(body)
+        deals = payload.get("deals") if isinstance(payload, dict) else payload
+        return 200, score_batch(deals, property_type_of(query), query)
+    raise ApiError(404, f"No route for {path}")
+
+
+def _json_body(body):
+    try:
+        return json.loads(body or b"null")
+    except ValueError as exc:
+        raise ApiError(400, f"Invalid JSON: {exc}") from None
+
+
+def body_length(method, headers):
+    """Body size from Content-Length; ApiError 400 when it is malformed, 411 when missing, 413 when over the cap"""
+    value = headers.get("content-length")
+    if value is None:
+        # Chunked request bodies aren't supported, so they need a length too
+        if method in ("POST", "PUT") or "transfer-encoding" in headers:
+            raise ApiError(411, "Content-Length required")
+        return 0
+    if "transfer-encoding" in headers or not (value.isascii() and value.isdigit()):
+        raise ApiError(400, f"Bad Content-Length {value!r}")
+    length = int(value)
+    if length > MAX_BODY_BYTES:
+        raise ApiError(413, f"Body over {MAX_BODY_BYTES} bytes")
+    return length
+
+
+def respond(method, target, body, keep_alive):
+    """Encoded HTTP response for one request"""
+    try:
+        status, payload = handle(method, target, body)
+    except ApiError as exc:
+        status, payload = exc.status, {"error": str(exc)}
+    except Exception as exc:
+        status, payload = 500, {"error": repr(exc)}
+    return _response(status, payload, keep_alive)
+
+
+def _response(status, payload, keep_alive):
+    body = json.dumps(payload, separators=(",", ":")).encode()
+    head = (f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode() + body
+
+
+async def serve_connection(reader, writer):
+    """Answer requests on one connection until the client closes it or asks to"""
+    try:
+        while True:
+            try:
+                head = await reader.readuntil(b"\r\n\r\n")
+            except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                break
+            lines = head.decode("latin-1").split("\r\n")
+            try:
+                method, target, version = lines[0].split(" ", 2)
+            except ValueError:
+                writer.write(_response(400, {"error": "Malformed request line"}, False))
+                break
+            headers = {}
+            for line in lines[1:]:
+                name, _, value = line.partition(":")
+                if name:
+                    headers[name.strip().lower()] = value.strip()
+            keep_alive = (headers.get("connection", "").lower() != "close"
+                          if version == "HTTP/1.1" else headers.get("connection", "").lower() == "keep-alive")
+
+            try:
+                length = body_length(method, headers)
+            except ApiError as exc:
+                writer.write(_response(exc.status, {"error": str(exc)}, False))
+                break
+            body = await reader.readexactly(length) if length else b""
+
+            if urlsplit(target).path.rstrip("/") == "/v1/batch":
+                response = await asyncio.get_running_loop().run_in_executor(
+                    BATCH_EXECUTOR, respond, method, target, body, keep_alive)
+            else:
+                response = respond(method, target, body, keep_alive)
+            writer.write(response)
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host="127.0.0.1", port=8080, ready=None):
+    server = await asyncio.start_server(serve_connection, host, port, backlog=1024)
+    if ready is not None:
+        ready(server)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="JSON HTTP API for residential and commercial deal scoring")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("API_PORT", 8080)))
+    args = parser.parse_args(argv)
+
+    def ready(server):
+        print(f"Deal API listening on http://{args.host}:{args.port}", file=sys.stderr, flush=True)
+
+    try:
+        asyncio.run(serve(args.host, args.port, ready))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
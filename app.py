@@ -1,7 +1,38 @@
 # CI/CD test - deployed via GitHub Actions
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
 import streamlit as st
-import pandas as pd
-import plotly.express as px
+import numpy as np
+# pandas and plotly are imported inside the functions that build tables and charts,
+# so the title and sidebar paint before they load on a cold start (see calculator/startup.py)
+
+from calculator.amortization import annual_summary, schedule
+from calculator.backtest import COMMERCIAL_SPREAD, backtest, deal_summary, rate_history, regimes
+from calculator import export, profiling, sharing
+from calculator.addresses import parse_url
+from calculator.cache import ResultCache, canonical, copy_value, memoize
+from calculator.proforma import (
+    DEFAULT_ASSUMPTIONS as PROFORMA_ASSUMPTIONS,
+    DEFAULT_HOLD_YEARS,
+    HOLD_YEARS_RANGE,
+    commercial_proforma,
+    residential_proforma,
+)
+from calculator.simulation import DEFAULT_YEARS, simulate_commercial, simulate_residential, summarize
+from calculator.sensitivity import commercial_grid, grid_axis, residential_grid
+from calculator.solver import (
+    DEFAULT_OCCUPANCY,
+    DEFAULT_TARGET_DSCR,
+    DEFAULT_TARGET_RETURN,
+    commercial_targets,
+    residential_targets,
+)
+from calculator.deals import OCCUPANCY_RATES, CommercialDeal, ResidentialDeal
+from calculator.params import COMMERCIAL_DEFAULTS, RESIDENTIAL_DEFAULTS
+from calculator.rates import COMMERCIAL_INSURANCE_RATES, COMMERCIAL_TAX_RATES, STATES, TAX_RATES
 
 st.set_page_config(
     page_title="Property Investment Calculator - Analyze Real Estate Deals",
@@ -12,111 +43,958 @@ st.set_page_config(
 
 st.title("Property Investment Calculator")
 
-# URL parser function
-def parse_property_url(url):
-    """Extract address from LoopNet or Zillow URLs"""
-    if not url:
+# Opt-in rerun profiling: APP_PROFILING=1 for every session, ?debug=1 for one
+PROFILER = profiling.RerunProfiler().activate() if profiling.enabled(os.environ, st.query_params) else None
+
+@st.cache_resource
+def result_cache():
+    """Process-wide cache of calculation results and built tables; every session gets its own copy"""
+    return ResultCache(maxsize=int(os.environ.get("RESULT_CACHE_SIZE", 512)),
+                       ttl=float(os.environ.get("RESULT_CACHE_TTL", 3600)), copy=copy_value)
+
+RESULT_CACHE = result_cache()
+
+# Shareable deal state: kept in session state and mirrored into the URL as one share token
+DEAL_STATE = "_deal_state"
+SHORT_LINK = "_short_link"
+LINK_ERROR = "_link_error"
+# Query params that live next to the token (see calculator/profiling.py)
+KEEP_PARAMS = ("debug",)
+
+@st.cache_resource
+def snapshot_store():
+    """Process-wide short-link table (SQLite)"""
+    return sharing.SnapshotStore()
+
+def deal_params():
+    """This session's deal inputs by query-param name (text values), read from the link once"""
+    params = st.session_state.get(DEAL_STATE)
+    if params is None:
+        query = st.query_params.to_dict()
+        try:
+            store = snapshot_store() if query.get(sharing.SHORT_PARAM) else None
+            params = sharing.from_query(query, store)
+            if store is not None:
+                st.session_state[SHORT_LINK] = (query[sharing.SHORT_PARAM], sharing.encode(params))
+        except (sharing.TokenError, OSError, sqlite3.Error) as exc:
+            params = sharing.default_state()
+            st.session_state[LINK_ERROR] = str(exc)
+        st.session_state[DEAL_STATE] = params
+    return params
+
+def update_param(param, key):
+    """Shared on_change callback: copy a sidebar widget into the deal state"""
+    value = st.session_state[key]
+    deal_params()[param] = value if isinstance(value, str) else str(value)
+
+def sync_query_params():
+    """Mirror the deal state into the URL: one batched write per rerun, and none when nothing changed"""
+    token = sharing.encode(deal_params())
+    short_link = st.session_state.get(SHORT_LINK)
+    if short_link and short_link[1] == token:
+        link = {sharing.SHORT_PARAM: short_link[0]}
+    else:
+        link = {sharing.TOKEN_PARAM: token}
+    wanted = {**{name: st.query_params[name] for name in KEEP_PARAMS if name in st.query_params}, **link}
+    if st.query_params.to_dict() != wanted:
+        st.query_params.from_dict(wanted)
+
+def chart_layout(title, x_title, y_title, **layout):
+    """Layout for the page's charts
+
+    Charts are built with plotly.graph_objects from arrays: plotly.express spends 30-60 ms per
+    figure on DataFrame handling, which was most of a rerun's chart time.
+    """
+    import plotly.graph_objects as go
+    return go.Layout(title=title, xaxis_title=x_title, yaxis_title=y_title, **layout)
+
+def number_columns(formats):
+    """``column_config`` showing each named column with a printf-style format (``"$%,.2f"``)
+
+    Formats are applied in the browser. A ``DataFrame.style`` table is rendered to strings on
+    the server on every rerun (~10 ms a table), so tables without per-cell colors use this.
+    """
+    return {name: st.column_config.NumberColumn(format=fmt) for name, fmt in formats.items()}
+
+@memoize(RESULT_CACHE, "amortization")
+def amortization_tables(loan_amount, annual_rate, loan_years):
+    """Full schedule, annual summary table and balance chart for one loan"""
+    import pandas as pd
+    import plotly.graph_objects as go
+    with profiling.section("calculations"):
+        full_schedule = schedule(loan_amount, annual_rate, loan_years)
+        annual = annual_summary(full_schedule)
+    with profiling.section("dataframes"):
+        annual_df = pd.DataFrame(annual)
+    with profiling.section("charts"):
+        # Balance Over Time chart, one point per year-end starting from the original loan
+        fig = go.Figure(
+            go.Scatter(x=np.concatenate([[0], annual["Year"]]),
+                       y=np.concatenate([[float(loan_amount)], annual["Balance"]]), mode="lines"),
+            layout=chart_layout("Loan Balance Over Time", "Year", "Balance")
+        )
+    return full_schedule, annual_df, fig
+
+@memoize(RESULT_CACHE, "amortization_page")
+def amortization_page(loan_amount, annual_rate, loan_years, year):
+    """One loan year of the schedule as a table"""
+    import pandas as pd
+    full_schedule = amortization_tables(loan_amount, annual_rate, loan_years)[0]
+    page = slice((year - 1) * 12, year * 12)
+    with profiling.section("dataframes"):
+        return pd.DataFrame({name: values[page] for name, values in full_schedule.items()})
+
+@st.fragment
+def render_amortization(loan_amount, annual_rate, loan_years, key):
+    """Full-term amortization schedule shown one loan year at a time, with an annual balance chart
+
+    Runs as a fragment that depends only on loan amount, rate and term: picking a loan year
+    reruns just this panel.
+    """
+    _, annual_df, fig = amortization_tables(loan_amount, annual_rate, loan_years)
+    
+    year = st.selectbox("Loan Year", annual_df["Year"].tolist(), key=f"{key}_amortization_year",
+                        help="The full schedule is computed up front; only the selected year's payments are rendered")
+    schedule_df = amortization_page(loan_amount, annual_rate, loan_years, year)
+    with profiling.section("tables"):
+        st.dataframe(
+            schedule_df,
+            column_config=number_columns({
+                "Principal": "$%,.2f",
+                "Interest": "$%,.2f",
+                "Balance": "$%,.2f"
+            }),
+            hide_index=True
+        )
+    
+    with st.expander("Annual Summary"), profiling.section("tables"):
+        st.dataframe(
+            annual_df,
+            column_config=number_columns({
+                "Principal": "$%,.0f",
+                "Interest": "$%,.0f",
+                "Balance": "$%,.0f"
+            }),
+            hide_index=True
+        )
+    
+    with profiling.section("charts"):
+        st.plotly_chart(fig, use_container_width=True)
+
+@memoize(RESULT_CACHE, "residential")
+def residential_results(purchase_price, down_payment, interest_rate, loan_years, monthly_rent, state):
+    """Deal plus the expense and occupancy-scenario tables for one set of residential inputs"""
+    import pandas as pd
+    with profiling.section("calculations"):
+        deal = ResidentialDeal(purchase_price, down_payment, interest_rate, loan_years, monthly_rent, state)
+    
+    with profiling.section("dataframes"):
+        expenses_df = pd.DataFrame({
+            "Expense": list(deal.expenses()),
+            "Amount": list(deal.expenses().values())
+        })
+        returns_df = pd.DataFrame({
+            "Scenario": ["75% Occupancy", "90% Occupancy", "100% Occupancy"],
+            "Monthly Cash Flow": [deal.cash_flow(rate) for rate in OCCUPANCY_RATES],
+            "Annual ROI": [deal.annual_return(rate) for rate in OCCUPANCY_RATES]
+        })
+    return deal, expenses_df, returns_df
+
+@memoize(RESULT_CACHE, "commercial")
+def commercial_results(comm_purchase_price, comm_down_payment, comm_annual_gross_rents, comm_annual_noi_listing,
+                       comm_vacancy_rate, comm_other_expenses, comm_interest_rate, comm_loan_years, comm_state):
+    """Deal plus the operating expense and investment analysis tables for one set of commercial inputs"""
+    import pandas as pd
+    with profiling.section("calculations"):
+        comm_deal = CommercialDeal(comm_purchase_price, comm_down_payment, comm_annual_gross_rents,
+                                   comm_vacancy_rate, comm_other_expenses, comm_interest_rate,
+                                   comm_loan_years, comm_state, annual_noi_listing=comm_annual_noi_listing)
+    
+    with profiling.section("dataframes"):
+        expenses_df = pd.DataFrame({
+            "Expense": ["Purchase Loan P&I", "Property Insurance Insurance", "Property Taxes", "PM Fee", "All Other Operating Expenses"],
+            "Monthly Amount": [comm_deal.monthly_payment, comm_deal.annual_insurance/12, comm_deal.annual_property_tax/12,
+                               comm_deal.annual_pm_fee/12, comm_other_expenses/12],
+            "Annual Amount": [comm_deal.annual_debt_service, comm_deal.annual_insurance, comm_deal.annual_property_tax,
+                              comm_deal.annual_pm_fee, comm_other_expenses]
+        })
+    
+        # Create Cash Down string with color
+        total_cash_down = comm_deal.total_cash_down
+        if total_cash_down <= 500000:
+            cash_down_display = f"${total_cash_down:,.0f}"
+        elif total_cash_down <= 750000:
+            cash_down_display = f"${total_cash_down:,.0f}"
+        else:
+            cash_down_display = f"${total_cash_down:,.0f}"
+        
+        analysis_df = pd.DataFrame({
+            "Metric": ["Annual Gross Rents", "Adjusted Gross Income", "Annual NOI (Estimated)", "Annual Debt Service", "Annual Cash Flow", "Cash-on-Cash Return", "Cash Down"],
+            "Amount": [
+                f"${comm_annual_gross_rents:,.0f}",
+                f"${comm_deal.adjusted_gross_income:,.0f}",
+                f"${comm_deal.noi_estimated:,.0f}",
+                f"${comm_deal.annual_debt_service:,.0f}",
+                f"${comm_deal.annual_cash_flow:,.0f}",
+                f"{comm_deal.cash_on_cash_return:.1f}%",
+                cash_down_display
+            ]
+        })
+    return comm_deal, expenses_df, analysis_df
+
+@st.cache_resource
+def listing_importer():
+    """Process-wide background listing importer, or None when LISTING_API_URL isn't set"""
+    from calculator.listings import default_importer
+    return default_importer()
+
+# Sidebar widget behind each query param
+INPUT_WIDGETS = {
+    "purchase_price": "purchase_price_input",
+    "down_payment": "down_payment_input",
+    "interest_rate": "interest_rate_input",
+    "loan_years": "loan_years_input",
+    "monthly_rent": "monthly_rent_input",
+    "state": "state_input",
+    "property_url": "property_url_input",
+    "comm_purchase_price": "comm_purchase_price_input",
+    "comm_down_payment": "comm_down_payment_input",
+    "comm_annual_gross_rents": "comm_gross_rents_input",
+    "comm_annual_noi_listing": "comm_noi_input",
+    "comm_vacancy_rate": "comm_vacancy_input",
+    "comm_other_expenses": "comm_expenses_input",
+    "comm_interest_rate": "comm_interest_input",
+    "comm_loan_years": "comm_loan_years_input",
+    "comm_state": "comm_state_input",
+    "comm_property_url": "comm_property_url_input",
+}
+# The ones the listing importer can fill in
+LISTING_WIDGETS = {param: INPUT_WIDGETS[param] for param in (
+    "purchase_price", "monthly_rent", "state",
+    "comm_purchase_price", "comm_annual_gross_rents", "comm_annual_noi_listing", "comm_state")}
+LISTING_FUTURES = "_listing_futures"
+
+def listing_import(property_url, property_type):
+    """Fetch listing data for the pasted URL in the background and offer to fill in the sidebar"""
+    importer = listing_importer()
+    futures = st.session_state.setdefault(LISTING_FUTURES, {})
+    if importer is None or not property_url.strip():
+        futures.clear()
+        return
+    # Only the current URL's fetch is kept (its result backs the fill-in button); earlier ones are dropped
+    if property_url not in futures:
+        futures.clear()
+        futures[property_url] = importer.submit(property_url)
+    if futures[property_url].done():
+        listing_result(futures[property_url], property_type)
+    else:
+        listing_pending(property_url)
+
+@st.fragment(run_every=0.5)
+def listing_pending(property_url):
+    """Polls the background fetch without rerunning the page, then reruns it once the data is in"""
+    future = st.session_state[LISTING_FUTURES].get(property_url)
+    if future is None or future.done():
+        st.rerun()
+    st.caption("Fetching listing data...")
+
+def listing_result(future, property_type):
+    """Fetched listing values and a button that copies them into the sidebar inputs"""
+    from calculator.listings import to_params
+    try:
+        listing = future.result()
+    except Exception as exc:
+        st.caption(f"Listing data unavailable: {exc}")
+        return
+    params = {param: value for param, value in to_params(listing, property_type).items() if param in LISTING_WIDGETS}
+    if not params:
+        st.caption("No price, rent or state found for this listing")
+        return
+    st.caption("Listing data: " + ", ".join(
+        f"{param.removeprefix('comm_').replace('_', ' ')} {value if isinstance(value, str) else f'${value:,.0f}'}"
+        for param, value in params.items()))
+    if st.button("Fill in from listing", key=f"{property_type}_listing_fill"):
+        link_params = deal_params()
+        for param, value in params.items():
+            link_params[param] = value if isinstance(value, str) else str(int(round(value)))
+            st.session_state.pop(LISTING_WIDGETS[param], None)
+        st.rerun()
+
+@st.fragment
+def property_url_panel(param, key, placeholder, help_text):
+    """Listing URL input, parsed address and listing button
+
+    Runs as a fragment: editing the URL reruns only this panel, nothing else on the page depends on it.
+    """
+    def update_url():
+        deal_params()[param] = st.session_state[key]
+    
+    st.header("Property URL")
+    property_url = st.text_input("Property Listing URL", 
+                                 value=deal_params()[param],
+                                 placeholder=placeholder,
+                                 help=help_text,
+                                 key=key,
+                                 on_change=update_url)
+    
+    # Display parsed address as clickable link if available
+    listing = parse_url(property_url)
+    if listing and listing["address"]:
+        st.markdown(f"**Address:** <a href='{property_url}' target='_blank'>{listing['address']}</a>",
+                    unsafe_allow_html=True)
+    
+    listing_import(property_url, deal_params()["property_type"])
+    sync_query_params()
+    
+    if property_url.strip():
+        try:
+            st.link_button("View Property Listing", property_url)
+        except AttributeError:
+            # Fallback for older Streamlit versions
+            st.markdown(f'''
+            <a href="{property_url}" target="_blank" style="
+                display: inline-block;
+                padding: 0.25rem 0.75rem;
+                background-color: #ff4b4b;
+                color: white;
+                text-decoration: none;
+                border-radius: 0.25rem;
+                border: 1px solid transparent;
+                text-align: center;
+                font-weight: 400;
+                font-size: 14px;
+                cursor: pointer;
+            ">View Property Listing</a>
+            ''', unsafe_allow_html=True)
+
+def target_text(value, fmt, unbounded="Any", unreachable="Not reachable"):
+    """Solver output for display: inf and nan read as words"""
+    if value != value:
+        return unreachable
+    if value == float("inf"):
+        return unbounded
+    return fmt.format(value)
+
+@st.fragment
+def deal_targets_panel(key, deal):
+    """Max offer price, break-even occupancy, minimum down payment and maximum rate for the current deal
+
+    Runs as a fragment: changing a target reruns only this panel.
+    """
+    commercial = key == "comm"
+    input_cols = st.columns(2)
+    with input_cols[0]:
+        target_return = st.number_input("Target Cash-on-Cash %" if commercial else "Target Annual ROI %",
+                                        value=DEFAULT_TARGET_RETURN, min_value=0.0, max_value=50.0, step=0.5,
+                                        key=f"{key}_target_return")
+    if commercial:
+        with input_cols[1]:
+            target_dscr = st.number_input("Target DSCR", value=DEFAULT_TARGET_DSCR, min_value=1.0, max_value=3.0,
+                                          step=0.05, key=f"{key}_target_dscr")
+        with profiling.section("calculations"):
+            targets = commercial_targets(deal, target_return, target_dscr)
+    else:
+        with profiling.section("calculations"):
+            targets = residential_targets(deal, target_return)
+
+    cols = st.columns(5 if commercial else 4)
+    cols[0].metric(f"Max Price @ {target_return:g}% {'CoC' if commercial else 'ROI'}",
+                   target_text(targets["max_price_target_return"], "${:,.0f}"))
+    if commercial:
+        cols[1].metric(f"Max Price @ {target_dscr:g} DSCR", target_text(targets["max_price_target_dscr"], "${:,.0f}"),
+                       help=f"Current DSCR: {target_text(targets['dscr'], '{:.2f}', unbounded='no debt')}")
+    cols[-3].metric("Break-even Occupancy", target_text(targets["break_even_occupancy"], "{:.1f}%"),
+                    help="Occupancy at which cash flow is zero; above 100% means it never breaks even")
+    cols[-2].metric("Min Down for Cash Flow", target_text(targets["min_down_payment"], "{:.1f}%"),
+                    help="Smallest down payment with non-negative cash flow"
+                         + ("" if commercial else f" at {DEFAULT_OCCUPANCY:.0%} occupancy"))
+    cols[-1].metric("Max Interest Rate", target_text(targets["max_interest_rate"], "{:.2f}%", unbounded="> 100%"),
+                    help="Highest rate with non-negative cash flow at the current down payment"
+                         + ("" if commercial else f" and {DEFAULT_OCCUPANCY:.0%} occupancy"))
+
+@st.fragment
+def proforma_panel(key, deal):
+    """Hold-period projection: IRR, NPV, equity multiple, sale proceeds and the yearly series
+
+    Runs as a fragment: changing the hold period or a growth assumption reruns only this panel.
+    """
+    import pandas as pd
+    import plotly.graph_objects as go
+    commercial = key == "comm"
+    hold_years = st.slider("Hold Period (years)", *HOLD_YEARS_RANGE, value=DEFAULT_HOLD_YEARS, key=f"{key}_hold_years")
+    defaults = PROFORMA_ASSUMPTIONS
+    assumptions = {}
+    with st.expander("Projection Assumptions"):
+        cols = st.columns(5)
+        assumptions["rent_growth"] = cols[0].number_input("Rent Growth % / yr", -10.0, 15.0, defaults["rent_growth"] * 100, 0.5, key=f"{key}_pf_rent_growth") / 100
+        assumptions["expense_growth"] = cols[1].number_input("Expense Growth % / yr", -5.0, 15.0, defaults["expense_growth"] * 100, 0.5, key=f"{key}_pf_expense_growth") / 100
+        assumptions["appreciation"] = cols[2].number_input("Appreciation % / yr", -10.0, 15.0, defaults["appreciation"] * 100, 0.5, key=f"{key}_pf_appreciation") / 100
+        assumptions["selling_costs"] = cols[3].number_input("Selling Costs %", 0.0, 15.0, defaults["selling_costs"] * 100, 0.5, key=f"{key}_pf_selling_costs") / 100
+        assumptions["discount_rate"] = cols[4].number_input("Discount Rate %", 0.0, 30.0, defaults["discount_rate"] * 100, 0.5, key=f"{key}_pf_discount_rate") / 100
+        if commercial:
+            st.caption("Vacancy follows the Vacancy Rate % input; equity in is the total cash down")
+        else:
+            st.caption(f"Rent collected at {defaults['occupancy']:.0%} occupancy; equity in is the down payment")
+    with profiling.section("calculations"):
+        projection = (commercial_proforma if commercial else residential_proforma)(deal, hold_years, assumptions)
+
+    cols = st.columns(4)
+    cols[0].metric("IRR", target_text(projection["irr"], "{:.1f}%", unreachable="n/a"),
+                   help="Annualized return on the equity in, including yearly cash flow and the sale")
+    cols[1].metric(f"NPV @ {assumptions['discount_rate']:.1%}", f"${projection['npv']:,.0f}")
+    cols[2].metric("Equity Multiple", target_text(projection["equity_multiple"], "{:.2f}x", unbounded="n/a"),
+                   help="Total cash returned divided by total cash put in")
+    cols[3].metric(f"Net Sale Proceeds (Year {hold_years})", f"${projection['sale_proceeds']:,.0f}",
+                   help="Sale price less selling costs and the remaining loan balance")
+
+    with profiling.section("dataframes"):
+        projection_df = pd.DataFrame({
+            "Year": projection["year"],
+            "NOI": projection["noi"],
+            "Debt Service": projection["debt_service"],
+            "Cash Flow": projection["cash_flow"],
+            "Loan Balance": projection["loan_balance"],
+            "Property Value": projection["property_value"],
+            "Equity": projection["equity"]
+        })
+    with profiling.section("charts"):
+        fig = go.Figure(
+            [go.Bar(x=projection["year"], y=projection["cash_flow"], name="Cash Flow"),
+             go.Scatter(x=projection["year"], y=projection["equity"], name="Equity", mode="lines")],
+            layout=chart_layout("Annual Cash Flow and Equity", "Year", "Cash Flow")
+        )
+        st.plotly_chart(fig, use_container_width=True)
+    with st.expander("Annual Projection"), profiling.section("tables"):
+        st.dataframe(
+            projection_df,
+            column_config=number_columns({name: "$%,.0f" for name in projection_df.columns if name != "Year"}),
+            hide_index=True
+        )
+
+@st.fragment
+def rate_backtest_panel(key, property_type, params):
+    """This deal re-run at every historical month's mortgage rate, with cash flow by rate regime
+
+    Runs as a fragment: changing the origination window reruns only this panel.
+    """
+    import plotly.graph_objects as go
+    try:
+        history = rate_history()
+    except FileNotFoundError as exc:
+        st.info(f"Rate history backtest unavailable. {exc}")
+        return
+    first, last = int(str(history.first)[:4]), int(str(history.last)[:4])
+    start, end = st.slider("Origination Years", first, last, (first, last), key=f"{key}_backtest_years")
+    with profiling.section("calculations"):
+        result = backtest(property_type, [params], f"{start}-01", f"{end}-12", history)
+        summary = {name: values[0] for name, values in deal_summary(result).items()}
+        regime_df = regimes(result)
+
+    cols = st.columns(4)
+    cols[0].metric("Cash-Flow Positive", f"{summary['positive_share']:.0%}",
+                   help="Share of origination months with non-negative annual cash flow")
+    cols[1].metric("Median Annual Cash Flow", f"${summary['median_cash_flow']:,.0f}")
+    cols[2].metric("Worst Annual Cash Flow", f"${summary['worst_cash_flow']:,.0f}",
+                   help=f"Financed in {summary['worst_month']} at {summary['worst_rate']:.2f}%")
+    cols[3].metric("Best Annual Cash Flow", f"${summary['best_cash_flow']:,.0f}")
+
+    with profiling.section("charts"):
+        fig = go.Figure(
+            go.Scatter(x=result["months"].astype("datetime64[ns]"), y=result["annual_cash_flow"][0], mode="lines",
+                       customdata=np.column_stack([result["rates"], result["cash_on_cash"][0]]),
+                       hovertemplate="Month=%{x|%Y-%m}<br>Annual Cash Flow=%{y:$,.0f}<br>Rate=%{customdata[0]:.2f}%"
+                                     "<br>Cash-on-Cash=%{customdata[1]:.1f}%<extra></extra>"),
+            layout=chart_layout("Annual Cash Flow by Origination Month", "Month", "Annual Cash Flow")
+        )
+        st.plotly_chart(fig, use_container_width=True)
+    with st.expander("Cash Flow by Rate Regime"), profiling.section("tables"):
+        st.dataframe(
+            regime_df.assign(positive_share=regime_df["positive_share"] * 100),
+            column_config=number_columns({
+                "min_rate": "%.2f%%",
+                "max_rate": "%.2f%%",
+                "positive_share": "%.0f%%",
+                **{name: "$%,.0f" for name in regime_df.columns if name.startswith("cash_flow")},
+                **{name: "%.1f%%" for name in regime_df.columns if name.startswith("cash_on_cash")}
+            }),
+            hide_index=True
+        )
+    spread = "" if property_type == "Residential" else f" plus a {COMMERCIAL_SPREAD:.2f}-point commercial spread"
+    st.caption(f"Freddie Mac PMMS 30-year fixed, monthly averages{spread}; every other input is unchanged"
+               + ("" if property_type == "Commercial" else f", at {DEFAULT_OCCUPANCY:.0%} occupancy"))
+
+# Sensitivity grid resolution: prices x interest rates x vacancy/occupancy levels
+GRID_POINTS = (50, 40, 20)
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def cached_residential_grid(price_range, rate_range, occupancy_range, down_payment, monthly_rent, loan_years, state):
+    """Residential sensitivity grid; only the non-grid inputs and axis ranges are in the cache key"""
+    prices = grid_axis(*price_range, GRID_POINTS[0])
+    rates = grid_axis(*rate_range, GRID_POINTS[1])
+    occupancies = grid_axis(*occupancy_range, GRID_POINTS[2])
+    with profiling.section("sensitivity"):
+        cash_flow, roi = residential_grid(prices, rates, occupancies / 100, down_payment, monthly_rent, loan_years, state)
+    return prices, rates, occupancies, {"Monthly Cash Flow": np.array(cash_flow), "Annual ROI": np.array(roi)}
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def cached_commercial_grid(price_range, rate_range, vacancy_range, down_payment, annual_gross_rents,
+                           other_expenses, loan_years, state):
+    """Commercial sensitivity grid; only the non-grid inputs and axis ranges are in the cache key"""
+    prices = grid_axis(*price_range, GRID_POINTS[0])
+    rates = grid_axis(*rate_range, GRID_POINTS[1])
+    vacancies = grid_axis(*vacancy_range, GRID_POINTS[2])
+    with profiling.section("sensitivity"):
+        cash_flow, coc = commercial_grid(prices, rates, vacancies, down_payment, annual_gross_rents,
+                                         other_expenses, loan_years, state)
+    return prices, rates, vacancies, {"Annual Cash Flow": np.array(cash_flow), "Cash-on-Cash Return": np.array(coc)}
+
+def sensitivity_ranges(key, price, rate, third_label, third_bounds, third_default):
+    """Axis range inputs, re-seeded around the current deal whenever its price or rate falls outside them"""
+    state = st.session_state
+    low_key, high_key, rates_key, third_key = (f"{key}_sens_price_low", f"{key}_sens_price_high",
+                                               f"{key}_sens_rates", f"{key}_sens_third")
+    # Keeps the current-deal marker on the heatmap after sidebar changes; ranges that still contain it are kept
+    if not state.get(low_key, np.inf) <= price <= state.get(high_key, -np.inf):
+        state[low_key], state[high_key] = int(price * 0.8), int(price * 1.2)
+    rate_low, rate_high = state.get(rates_key, (np.inf, -np.inf))
+    if not rate_low <= rate <= rate_high:
+        state[rates_key] = (max(0.0, round(rate - 2, 1)), min(20.0, round(rate + 2, 1)))
+    if third_key not in state:
+        state[third_key] = third_default
+    
+    range_col1, range_col2 = st.columns(2)
+    with range_col1:
+        price_low = st.number_input("Price From", step=10000, key=f"{key}_sens_price_low")
+        price_high = st.number_input("Price To", step=10000, key=f"{key}_sens_price_high")
+    with range_col2:
+        rate_range = st.slider("Interest Rate % Range", 0.0, 20.0, step=0.1, key=f"{key}_sens_rates")
+        third_range = st.slider(third_label, *third_bounds, step=1, key=f"{key}_sens_third")
+    return (price_low, max(price_high, price_low + 1)), rate_range, third_range
+
+@st.fragment
+def residential_sensitivity_panel(purchase_price, interest_rate, down_payment, monthly_rent, loan_years, state):
+    """Residential sensitivity panel; its range and slice controls rerun only this fragment"""
+    price_range, rate_range, occupancy_range = sensitivity_ranges(
+        "res", purchase_price, interest_rate, "Occupancy % Range", (50, 100), (50, 100))
+    prices, rates, occupancies, grids = cached_residential_grid(
+        price_range, rate_range, occupancy_range, down_payment, monthly_rent, loan_years, state)
+    render_sensitivity("res", prices, rates, occupancies, grids, "Occupancy %",
+                       purchase_price, interest_rate, 75)
+
+@st.fragment
+def commercial_sensitivity_panel(purchase_price, interest_rate, vacancy_rate, down_payment, annual_gross_rents,
+                                 other_expenses, loan_years, state):
+    """Commercial sensitivity panel; its range and slice controls rerun only this fragment"""
+    price_range, rate_range, vacancy_range = sensitivity_ranges(
+        "comm", purchase_price, interest_rate, "Vacancy Rate % Range", (0, 50), (0, 19))
+    prices, rates, vacancies, grids = cached_commercial_grid(
+        price_range, rate_range, vacancy_range, down_payment, annual_gross_rents,
+        other_expenses, loan_years, state)
+    render_sensitivity("comm", prices, rates, vacancies, grids, "Vacancy Rate %",
+                       purchase_price, interest_rate, vacancy_rate)
+
+def render_sensitivity(key, prices, rates, third, grids, third_label, current_price, current_rate, current_third):
+    """Heatmap of one metric over price x rate at a chosen vacancy/occupancy, with the current deal marked"""
+    import plotly.graph_objects as go
+    metric = st.radio("Metric", list(grids), horizontal=True, key=f"{key}_sens_metric")
+    labels = [f"{value:.1f}%" for value in third]
+    slice_key = f"{key}_sens_slice"
+    if st.session_state.get(slice_key) not in labels:
+        st.session_state[slice_key] = labels[int(np.abs(third - current_third).argmin())]
+    chosen = st.select_slider(third_label, options=labels, key=slice_key)
+    
+    with profiling.section("charts"):
+        fig = go.Figure(
+            [go.Heatmap(z=grids[metric][:, :, labels.index(chosen)], x=rates, y=prices, colorscale="RdYlGn",
+                        zmid=0, colorbar={"title": {"text": metric}},
+                        hovertemplate="Interest Rate %=%{x:.2f}<br>Purchase Price=%{y:$,.0f}<br>"
+                                      f"{metric}=%{{z:,.1f}}<extra></extra>"),
+             go.Scatter(x=[current_rate], y=[current_price], mode="markers", name="Current deal",
+                        marker={"symbol": "x", "size": 14, "color": "black"}, showlegend=False)],
+            layout=chart_layout(f"{metric} at {chosen} {third_label.split(' %')[0]}", "Interest Rate %",
+                                "Purchase Price")
+        )
+        st.plotly_chart(fig, use_container_width=True)
+
+# Monte Carlo risk simulation
+SIMULATION_YEARS = DEFAULT_YEARS
+
+@st.cache_resource
+def simulation_pool():
+    """Process pool shared by every session; no pool on single-core hosts"""
+    workers = os.cpu_count() or 1
+    return (ProcessPoolExecutor(max_workers=workers), workers) if workers > 1 else (None, 1)
+
+@st.cache_data(max_entries=32, show_spinner="Simulating...")
+def cached_simulation(property_type, inputs, paths, assumptions):
+    """Run a simulation and keep only its summary and year-one histogram in the cache"""
+    pool, workers = simulation_pool()
+    simulate = simulate_residential if property_type == "Residential" else simulate_commercial
+    with profiling.section("simulation"):
+        result = simulate(**inputs, paths=paths, years=SIMULATION_YEARS, assumptions=assumptions,
+                          seed=0, executor=pool, chunks=workers)
+        counts, edges = np.histogram(result["cash_flow"][:, 0], bins=60)
+        return summarize(result), counts, edges
+
+def simulation_controls(key, residential):
+    """Sidebar switch and assumptions for simulation mode; returns (paths, assumptions) or None when off"""
+    st.header("Risk Simulation")
+    if not st.toggle("Simulation Mode", key=f"{key}_sim_on",
+                     help="Replace the fixed scenarios with simulated vacancy, rent growth, expense inflation and rate-reset paths"):
         return None
+    paths = st.select_slider("Simulated Paths", [10_000, 50_000, 100_000, 250_000], value=100_000,
+                             key=f"{key}_sim_paths")
+    assumptions = {}
+    with st.expander("Simulation Assumptions"):
+        if residential:
+            assumptions["vacancy_mean"] = st.number_input("Mean Vacancy %", 0.0, 50.0, 10.0, 0.5, key=f"{key}_sim_vacancy") / 100
+        else:
+            st.caption("Mean vacancy follows the Vacancy Rate % input")
+        assumptions["vacancy_sd"] = st.number_input("Vacancy Volatility %", 0.0, 20.0, 3.0, 0.5, key=f"{key}_sim_vacancy_sd") / 100
+        assumptions["rent_growth_mean"] = st.number_input("Rent Growth % / yr", -10.0, 15.0, 3.0, 0.5, key=f"{key}_sim_rent_growth") / 100
+        assumptions["rent_growth_sd"] = st.number_input("Rent Growth Volatility %", 0.0, 10.0, 2.0, 0.5, key=f"{key}_sim_rent_sd") / 100
+        assumptions["expense_inflation_mean"] = st.number_input("Expense Inflation % / yr", -5.0, 15.0, 3.0, 0.5, key=f"{key}_sim_inflation") / 100
+        assumptions["expense_inflation_sd"] = st.number_input("Expense Inflation Volatility %", 0.0, 10.0, 1.5, 0.5, key=f"{key}_sim_inflation_sd") / 100
+        assumptions["rate_shock_sd"] = st.number_input("Rate Volatility (pts / yr)", 0.0, 5.0, 0.75, 0.25, key=f"{key}_sim_rate_sd")
+        assumptions["reset_year"] = st.number_input("Rate Reset / Refinance Year", 1, SIMULATION_YEARS - 1, 5, 1, key=f"{key}_sim_reset",
+                                                    help="Years at the quoted rate; the loan reprices for the years after")
+    return paths, assumptions
+
+def simulation_verdict(summary):
+    """Probability-based replacement for the profitable / not profitable verdict"""
+    prob = summary["prob_negative_year1"]
+    message = (f"{prob:.1%} chance of negative cash flow in year 1, "
+               f"{summary['prob_negative_any_year']:.1%} in at least one of {SIMULATION_YEARS} years "
+               f"({summary['paths']:,} simulated paths)")
+    if prob < 0.10:
+        st.success(f"✅ Low Risk: {message}")
+    elif prob < 0.35:
+        st.warning(f"⚠️ Moderate Risk: {message}")
+    else:
+        st.error(f"❌ High Risk: {message}")
+
+def render_simulation(summary, counts, edges, cash_flow_label, return_label):
+    """Per-year distribution table and year-one cash flow histogram"""
+    import pandas as pd
+    import plotly.graph_objects as go
+    sim_col1, sim_col2, sim_col3 = st.columns(3)
+    sim_col1.metric(f"Median {cash_flow_label} (Year 1)", f"${summary['cash_flow_p50'][0]:,.0f}")
+    sim_col2.metric(f"Median {return_label} (Year 1)", f"{summary['return_p50'][0]:.1f}%")
+    sim_col3.metric("Chance of Negative Cash Flow", f"{summary['prob_negative_year1']:.1%}")
+    
+    distribution_df = pd.DataFrame({
+        "Year": range(1, SIMULATION_YEARS + 1),
+        "Cash Flow P5": summary["cash_flow_p5"],
+        "Cash Flow P50": summary["cash_flow_p50"],
+        "Cash Flow P95": summary["cash_flow_p95"],
+        f"{return_label} P5": summary["return_p5"],
+        f"{return_label} P50": summary["return_p50"],
+        f"{return_label} P95": summary["return_p95"]
+    })
+    with profiling.section("tables"):
+        st.dataframe(
+            distribution_df,
+            column_config=number_columns({
+                "Cash Flow P5": "$%,.0f",
+                "Cash Flow P50": "$%,.0f",
+                "Cash Flow P95": "$%,.0f",
+                f"{return_label} P5": "%.1f%%",
+                f"{return_label} P50": "%.1f%%",
+                f"{return_label} P95": "%.1f%%"
+            }),
+            hide_index=True
+        )
     
+    with profiling.section("charts"):
+        fig = go.Figure(go.Bar(x=(edges[:-1] + edges[1:]) / 2, y=counts),
+                        layout=chart_layout(f"Year 1 {cash_flow_label} Distribution", "Cash Flow", "Paths"))
+        fig.add_vline(x=0, line_dash="dash", line_color="red")
+        st.plotly_chart(fig, use_container_width=True)
+
+# Saved-deal library
+MODEL_DEFAULTS = {"Residential": RESIDENTIAL_DEFAULTS, "Commercial": COMMERCIAL_DEFAULTS}
+RANK_LABELS = {
+    "cash_on_cash": "Cash-on-Cash / ROI %",
+    "irr": "IRR %",
+    "annual_cash_flow": "Annual Cash Flow",
+    "dscr": "DSCR",
+    "purchase_price": "Purchase Price",
+}
+EXPORT_FORMATS = {
+    "portfolio": "Portfolio workbook (one row per deal)",
+    "xlsx": "Excel report per deal (zip)",
+    "pdf": "PDF report per deal (zip)",
+}
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+# Query params the sidebar reads with float(); the other numeric ones are read with int()
+FLOAT_PARAMS = ("interest_rate", "comm_interest_rate")
+
+@st.cache_resource
+def deal_library():
+    """Process-wide saved-deal library (SQLite), brought up to date with the current assumptions on start"""
+    from calculator.library import DealLibrary
+    library = DealLibrary()
+    library.refresh()
+    return library
+
+def open_deal(deal):
+    """Load a saved deal into the sidebar (and the link), then rerun the whole page"""
+    link_params = deal_params()
+    link_params["property_type"] = deal["property_type"]
+    st.session_state.pop("property_type_radio", None)
+    for param, default in MODEL_DEFAULTS[deal["property_type"]].items():
+        value = deal["inputs"].get(param, default)
+        if isinstance(value, str):
+            link_params[param] = value
+        else:
+            link_params[param] = canonical(value) if param in FLOAT_PARAMS else str(int(round(value)))
+        st.session_state.pop(INPUT_WIDGETS.get(param), None)
+    st.rerun()
+
+def export_saved_deals(deal_ids, fmt):
+    """Download callable: saved deals as one portfolio workbook or a zip of per-deal reports"""
+    library = deal_library()
+    pool, _ = simulation_pool()
+    return export.bundle([library.get(deal_id) for deal_id in deal_ids], fmt, executor=pool)
+
+@st.fragment
+def deal_library_panel(property_type):
+    """Save the current deal and rank the saved ones
+
+    Runs as a fragment: filtering and sorting the library reruns only this panel.
+    """
+    try:
+        library = deal_library()
+    except (OSError, sqlite3.Error) as exc:
+        st.caption(f"Deal library unavailable: {exc}")
+        return
+    
+    save_cols = st.columns([3, 1])
+    name = save_cols[0].text_input("Deal Name", key="library_name", placeholder="Optional, e.g. 12 Main St duplex")
+    save_cols[1].write("")
+    if save_cols[1].button("Save Deal", key="library_save"):
+        params = {param: deal_params()[param] for param in MODEL_DEFAULTS[property_type]}
+        with profiling.section("calculations"):
+            library.save([params], property_type, names=[name.strip() or None])
+        st.success("Saved to the deal library")
+    
+    with st.expander("Compare Saved Deals"):
+        filter_cols = st.columns(5)
+        kind = filter_cols[0].selectbox("Type", ["All", "Residential", "Commercial"], key="library_type")
+        states = filter_cols[1].multiselect("States", STATES, key="library_states")
+        min_price = filter_cols[2].number_input("Min Price", value=0, step=50000, key="library_min_price")
+        max_price = filter_cols[3].number_input("Max Price", value=0, step=50000, key="library_max_price",
+                                                help="0 for no limit")
+        by = filter_cols[4].selectbox("Rank By", list(RANK_LABELS), format_func=RANK_LABELS.get, key="library_by")
+        ranked = library.compare(None if kind == "All" else kind, states, min_price or None, max_price or None,
+                                 by=by, limit=200)
+        st.caption(f"Top {len(ranked)} of {library.count():,} saved deals")
+        if ranked.empty:
+            return
+        with profiling.section("tables"):
+            st.dataframe(
+                ranked.drop(columns="saved_at"),
+                column_config=number_columns({
+                    "purchase_price": "$%,.0f",
+                    "annual_cash_flow": "$%,.0f",
+                    "cash_on_cash": "%.1f%%",
+                    "dscr": "%.2f",
+                    "irr": "%.1f%%"
+                }),
+                hide_index=True
+            )
+        labels = {row.id: f"#{row.id} {row.name or ''} {row.property_type} {row.state} ${row.purchase_price:,.0f}"
+                  for row in ranked.itertuples()}
+        open_cols = st.columns([3, 1])
+        deal_id = open_cols[0].selectbox("Saved Deal", list(labels), format_func=labels.get, key="library_deal")
+        open_cols[1].write("")
+        if open_cols[1].button("Open Deal", key="library_open"):
+            open_deal(library.get(deal_id))
+        
+        export_cols = st.columns([3, 1])
+        fmt = export_cols[0].selectbox("Export These Deals", list(EXPORT_FORMATS), format_func=EXPORT_FORMATS.get,
+                                       key="library_export_format")
+        export_cols[1].write("")
+        export_cols[1].download_button(
+            "Export", partial(export_saved_deals, tuple(ranked["id"]), fmt),
+            file_name="portfolio.xlsx" if fmt == "portfolio" else f"deal-reports-{fmt}.zip",
+            mime=XLSX_MIME if fmt == "portfolio" else "application/zip", on_click="ignore", key="library_export")
+
+# Portfolio roll-up groupings and series
+PORTFOLIO_GROUPS = {"property_type": "Property Type", "state": "State", "vintage": "Vintage"}
+PORTFOLIO_SERIES = {"cash_flow": "Cash Flow", "debt_service": "Debt Service", "loan_balance": "Loan Balance",
+                    "equity": "Equity"}
+
+@st.cache_resource(max_entries=1, show_spinner="Building portfolio...")
+def saved_portfolio(stamp):
+    """Monthly series for every saved deal, rebuilt only when the library changes (``stamp``)"""
+    from calculator.portfolio import Portfolio
+    return Portfolio(deal_library().deals())
+
+@st.fragment
+def portfolio_panel():
+    """Month-by-month cash flow, debt service, loan balance and equity across the saved deals
+
+    Runs as a fragment: changing the grouping or series reruns only this panel.
+    """
+    import pandas as pd
+    import plotly.graph_objects as go
     try:
-        if "loopnet.com/Listing/" in url or "zillow.com/homedetails/" in url:
-            parts = url.split("/")
-            if len(parts) > 4:
-                address_part = parts[4]
-                # Replace hyphens with spaces
-                address = address_part.replace("-", " ")
-                # Add comma before state (last 2 characters)
-                if len(address) > 2:
-                    address = address[:-2] + ", " + address[-2:]
-                return address
-    except:
-        pass
-    
-    return None
-
-# Initialize property type in query params
-if "property_type" not in st.query_params:
-    st.query_params["property_type"] = "Residential"
-
-# Property type selection callback
-def update_property_type():
-    st.query_params["property_type"] = st.session_state.property_type_radio
+        library = deal_library()
+        with profiling.section("calculations"):
+            portfolio = saved_portfolio(library.stamp())
+    except (OSError, sqlite3.Error) as exc:
+        st.caption(f"Deal library unavailable: {exc}")
+        return
+    if not len(portfolio):
+        st.caption("Save deals to the library to roll them up into a portfolio")
+        return
+
+    cols = st.columns(2)
+    by = cols[0].selectbox("Group By", list(PORTFOLIO_GROUPS), format_func=PORTFOLIO_GROUPS.get,
+                           key="portfolio_by")
+    series = cols[1].selectbox("Series", list(PORTFOLIO_SERIES), format_func=PORTFOLIO_SERIES.get,
+                               key="portfolio_series")
+    with profiling.section("calculations"):
+        keys, sums = portfolio.rollup((by,), list(PORTFOLIO_SERIES))
+        years, annual = portfolio.annual(portfolio.totals(list(PORTFOLIO_SERIES)))
+    st.caption(f"{len(portfolio):,} saved deals from {portfolio.calendar[0]}, each starting in the month it "
+               "was saved, with the Hold-Period Projection's default growth assumptions")
+
+    with profiling.section("dataframes"):
+        annual_df = pd.DataFrame({"Year": years, **{label: annual[name] for name, label in PORTFOLIO_SERIES.items()}})
+    with profiling.section("charts"):
+        months = portfolio.calendar.astype("datetime64[ns]")
+        fig = go.Figure(
+            [go.Scatter(x=months, y=values, mode="lines", name=str(key[0])) for key, values in zip(keys, sums[series])],
+            layout=chart_layout(f"Monthly {PORTFOLIO_SERIES[series]} by {PORTFOLIO_GROUPS[by]}", "Month",
+                                PORTFOLIO_SERIES[series], legend_title=PORTFOLIO_GROUPS[by])
+        )
+        st.plotly_chart(fig, use_container_width=True)
+    with st.expander("Annual Portfolio Totals"), profiling.section("tables"):
+        st.dataframe(
+            annual_df,
+            column_config=number_columns({label: "$%,.0f" for label in PORTFOLIO_SERIES.values()}),
+            hide_index=True
+        )
+        st.caption("Cash flow and debt service are yearly totals; loan balance and equity are at year end")
+
+@st.fragment
+def share_panel(property_type):
+    """Link to this exact analysis, with an optional short link, and report downloads
+
+    Runs as a fragment: creating a short link reruns only this panel.
+    """
+    if st.button("Create Short Link", key="share_short_link"):
+        token = sharing.encode(deal_params())
+        try:
+            st.session_state[SHORT_LINK] = (snapshot_store().put(token), token)
+        except (OSError, sqlite3.Error) as exc:
+            st.caption(f"Short links unavailable: {exc}")
+    sync_query_params()
+    base = (st.context.url or "").split("?")[0]
+    query = "&".join(f"{name}={value}" for name, value in st.query_params.to_dict().items() if name not in KEEP_PARAMS)
+    st.code(f"{base}?{query}", language=None)
+    st.caption("Anyone with the link sees these inputs; the link updates as you edit them")
+    
+    # Reports are built when clicked, on a background thread
+    deal = {"property_type": property_type,
+            "inputs": {param: deal_params()[param] for param in MODEL_DEFAULTS[property_type]}}
+    download_cols = st.columns(2)
+    download_cols[0].download_button("Download Excel Report", partial(export.render, deal, "xlsx"),
+                                     file_name=f"{property_type.lower()}-deal.xlsx", mime=XLSX_MIME,
+                                     on_click="ignore", key="share_xlsx")
+    download_cols[1].download_button("Download PDF Report", partial(export.render, deal, "pdf"),
+                                     file_name=f"{property_type.lower()}-deal.pdf", mime="application/pdf",
+                                     on_click="ignore", key="share_pdf")
+
+# Rerun profiling panel
+PROFILE_HISTORY = "_profile_history"
+PROFILE_HISTORY_SIZE = 20
+
+def render_profile(profiler, label):
+    """Debug expander with this rerun's section timings, memory and cache stats; also logs them as JSON"""
+    import json
+    import pandas as pd
+    profiler.label = label
+    report = profiler.finish(st.session_state, exclude=(PROFILE_HISTORY,), result_cache=RESULT_CACHE.stats())
+    profiler.log()
+    history = st.session_state.setdefault(PROFILE_HISTORY, [])
+    history.append(report)
+    del history[:-PROFILE_HISTORY_SIZE]
+    
+    with st.expander("🛠️ Debug: Rerun Profile"):
+        rss_mb = report["rss_end_bytes"] / 2**20 if report["rss_end_bytes"] else None
+        rss_delta = (report["rss_end_bytes"] - report["rss_start_bytes"]) / 2**20 if rss_mb else None
+        debug_col1, debug_col2, debug_col3 = st.columns(3)
+        debug_col1.metric("Rerun Time", f"{report['total_s'] * 1000:,.1f} ms")
+        debug_col2.metric("Process RSS", f"{rss_mb:,.1f} MB" if rss_mb else "n/a (no psutil)",
+                          delta=f"{rss_delta:+,.1f} MB this rerun" if rss_mb else None, delta_color="inverse")
+        debug_col3.metric("Session State", f"{report['session_state_bytes'] / 1024:,.1f} KB")
+        
+        sections = sorted(report["sections_s"].items(), key=lambda item: -item[1])
+        sections.append(("(unattributed)", report["unattributed_s"]))
+        st.dataframe(pd.DataFrame({
+            "Section": [name for name, _ in sections],
+            "Time (ms)": [seconds * 1000 for _, seconds in sections],
+            "Calls": [report["section_calls"].get(name) for name, _ in sections]
+        }), hide_index=True)
+        st.caption("Cache hits skip the calculations / dataframes / sensitivity / simulation sections entirely. "
+                   "Reruns of a single panel (URL, sensitivity, amortization) are not profiled.")
+        
+        st.subheader("Shared Result Cache")
+        st.json(report["result_cache"])
+        
+        st.subheader("Recent Reruns")
+        st.dataframe(pd.DataFrame({
+            "Property Type": [entry["label"] for entry in history],
+            "Time (ms)": [entry["total_s"] * 1000 for entry in history],
+            "RSS (MB)": [(entry["rss_end_bytes"] or 0) / 2**20 for entry in history],
+            "Session State (KB)": [entry["session_state_bytes"] / 1024 for entry in history]
+        }), hide_index=True)
+        
+        st.subheader("Largest Session State Keys")
+        st.dataframe(pd.DataFrame({
+            "Key": list(report["session_state_keys"])[:10],
+            "Bytes": list(report["session_state_keys"].values())[:10]
+        }), hide_index=True)
+        
+        st.download_button("Download Profile JSON", json.dumps(history, default=str, indent=1),
+                           file_name="rerun_profile.json", mime="application/json")
+
+# This session's deal inputs, read from the link on the first run
+link_params = deal_params()
+if LINK_ERROR in st.session_state:
+    st.warning(f"Couldn't open this link ({st.session_state.pop(LINK_ERROR)}); showing the default deal instead")
 
 property_type = st.radio("Property Type", ["Residential", "Commercial"], 
                         key="property_type_radio",
-                        index=0 if st.query_params["property_type"] == "Residential" else 1,
+                        index=0 if link_params["property_type"] == "Residential" else 1,
                         horizontal=True,
-                        on_change=update_property_type)
+                        on_change=update_param, args=("property_type", "property_type_radio"))
 
 # Property type explanation
 st.write("**Residential**: 4 units or less  |  **Commercial**: 5 units or more")
 
-# Display parsed address as clickable link if available
-if property_type == "Residential" and "property_url" in st.query_params and st.query_params["property_url"]:
-    address = parse_property_url(st.query_params["property_url"])
-    if address:
-        st.markdown(f"**Address:** <a href='{st.query_params['property_url']}' target='_blank'>{address}</a>", unsafe_allow_html=True)
-elif property_type == "Commercial" and "comm_property_url" in st.query_params and st.query_params["comm_property_url"]:
-    address = parse_property_url(st.query_params["comm_property_url"])
-    if address:
-        st.markdown(f"**Address:** <a href='{st.query_params['comm_property_url']}' target='_blank'>{address}</a>", unsafe_allow_html=True)
-
 if property_type == "Residential":
-    # Initialize query params with defaults if not present
-    if "purchase_price" not in st.query_params:
-        st.query_params["purchase_price"] = "650000"
-    if "down_payment" not in st.query_params:
-        st.query_params["down_payment"] = "20"
-    if "interest_rate" not in st.query_params:
-        st.query_params["interest_rate"] = "6.5"
-    if "loan_years" not in st.query_params:
-        st.query_params["loan_years"] = "15"
-    if "monthly_rent" not in st.query_params:
-        st.query_params["monthly_rent"] = "5000"
-    if "state" not in st.query_params:
-        st.query_params["state"] = "CA"
-    if "property_url" not in st.query_params:
-        st.query_params["property_url"] = ""
-
-    # Residential input callbacks
-    def update_purchase_price():
-        st.query_params["purchase_price"] = str(st.session_state.purchase_price_input)
-    
-    def update_down_payment():
-        st.query_params["down_payment"] = str(st.session_state.down_payment_input)
-    
-    def update_interest_rate():
-        st.query_params["interest_rate"] = str(st.session_state.interest_rate_input)
-    
-    def update_loan_years():
-        st.query_params["loan_years"] = str(st.session_state.loan_years_input)
-    
-    def update_monthly_rent():
-        st.query_params["monthly_rent"] = str(st.session_state.monthly_rent_input)
-    
-    def update_state():
-        st.query_params["state"] = st.session_state.state_input
-    
-    def update_property_url():
-        st.query_params["property_url"] = st.session_state.property_url_input
 
     # Sidebar inputs
     with st.sidebar:
         st.header("Property Details")
         purchase_price = st.number_input("Purchase Price", 
-                                       value=int(st.query_params["purchase_price"]), 
+                                       value=int(link_params["purchase_price"]), 
                                        step=None, format="%d",
                                        key="purchase_price_input",
-                                       on_change=update_purchase_price)
+                                       on_change=update_param, args=("purchase_price", "purchase_price_input"))
         
         # Display formatted purchase price
         st.write(f"**Purchase Price:** ${purchase_price:,.0f}")
         # Down Payment
         down_payment_value = st.number_input("Down Payment %", 
-                                           value=int(st.query_params["down_payment"]), 
+                                           value=int(link_params["down_payment"]), 
                                            min_value=0, max_value=100, step=1,
                                            key="down_payment_input",
-                                           on_change=update_down_payment)
+                                           on_change=update_param, args=("down_payment", "down_payment_input"))
         
         down_payment_pct = down_payment_value / 100
         
@@ -126,250 +1004,115 @@ if property_type == "Residential":
         
         # Interest Rate
         interest_rate_value = st.number_input("Interest Rate %", 
-                                            value=float(st.query_params["interest_rate"]), 
+                                            value=float(link_params["interest_rate"]), 
                                             min_value=0.0, max_value=10.0, step=0.1,
                                             key="interest_rate_input",
-                                            on_change=update_interest_rate)
-        
-        interest_rate = interest_rate_value / 100
+                                            on_change=update_param, args=("interest_rate", "interest_rate_input"))
+
         loan_years = st.selectbox("Loan Term (Years)", [15, 30], 
-                                index=0 if st.query_params["loan_years"] == "15" else 1,
+                                index=0 if link_params["loan_years"] == "15" else 1,
                                 key="loan_years_input",
-                                on_change=update_loan_years)
+                                on_change=update_param, args=("loan_years", "loan_years_input"))
             
         monthly_rent = st.number_input("Expected Monthly Rent", 
-                                     value=int(st.query_params["monthly_rent"]), 
+                                     value=int(link_params["monthly_rent"]), 
                                      step=100,
                                      key="monthly_rent_input",
-                                     on_change=update_monthly_rent)
+                                     on_change=update_param, args=("monthly_rent", "monthly_rent_input"))
         
         st.header("Location")
-        states = ["AZ", "CA", "IN", "NV", "TX", "MI"]
-        state = st.selectbox("State", states, 
-                           index=states.index(st.query_params["state"]),
+        state = st.selectbox("State", STATES, 
+                           index=STATES.index(link_params["state"]),
                            key="state_input",
-                           on_change=update_state)
-        
-        TAX_RATES = {
-            "AZ": 0.0062,
-            "CA": 0.0125,
-            "IN": 0.0137,
-            "NV": 0.0065,
-            "TX": 0.0170,
-            "MI": 0.0321
-        }
+                           on_change=update_param, args=("state", "state_input"))
         
         # Display the tax rate for the selected state (converted to a percentage)
         selected_tax_rate = TAX_RATES[state]
         st.metric("Tax Rate", f"{selected_tax_rate * 100:.2f}%")
         
-        st.header("Property URL")
-        property_url = st.text_input("Property Listing URL", 
-                                   value=st.query_params["property_url"],
-                                   placeholder="https://www.zillow.com/...",
-                                   help="Link to property listing (Zillow, Realtor.com, etc.)",
-                                   key="property_url_input",
-                                   on_change=update_property_url)
-        
-        if property_url.strip():
-            try:
-                st.link_button("View Property Listing", property_url)
-            except AttributeError:
-                # Fallback for older Streamlit versions
-                st.markdown(f'''
-                <a href="{property_url}" target="_blank" style="
-                    display: inline-block;
-                    padding: 0.25rem 0.75rem;
-                    background-color: #ff4b4b;
-                    color: white;
-                    text-decoration: none;
-                    border-radius: 0.25rem;
-                    border: 1px solid transparent;
-                    text-align: center;
-                    font-weight: 400;
-                    font-size: 14px;
-                    cursor: pointer;
-                ">View Property Listing</a>
-                ''', unsafe_allow_html=True)
-
-    # Calculations
-    loan_amount = purchase_price * (1 - down_payment_pct)
-    monthly_rate = interest_rate / 12
-    num_payments = loan_years * 12
-    
-    # Monthly Principal & Interest Payment
-    monthly_pi = loan_amount * (monthly_rate * (1 + monthly_rate) ** num_payments) / ((1 + monthly_rate) ** num_payments - 1)
-    
-    # Other monthly costs
-    monthly_insurance = (purchase_price * 0.01) / 12
-    monthly_tax = (purchase_price * TAX_RATES[state]) / 12
-    pm_fee = monthly_rent * 0.10
-    maintenance = 250
-    
-    total_monthly = monthly_pi + monthly_insurance + monthly_tax + pm_fee + maintenance
+        property_url_panel("property_url", "property_url_input", "https://www.zillow.com/...",
+                           "Link to property listing (Zillow, Realtor.com, etc.)")
+        
+        res_simulation = simulation_controls("res", residential=True)
+
+    profiling.lap("inputs")
     
-    # Cash flow analysis
-    occupancy_rates = [0.75, 0.90, 1.0]
-    cash_flows = []
-    annual_returns = []
+    # Calculations, served from the shared cache when these inputs were seen before
+    deal, expenses_df, returns_df = residential_results(
+        purchase_price=purchase_price, down_payment=down_payment_value, interest_rate=interest_rate_value,
+        loan_years=loan_years, monthly_rent=monthly_rent, state=state)
     
-    for rate in occupancy_rates:
-        monthly_income = monthly_rent * rate
-        cash_flow = monthly_income - total_monthly
-        annual_return = (cash_flow * 12) / (purchase_price * down_payment_pct) * 100
-        cash_flows.append(cash_flow)
-        annual_returns.append(annual_return)
+    # Cash flow analysis
+    cash_flows = returns_df["Monthly Cash Flow"].tolist()
 
     # Display results
     col1, col2 = st.columns(2)
     
     with col1:
         st.header("Monthly Expenses")
-        expenses_df = pd.DataFrame({
-            "Expense": ["Principal & Interest", "Insurance", "Property Tax", "Property Management", "Maintenance"],
-            "Amount": [monthly_pi, monthly_insurance, monthly_tax, pm_fee, maintenance]
-        })
-        st.dataframe(expenses_df.style.format({"Amount": "${:,.2f}"}), hide_index=True)
+        with profiling.section("tables"):
+            st.dataframe(expenses_df, column_config=number_columns({"Amount": "$%,.2f"}), hide_index=True)
     
     with col2:
         st.header("Investment Returns")
-        returns_df = pd.DataFrame({
-            "Scenario": ["75% Occupancy", "90% Occupancy", "100% Occupancy"],
-            "Monthly Cash Flow": cash_flows,
-            "Annual ROI": annual_returns
-        })
-        
         def color_negative_red(val):
             color = 'red' if val < 0 else 'green'
             return f'color: {color}'
         
-        st.dataframe(
-            returns_df.style
-            .format({
-                "Monthly Cash Flow": "${:,.2f}", 
-                "Annual ROI": "{:.1f}%"
-            })
-            .map(color_negative_red, subset=["Monthly Cash Flow", "Annual ROI"]),
-            hide_index=True
-        )
+        with profiling.section("tables"):
+            st.dataframe(
+                returns_df.style
+                .format({
+                    "Monthly Cash Flow": "${:,.2f}", 
+                    "Annual ROI": "{:.1f}%"
+                })
+                .map(color_negative_red, subset=["Monthly Cash Flow", "Annual ROI"]),
+                hide_index=True
+            )
     
     # Investment status
     st.header("Investment Status")
-    if cash_flows[0] > 0:  # Profitable at 75% occupancy
+    if res_simulation:
+        paths, assumptions = res_simulation
+        summary, counts, edges = cached_simulation(
+            "Residential",
+            {"purchase_price": purchase_price, "down_payment": down_payment_value,
+             "interest_rate": interest_rate_value, "loan_years": loan_years,
+             "monthly_rent": monthly_rent, "state": state},
+            paths, assumptions)
+        simulation_verdict(summary)
+        st.header("Risk Simulation")
+        render_simulation(summary, counts, edges, "Monthly Cash Flow", "Annual ROI")
+    elif cash_flows[0] > 0:  # Profitable at 75% occupancy
         st.success("✅ Good Investment: Profitable even at 75% occupancy")
     else:
         st.error("❌ High Risk: Not profitable at 75% occupancy")
     
+    # Deal targets
+    st.header("Deal Targets")
+    deal_targets_panel("res", deal)
+    
+    # Hold-period projection
+    st.header("Hold-Period Projection")
+    proforma_panel("res", deal)
+    
+    # Historical rate backtest
+    st.header("Rate History Backtest")
+    rate_backtest_panel("res", "Residential", {param: deal_params()[param] for param in MODEL_DEFAULTS["Residential"]})
+    
+    # Sensitivity Analysis
+    st.header("Sensitivity Analysis")
+    with st.expander("Price × Interest Rate × Occupancy"):
+        residential_sensitivity_panel(purchase_price, interest_rate_value, down_payment_value,
+                                      monthly_rent, loan_years, state)
+    
     # Amortization Schedule
     st.header("Amortization Schedule")
-    schedule = []
-    balance = loan_amount
-    
-    for payment in range(1, 13):  # First year only
-        interest_payment = balance * monthly_rate
-        principal_payment = monthly_pi - interest_payment
-        balance = balance - principal_payment
-        
-        schedule.append({
-            "Payment": payment,
-            "Principal": principal_payment,
-            "Interest": interest_payment,
-            "Balance": balance
-        })
-    
-    schedule_df = pd.DataFrame(schedule)
-    st.dataframe(
-        schedule_df.style.format({
-            "Principal": "${:,.2f}",
-            "Interest": "${:,.2f}",
-            "Balance": "${:,.2f}"
-        }),
-        hide_index=True
-    )
-    
-    # Balance Over Time chart
-    fig = px.line(
-        schedule_df, 
-        x="Payment", 
-        y="Balance",
-        title="Loan Balance Over Time"
-    )
-    st.plotly_chart(fig, use_container_width=True)
+    render_amortization(deal.loan_amount, deal.interest_rate, loan_years, "res")
 
 elif property_type == "Commercial":
     # Commercial property logic
     
-    # Initialize commercial query params with Excel defaults
-    if "comm_state" not in st.query_params:
-        st.query_params["comm_state"] = "CA"
-    if "comm_purchase_price" not in st.query_params:
-        st.query_params["comm_purchase_price"] = "1970000"
-    if "comm_down_payment" not in st.query_params:
-        st.query_params["comm_down_payment"] = "30"
-    if "comm_annual_gross_rents" not in st.query_params:
-        st.query_params["comm_annual_gross_rents"] = "152195"
-    if "comm_annual_noi_listing" not in st.query_params:
-        st.query_params["comm_annual_noi_listing"] = "106548"
-    if "comm_vacancy_rate" not in st.query_params:
-        st.query_params["comm_vacancy_rate"] = "3"
-    if "comm_other_expenses" not in st.query_params:
-        st.query_params["comm_other_expenses"] = "5000"
-    if "comm_loan_years" not in st.query_params:
-        st.query_params["comm_loan_years"] = "25"
-    if "comm_interest_rate" not in st.query_params:
-        st.query_params["comm_interest_rate"] = "6.5"
-    if "comm_property_url" not in st.query_params:
-        st.query_params["comm_property_url"] = ""
-    
-    # Commercial tax and insurance rates
-    COMMERCIAL_TAX_RATES = {
-        "AZ": 0.0062,
-        "CA": 0.0125,
-        "IN": 0.0137,
-        "NV": 0.0065,
-        "TX": 0.0170,
-        "MI": 0.0321
-    }
-    
-    COMMERCIAL_INSURANCE_RATES = {
-        "AZ": 0.005,
-        "CA": 0.0125,
-        "IN": 0.005,
-        "NV": 0.005,
-        "TX": 0.005,
-        "MI": 0.005
-    }
-    
-    # Commercial input callbacks
-    def update_comm_purchase_price():
-        st.query_params["comm_purchase_price"] = str(st.session_state.comm_purchase_price_input)
-    
-    def update_comm_down_payment():
-        st.query_params["comm_down_payment"] = str(st.session_state.comm_down_payment_input)
-    
-    def update_comm_gross_rents():
-        st.query_params["comm_annual_gross_rents"] = str(st.session_state.comm_gross_rents_input)
-    
-    def update_comm_noi_listing():
-        st.query_params["comm_annual_noi_listing"] = str(st.session_state.comm_noi_input)
-    
-    def update_comm_vacancy_rate():
-        st.query_params["comm_vacancy_rate"] = str(st.session_state.comm_vacancy_input)
-    
-    def update_comm_other_expenses():
-        st.query_params["comm_other_expenses"] = str(st.session_state.comm_expenses_input)
-    
-    def update_comm_interest_rate():
-        st.query_params["comm_interest_rate"] = str(st.session_state.comm_interest_input)
-    
-    def update_comm_loan_years():
-        st.query_params["comm_loan_years"] = str(st.session_state.comm_loan_years_input)
-    
-    def update_comm_state():
-        st.query_params["comm_state"] = st.session_state.comm_state_input
-    
-    def update_comm_property_url():
-        st.query_params["comm_property_url"] = st.session_state.comm_property_url_input
 
     # Commercial sidebar inputs
     with st.sidebar:
@@ -377,21 +1120,21 @@ elif property_type == "Commercial":
         
         # Purchase Price
         comm_purchase_price = st.number_input("Purchase Price", 
-                                             value=int(st.query_params["comm_purchase_price"]), 
+                                             value=int(link_params["comm_purchase_price"]), 
                                              step=None, format="%d", 
                                              help="Purchase Price or Amount we want to offer",
                                              key="comm_purchase_price_input",
-                                             on_change=update_comm_purchase_price)
+                                             on_change=update_param, args=("comm_purchase_price", "comm_purchase_price_input"))
         
         st.write(f"**Purchase Price:** ${comm_purchase_price:,.0f}")
         
         # Down Payment %
         comm_down_payment_pct = st.number_input("% Down Payment", 
-                                               value=int(st.query_params["comm_down_payment"]), 
+                                               value=int(link_params["comm_down_payment"]), 
                                                min_value=0, max_value=100, step=1, 
-                                               help="Standard % down is 25% for Non-owner occupied Resi loans. 30%+ may be required for hard money but the interest will be much higher.\n\nFor commercial loans of 5 units or more, the minimum down should be 30% down is a more safe bet, with 65% LTV more ideal for commercial lenders.\n\nTo evaluate whether more money down makes this a good deal or not, 1st try 100%. If the cash flow is not positive with 100% down, then it does not make sense at all at this price, with this rent, or with this overhead.",
+                                               help="Standard % down is 25% for Non-owner occupied Resi loans. 30%+ may be required for hard money but the interest will be much higher.\n\nFor commercial loans of 5 units or more, the minimum down should be 30% down is a more safe bet, with 65% LTV more ideal for commercial lenders.\n\nTo evaluate whether more money down makes this a good deal or not, check Min Down for Cash Flow under Deal Targets. If it says Not reachable, the cash flow is not positive even with 100% down, so it does not make sense at all at this price, with this rent, or with this overhead.",
                                                key="comm_down_payment_input",
-                                               on_change=update_comm_down_payment)
+                                               on_change=update_param, args=("comm_down_payment", "comm_down_payment_input"))
         
         # Calculate Amount Down with color coding 
         amount_down = comm_purchase_price * (comm_down_payment_pct / 100)
@@ -412,54 +1155,53 @@ elif property_type == "Commercial":
         
         # Annual Gross Rents
         comm_annual_gross_rents = st.number_input("Annual Gross Rents", 
-                                                 value=int(st.query_params["comm_annual_gross_rents"]), 
+                                                 value=int(link_params["comm_annual_gross_rents"]), 
                                                  step=1000, 
                                                  help="Typically provided in the listing on LoopNet, etc.",
                                                  key="comm_gross_rents_input",
-                                                 on_change=update_comm_gross_rents)
+                                                 on_change=update_param, args=("comm_annual_gross_rents", "comm_gross_rents_input"))
         
         # Annual NOI from Listing
         comm_annual_noi_listing = st.number_input("Annual NOI from Listing", 
-                                                 value=int(st.query_params["comm_annual_noi_listing"]), 
+                                                 value=int(link_params["comm_annual_noi_listing"]), 
                                                  step=1000,
                                                  key="comm_noi_input",
-                                                 on_change=update_comm_noi_listing)
+                                                 on_change=update_param, args=("comm_annual_noi_listing", "comm_noi_input"))
         
         # Vacancy Rate
         comm_vacancy_rate = st.number_input("Vacancy Rate %", 
-                                           value=int(st.query_params["comm_vacancy_rate"]), 
+                                           value=int(link_params["comm_vacancy_rate"]), 
                                            min_value=0, max_value=50, step=1,
                                            key="comm_vacancy_input",
-                                           on_change=update_comm_vacancy_rate)
+                                           on_change=update_param, args=("comm_vacancy_rate", "comm_vacancy_input"))
         
         # All Other Operating Expenses
         comm_other_expenses = st.number_input("All Other Operating Expenses", 
-                                             value=int(st.query_params["comm_other_expenses"]), 
+                                             value=int(link_params["comm_other_expenses"]), 
                                              step=500,
                                              key="comm_expenses_input",
-                                             on_change=update_comm_other_expenses)
+                                             on_change=update_param, args=("comm_other_expenses", "comm_expenses_input"))
         
         st.header("Loan Details")
         # Interest Rate
         comm_interest_rate_value = st.number_input("Interest Rate %", 
-                                                  value=float(st.query_params["comm_interest_rate"]), 
+                                                  value=float(link_params["comm_interest_rate"]), 
                                                   min_value=0.0, max_value=20.0, step=0.1,
                                                   key="comm_interest_input",
-                                                  on_change=update_comm_interest_rate)
+                                                  on_change=update_param, args=("comm_interest_rate", "comm_interest_input"))
         
         # Loan Period
         loan_years_options = list(range(1, 31))  # 1 to 30 years
         comm_loan_years = st.selectbox("Loan Period (Years)", loan_years_options, 
-                                     index=loan_years_options.index(int(st.query_params["comm_loan_years"])),
+                                     index=loan_years_options.index(int(link_params["comm_loan_years"])),
                                      key="comm_loan_years_input",
-                                     on_change=update_comm_loan_years)
+                                     on_change=update_param, args=("comm_loan_years", "comm_loan_years_input"))
         
         st.header("Location")
-        states = ["AZ", "CA", "IN", "NV", "TX", "MI"]
-        comm_state = st.selectbox("State", states, 
-                                index=states.index(st.query_params["comm_state"]),
+        comm_state = st.selectbox("State", STATES, 
+                                index=STATES.index(link_params["comm_state"]),
                                 key="comm_state_input",
-                                on_change=update_comm_state)
+                                on_change=update_param, args=("comm_state", "comm_state_input"))
         
         st.header("Lookup Rates")
         selected_tax_rate = COMMERCIAL_TAX_RATES[comm_state]
@@ -467,114 +1209,62 @@ elif property_type == "Commercial":
         st.metric("Tax Rate", f"{selected_tax_rate * 100:.2f}%")
         st.metric("Insurance Rate", f"{selected_insurance_rate * 100:.1f}%")
         
-        st.header("Property URL")
-        comm_property_url = st.text_input("Property Listing URL", 
-                                        value=st.query_params["comm_property_url"],
-                                        placeholder="https://www.loopnet.com/...",
-                                        help="Link to property listing (LoopNet, Crexi, etc.)",
-                                        key="comm_property_url_input",
-                                        on_change=update_comm_property_url)
-        
-        if comm_property_url.strip():
-            try:
-                st.link_button("View Property Listing", comm_property_url)
-            except AttributeError:
-                # Fallback for older Streamlit versions
-                st.markdown(f'''
-                <a href="{comm_property_url}" target="_blank" style="
-                    display: inline-block;
-                    padding: 0.25rem 0.75rem;
-                    background-color: #ff4b4b;
-                    color: white;
-                    text-decoration: none;
-                    border-radius: 0.25rem;
-                    border: 1px solid transparent;
-                    text-align: center;
-                    font-weight: 400;
-                    font-size: 14px;
-                    cursor: pointer;
-                ">View Property Listing</a>
-                ''', unsafe_allow_html=True)
-    
-    # Commercial calculations based on Excel formulas
-    
-    # Annual operating expenses
-    annual_insurance = comm_purchase_price * selected_insurance_rate
-    annual_property_tax = comm_purchase_price * selected_tax_rate
-    annual_pm_fee = comm_annual_gross_rents * 0.04  # 4% of gross rents
-    
-    # NOI Estimated calculation: (K4*(1-L5))-SUM(J8:J11)
-    # Excel formula: =(K4*(1-L5))-SUM(J8:J11) where J8:J11 are ONLY operating expenses (not debt service)
-    total_operating_expenses = annual_insurance + annual_property_tax + annual_pm_fee + comm_other_expenses
-    noi_estimated = (comm_annual_gross_rents * (1 - comm_vacancy_rate/100)) - total_operating_expenses
-    
-    # Commercial loan calculations (user-defined years and rate)
-    comm_loan_amount = comm_purchase_price - amount_down
-    comm_annual_interest_rate = comm_interest_rate_value / 100
-    comm_monthly_rate = comm_annual_interest_rate / 12
-    comm_num_payments = comm_loan_years * 12
-    
-    # Annual debt service
-    monthly_payment = comm_loan_amount * (comm_monthly_rate * (1 + comm_monthly_rate) ** comm_num_payments) / ((1 + comm_monthly_rate) ** comm_num_payments - 1)
-    annual_debt_service = monthly_payment * 12
-    
-    # Cash flow calculation: NOI - Annual Debt Service
-    annual_cash_flow = noi_estimated - annual_debt_service
-    
-    # Closing costs (3% of purchase price)
-    closing_costs = comm_purchase_price * 0.03
-    
-    # Total cash down
-    total_cash_down = amount_down + closing_costs
-    
-    # Cash-on-cash return calculation
-    cash_on_cash_return = (annual_cash_flow / total_cash_down) * 100 if total_cash_down > 0 else 0
+        property_url_panel("comm_property_url", "comm_property_url_input", "https://www.loopnet.com/...",
+                           "Link to property listing (LoopNet, Crexi, etc.)")
+        
+        comm_simulation = simulation_controls("comm", residential=False)
+    
+    profiling.lap("inputs")
+    
+    # Commercial calculations based on Excel formulas, served from the shared cache when seen before
+    comm_deal, expenses_df, analysis_df = commercial_results(
+        comm_purchase_price=comm_purchase_price, comm_down_payment=comm_down_payment_pct,
+        comm_annual_gross_rents=comm_annual_gross_rents, comm_annual_noi_listing=comm_annual_noi_listing,
+        comm_vacancy_rate=comm_vacancy_rate, comm_other_expenses=comm_other_expenses,
+        comm_interest_rate=comm_interest_rate_value, comm_loan_years=comm_loan_years, comm_state=comm_state)
+    
+    # NOI Estimated =(K4*(1-L5))-SUM(J8:J11), cash flow =L8-L9, cash down =J3+H4
+    noi_estimated = comm_deal.noi_estimated
+    comm_loan_amount = comm_deal.loan_amount
+    monthly_payment = comm_deal.monthly_payment
+    annual_cash_flow = comm_deal.annual_cash_flow
+    closing_costs = comm_deal.closing_costs
+    total_cash_down = comm_deal.total_cash_down
     
     # Display commercial results
     col1, col2 = st.columns(2)
     
     with col1:
         st.header("Operating Expenses")
-        expenses_df = pd.DataFrame({
-            "Expense": ["Purchase Loan P&I", "Property Insurance Insurance", "Property Taxes", "PM Fee", "All Other Operating Expenses"],
-            "Monthly Amount": [monthly_payment, annual_insurance/12, annual_property_tax/12, annual_pm_fee/12, comm_other_expenses/12],
-            "Annual Amount": [annual_debt_service, annual_insurance, annual_property_tax, annual_pm_fee, comm_other_expenses]
-        })
-        st.dataframe(expenses_df.style.format({"Monthly Amount": "${:,.2f}", "Annual Amount": "${:,.0f}"}), hide_index=True)
+        with profiling.section("tables"):
+            st.dataframe(expenses_df, column_config=number_columns({"Monthly Amount": "$%,.2f", "Annual Amount": "$%,.0f"}),
+                         hide_index=True)
         
         with st.expander("📋 Expense Notes"):
             st.write("**Property Insurance Insurance**: Rough estimate based on industry average. Double check this value for the specific property and zip code.")
             st.write("**PM Fee**: Prop Mgmt Fees on commercial properties are generally 3-4% of gross rents received/collected, with a minimum typically established.")
         
-        st.metric("Total Annual Operating Expenses", f"${annual_insurance + annual_property_tax + annual_pm_fee + comm_other_expenses:,.0f}")
+        st.metric("Total Annual Operating Expenses", f"${comm_deal.total_operating_expenses:,.0f}")
     
     with col2:
         st.header("Investment Analysis")
-        # Create Cash Down string with color
-        if total_cash_down <= 500000:
-            cash_down_display = f"${total_cash_down:,.0f}"
-        elif total_cash_down <= 750000:
-            cash_down_display = f"${total_cash_down:,.0f}"
-        else:
-            cash_down_display = f"${total_cash_down:,.0f}"
-            
-        analysis_df = pd.DataFrame({
-            "Metric": ["Annual Gross Rents", "Adjusted Gross Income", "Annual NOI (Estimated)", "Annual Debt Service", "Annual Cash Flow", "Cash-on-Cash Return", "Cash Down"],
-            "Amount": [
-                f"${comm_annual_gross_rents:,.0f}",
-                f"${comm_annual_gross_rents * (1 - comm_vacancy_rate/100):,.0f}",
-                f"${noi_estimated:,.0f}",
-                f"${annual_debt_service:,.0f}",
-                f"${annual_cash_flow:,.0f}",
-                f"{cash_on_cash_return:.1f}%",
-                cash_down_display
-            ]
-        })
         st.dataframe(analysis_df, hide_index=True)
     
     # Deal evaluation
     st.header("Deal Evaluation")
-    if annual_cash_flow > 0:
+    if comm_simulation:
+        paths, assumptions = comm_simulation
+        summary, counts, edges = cached_simulation(
+            "Commercial",
+            {"purchase_price": comm_purchase_price, "down_payment": comm_down_payment_pct,
+             "annual_gross_rents": comm_annual_gross_rents, "vacancy_rate": comm_vacancy_rate,
+             "other_expenses": comm_other_expenses, "interest_rate": comm_interest_rate_value,
+             "loan_years": comm_loan_years, "state": comm_state},
+            paths, assumptions)
+        simulation_verdict(summary)
+        st.header("Risk Simulation")
+        render_simulation(summary, counts, edges, "Annual Cash Flow", "Cash-on-Cash")
+    elif annual_cash_flow > 0:
         st.success("✅ GOOD DEAL: Positive annual cash flow")
     else:
         st.error("❌ BAD DEAL: Negative annual cash flow")
@@ -599,3 +1289,42 @@ elif property_type == "Commercial":
             st.metric("Annual Cash Flow", f"${annual_cash_flow:,.0f}", delta="Positive cash flow", delta_color="normal")
         else:
             st.metric("Annual Cash Flow", f"${annual_cash_flow:,.0f}", delta="Negative cash flow", delta_color="inverse")
+    
+    # Deal targets
+    st.header("Deal Targets")
+    deal_targets_panel("comm", comm_deal)
+    
+    # Hold-period projection
+    st.header("Hold-Period Projection")
+    proforma_panel("comm", comm_deal)
+    
+    # Historical rate backtest
+    st.header("Rate History Backtest")
+    rate_backtest_panel("comm", "Commercial", {param: deal_params()[param] for param in MODEL_DEFAULTS["Commercial"]})
+    
+    # Sensitivity Analysis
+    st.header("Sensitivity Analysis")
+    with st.expander("Price × Interest Rate × Vacancy"):
+        commercial_sensitivity_panel(comm_purchase_price, comm_interest_rate_value, comm_vacancy_rate,
+                                     comm_down_payment_pct, comm_annual_gross_rents, comm_other_expenses,
+                                     comm_loan_years, comm_state)
+    
+    # Amortization Schedule
+    st.header("Amortization Schedule")
+    render_amortization(comm_loan_amount, comm_deal.interest_rate, comm_loan_years, "comm")
+
+# Shareable link to this analysis
+st.header("Share")
+share_panel(property_type)
+
+# Deal library, shared by both property types
+st.header("Deal Library")
+deal_library_panel(property_type)
+
+# Portfolio roll-up of the saved deals
+st.header("Portfolio")
+portfolio_panel()
+
+# Rerun profile, only when profiling is on
+if PROFILER:
+    render_profile(PROFILER, property_type)
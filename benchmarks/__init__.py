@@ -0,0 +1,10 @@
+"""Benchmarks for the calculation engine, full-page reruns of ``app.py`` and the JSON API.
+
+    python -m benchmarks run                         # writes benchmarks/results/<commit>.json
+    python -m benchmarks run --only formulas --sizes 1 1000
+    python -m benchmarks run --only api              # JSON API requests/sec and batch deals/sec
+    python -m benchmarks compare OLD.json NEW.json   # exit code 1 on regressions
+    python -m benchmarks loadtest --sessions 1 5 10 20 --slo-p95-ms 2000
+
+Results are plain JSON so runs from different commits can be diffed.
+"""
@@ -0,0 +1,167 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+from benchmarks import api, backtest, export, formulas, loadtest, portfolio, reruns, urls
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True, cwd=os.path.dirname(RESULTS_DIR)).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def environment():
+    import numpy
+    import streamlit
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": numpy.__version__,
+        "streamlit": streamlit.__version__,
+    }
+
+
+def run(args):
+    results = []
+    if "formulas" in args.only:
+        results += formulas.run(sizes=args.sizes, min_time=args.min_time)
+    if "reruns" in args.only:
+        results += reruns.run(scenarios=args.scenarios, repeats=args.repeats)
+    if "api" in args.only:
+        results += api.run(requests=args.api_requests, connections=args.api_connections)
+    if "export" in args.only:
+        results += export.run(count=args.export_deals)
+    if "portfolio" in args.only:
+        results += portfolio.run(count=args.portfolio_deals)
+    if "backtest" in args.only:
+        results += backtest.run(count=args.backtest_deals)
+    if "urls" in args.only:
+        results += urls.run(count=args.urls)
+    report = {"environment": environment(), "results": results}
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{report['environment']['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=1)
+
+    for result in results:
+        if "deals_per_s" in result:
+            extra = f"{result['deals_per_s']:>14,.0f} deals/s"
+        elif "urls_per_s" in result:
+            extra = f"{result['urls_per_s']:>14,.0f} URLs/s"
+        else:
+            extra = f"cold {result['cold_s'] * 1000:8.1f} ms"
+        print(f"{result['name']:<60} {result['median_s'] * 1000:10.3f} ms  {extra}")
+    print(f"Wrote {output}", file=sys.stderr)
+
+
+def load(args):
+    levels = loadtest.run(levels=args.sessions, scenarios=args.scenarios, unique=args.unique,
+                          think_time=args.think_time, ramp=args.ramp, p95_ms=args.slo_p95_ms,
+                          rss_mb=args.slo_rss_mb)
+    report = {"environment": environment(), "settings": {
+        "unique": args.unique, "think_time_s": args.think_time, "ramp_s": args.ramp,
+        "slo_p95_ms": args.slo_p95_ms, "slo_rss_mb": args.slo_rss_mb}, "levels": levels}
+
+    output = args.output or os.path.join(RESULTS_DIR, f"loadtest-{report['environment']['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=1)
+
+    print(f"{'sessions':>8} {'reruns':>7} {'rerun/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'idle RSS MB':>12} {'peak RSS MB':>12} {'MB/session':>11}  SLO")
+    for level in levels:
+        rss = " ".join(f"{level[key] / 2**20:{width}.1f}" if level[key] else f"{'n/a':>{width}}"
+                       for key, width in (("idle_rss_bytes", 12), ("peak_rss_bytes", 12), ("rss_per_session_bytes", 11)))
+        slo = "; ".join(level["slo_breaches"]) or "ok"
+        print(f"{level['sessions']:>8} {level['reruns']:>7} {level['throughput_rps']:8.2f} {level['p50_s'] * 1000:8.0f} "
+              f"{level['p95_s'] * 1000:8.0f} {level['p99_s'] * 1000:8.0f} {rss}  {slo}")
+    print(f"Wrote {output}", file=sys.stderr)
+    return 1 if any(level["slo_breaches"] for level in levels) else 0
+
+
+def compare(args):
+    with open(args.baseline) as f:
+        baseline = {r["name"]: r for r in json.load(f)["results"]}
+    with open(args.candidate) as f:
+        candidate = {r["name"]: r for r in json.load(f)["results"]}
+
+    regressions = 0
+    for name in sorted(baseline.keys() & candidate.keys()):
+        old, new = baseline[name]["median_s"], candidate[name]["median_s"]
+        change = (new - old) / old if old else 0.0
+        flag = ""
+        if change > args.threshold:
+            flag, regressions = "  REGRESSION", regressions + 1
+        elif change < -args.threshold:
+            flag = "  faster"
+        print(f"{name:<60} {old * 1000:10.3f} -> {new * 1000:10.3f} ms  {change:+7.1%}{flag}")
+    for name in sorted(baseline.keys() ^ candidate.keys()):
+        print(f"{name:<60} only in {'baseline' if name in baseline else 'candidate'}")
+    return 1 if regressions else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Engine and app rerun benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run benchmarks and write a JSON report")
+    run_parser.add_argument("--only", nargs="+", choices=["formulas", "reruns", "api", "export", "portfolio", "backtest", "urls"],
+                            default=["formulas", "reruns"],
+                            help="benchmark groups to run (api and export are opt-in: they start subprocesses; "
+                                 "portfolio, backtest and urls are opt-in: they allocate large arrays)")
+    run_parser.add_argument("--sizes", nargs="+", type=int, default=list(formulas.SIZES),
+                            help="batch sizes for the formula benchmarks")
+    run_parser.add_argument("--min-time", type=float, default=0.2, help="seconds to repeat each formula benchmark")
+    run_parser.add_argument("--scenarios", nargs="+", choices=list(reruns.SCENARIOS), default=None)
+    run_parser.add_argument("--repeats", type=int, default=3, help="passes per rerun scenario (first is cold)")
+    run_parser.add_argument("--api-requests", type=int, default=5000, help="requests per single-deal API case")
+    run_parser.add_argument("--api-connections", type=int, default=16, help="concurrent keep-alive API connections")
+    run_parser.add_argument("--export-deals", type=int, default=export.DEALS, help="deals per export case")
+    run_parser.add_argument("--portfolio-deals", type=int, default=portfolio.DEALS, help="deals per portfolio case")
+    run_parser.add_argument("--backtest-deals", type=int, default=backtest.DEALS,
+                            help="deals per backtest run, split between property types")
+    run_parser.add_argument("--urls", type=int, default=urls.URLS, help="listing URLs per URL case")
+    run_parser.add_argument("-o", "--output", help="report path (default: benchmarks/results/<commit>.json)")
+
+    load_parser = commands.add_parser("loadtest", help="concurrent sessions; p50/p95/p99, throughput, peak RSS")
+    load_parser.add_argument("--sessions", nargs="+", type=int, default=[1, 5, 10, 20],
+                             help="concurrency levels to run, one after another")
+    load_parser.add_argument("--scenarios", nargs="+", choices=list(reruns.SCENARIOS), default=None)
+    load_parser.add_argument("--unique", action="store_true",
+                             help="give every session different inputs instead of the same shared link")
+    load_parser.add_argument("--think-time", type=float, default=0.0, help="seconds each user waits between changes")
+    load_parser.add_argument("--ramp", type=float, default=0.0, help="seconds over which sessions start")
+    load_parser.add_argument("--slo-p95-ms", type=float, default=None, help="fail if p95 rerun latency exceeds this")
+    load_parser.add_argument("--slo-rss-mb", type=float, default=None, help="fail if the app server's peak RSS exceeds this")
+    load_parser.add_argument("-o", "--output", help="report path (default: benchmarks/results/loadtest-<commit>.json)")
+
+    compare_parser = commands.add_parser("compare", help="compare two reports; exit 1 on regressions")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("candidate")
+    compare_parser.add_argument("--threshold", type=float, default=0.10,
+                                help="relative slowdown that counts as a regression (default 0.10)")
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        run(args)
+        return 0
+    if args.command == "loadtest":
+        return load(args)
+    return compare(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+"""Request throughput of the JSON API (``api.py``) over keep-alive connections.
+
+The server runs in a subprocess on a free port and the client is a raw asyncio
+HTTP/1.1 client, so neither is slowed by an HTTP library. On a single-core
+host the client shares the CPU with the server, so the numbers are a floor.
+"""
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+API = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "api.py")
+
+# Shared link query strings; "unique" requests nudge the price so each one misses the cache
+SINGLE = {
+    "residential": "/v1/score?property_type=Residential&purchase_price=410000&down_payment=25"
+                   "&interest_rate=7.1&loan_years=30&monthly_rent=3100&state=MI",
+    "commercial": "/v1/score?property_type=Commercial&comm_purchase_price=2500000&comm_down_payment=35"
+                  "&comm_interest_rate=7.25&comm_loan_years=20&comm_state=TX&comm_vacancy_rate=7",
+}
+BATCH_SIZES = (100, 10_000)
+# Every optional section (solver targets and pro forma); batches always ask for them
+FULL = "&include=targets,projection"
+BATCH = "/v1/batch?include=targets,projection"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port, timeout=30):
+    process = subprocess.Popen([sys.executable, API, "--port", str(port)], stderr=subprocess.DEVNULL,
+                               cwd=os.path.dirname(API))
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return process
+        except OSError:
+            time.sleep(0.05)
+    process.kill()
+    raise RuntimeError("API server did not start")
+
+
+def _request(method, target, body=b""):
+    return (f"{method} {target} HTTP/1.1\r\nHost: bench\r\nContent-Length: {len(body)}\r\n\r\n").encode() + body
+
+
+async def _client(port, requests, latencies):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    for request in requests:
+        start = time.perf_counter()
+        writer.write(request)
+        head = await reader.readuntil(b"\r\n\r\n")
+        length = int(head.split(b"Content-Length: ")[1].split(b"\r\n")[0])
+        body = await reader.readexactly(length)
+        latencies.append(time.perf_counter() - start)
+        if not head.startswith(b"HTTP/1.1 200"):
+            raise RuntimeError(body.decode())
+    writer.close()
+
+
+def drive(port, requests, connections):
+    """Send ``requests`` spread over ``connections`` keep-alive connections; returns (wall seconds, latencies)"""
+    latencies = []
+
+    async def main():
+        await asyncio.gather(*(_client(port, requests[i::connections], latencies) for i in range(connections)))
+
+    start = time.perf_counter()
+    asyncio.run(main())
+    return time.perf_counter() - start, latencies
+
+
+def drive_during_batches(port, requests, connections, batch):
+    """``drive`` while one more connection posts ``batch`` back to back; returns (wall, latencies) of ``requests``"""
+    latencies, batch_latencies = [], []
+
+    async def main():
+        singles = asyncio.gather(*(_client(port, requests[i::connections], latencies) for i in range(connections)))
+        batches = asyncio.ensure_future(_client(port, [batch] * 1000, batch_latencies))
+        try:
+            await singles
+        finally:
+            batches.cancel()
+
+    start = time.perf_counter()
+    asyncio.run(main())
+    return time.perf_counter() - start, latencies
+
+
+def _summary(name, wall, latencies, deals_per_request=1):
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        "name": name,
+        "requests": len(latencies),
+        "median_s": float(p50),
+        "p95_s": float(p95),
+        "p99_s": float(p99),
+        "requests_per_s": len(latencies) / wall,
+        "deals_per_s": len(latencies) * deals_per_request / wall,
+    }
+
+
+def run(requests=5000, connections=16, batch_sizes=BATCH_SIZES, seed=0):
+    """Single-deal (cached and uncached) and batch throughput; one result dict per case"""
+    rng = np.random.default_rng(seed)
+    port = free_port()
+    process = start_server(port)
+    results = []
+    try:
+        for kind, target in SINGLE.items():
+            # Warm the server, then the same shared link over and over (served from the cache)
+            drive(port, [_request("GET", target)] * 100, 4)
+            wall, latencies = drive(port, [_request("GET", target)] * requests, connections)
+            results.append(_summary(f"api.{kind}.cached", wall, latencies))
+
+            field = "purchase_price=410000" if kind == "residential" else "comm_purchase_price=2500000"
+            for suffix, include in (("", ""), (".full", FULL)):
+                unique = [_request("GET", target.replace(field, f"{field.split('=')[0]}={price}") + include)
+                          for price in rng.integers(100_000, 5_000_000, requests)]
+                wall, latencies = drive(port, unique, connections)
+                results.append(_summary(f"api.{kind}.uncached{suffix}", wall, latencies))
+
+
+        for size in batch_sizes:
+            deals = [{"property_type": "Residential" if i % 2 else "Commercial",
+                      "purchase_price": float(price), "comm_purchase_price": float(price) * 4, "state": "TX"}
+                     for i, price in enumerate(rng.uniform(150_000, 1_500_000, size))]
+            body = json.dumps({"deals": deals}).encode()
+            repeats = max(3, min(50, 100_000 // size))
+            wall, latencies = drive(port, [_request("POST", BATCH, body)] * repeats, 1)
+            results.append(_summary(f"api.batch.{size}", wall, latencies, deals_per_request=size))
+
+        # Uncached single deals while the largest batch is scored over and over on another connection
+        unique = [_request("GET", SINGLE["residential"].replace("purchase_price=410000", f"purchase_price={price}"))
+                  for price in rng.integers(100_000, 5_000_000, requests // 5)]
+        wall, latencies = drive_during_batches(port, unique, connections, _request("POST", BATCH, body))
+        results.append(_summary(f"api.residential.during_batch.{size}", wall, latencies))
+    finally:
+        process.terminate()
+        process.wait()
+    return results
@@ -0,0 +1,52 @@
+"""Rate backtest sweep: every deal re-run at every month of a PMMS-length rate history.
+
+Timings don't depend on the rates, so the sweep runs over a synthetic random
+walk as long as the PMMS history (April 1971 to 2024) and needs no download.
+"""
+import time
+
+import numpy as np
+
+from benchmarks.export import sample_deals
+from calculator.backtest import COMMERCIAL_SPREAD, HISTORY_DTYPE, RateHistory, backtest, regimes
+from calculator.params import PROPERTY_TYPES
+
+DEALS = 5_000
+MONTHS = 645
+
+
+def synthetic_history(months=MONTHS, rng=None):
+    """In-memory RateHistory of ``months`` random-walk rates between 2.5% and 18%"""
+    rng = rng or np.random.default_rng(0)
+    history = np.zeros(months, dtype=HISTORY_DTYPE)
+    history["month"] = np.datetime64("1971-04", "M") + np.arange(months)
+    history["residential"] = np.clip(7.5 + np.cumsum(rng.normal(0, 0.25, months)), 2.5, 18.0)
+    history["commercial"] = history["residential"] + COMMERCIAL_SPREAD
+    return RateHistory(history)
+
+
+def run(count=DEALS, repeats=3, seed=0):
+    """Wall time per case (best and median of ``repeats``); one result dict per case"""
+    rng = np.random.default_rng(seed)
+    history = synthetic_history(rng=rng)
+    deals = sample_deals(count, rng)
+    cases = {}
+    for property_type in PROPERTY_TYPES:
+        inputs = [deal["inputs"] for deal in deals if deal["property_type"] == property_type]
+        size = f"{len(inputs)}x{len(history)}"
+        cases[f"backtest.{property_type.lower()}.{size}"] = (
+            len(inputs), lambda inputs=inputs, kind=property_type: backtest(kind, inputs, history=history))
+        result = backtest(property_type, inputs, history=history)
+        cases[f"backtest.regimes.{property_type.lower()}.{size}"] = (len(inputs), lambda result=result: regimes(result))
+
+    results = []
+    for name, (size, func) in cases.items():
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+        results.append({"name": name, "size": size, "months": len(history), "repeats": repeats,
+                        "best_s": min(timings), "median_s": float(np.median(timings)),
+                        "deals_per_s": size / min(timings)})
+    return results
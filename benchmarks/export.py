@@ -0,0 +1,58 @@
+"""Report export throughput: per-deal XLSX and PDF files and the portfolio workbook, serial and on a process pool."""
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from calculator import export
+from calculator.rates import STATES
+
+DEALS = 500
+
+
+def sample_deals(count, rng):
+    """Half residential, half commercial saved-deal dicts with random prices, terms and states"""
+    deals = []
+    for i in range(count):
+        if i % 2:
+            inputs = {"purchase_price": rng.uniform(150_000, 1_500_000), "loan_years": float(rng.choice([15, 30])),
+                      "monthly_rent": rng.uniform(1_000, 10_000), "state": str(rng.choice(STATES))}
+            deals.append({"property_type": "Residential", "name": f"Deal {i}", "inputs": inputs})
+        else:
+            inputs = {"comm_purchase_price": rng.uniform(500_000, 20_000_000),
+                      "comm_annual_gross_rents": rng.uniform(50_000, 2_000_000),
+                      "comm_loan_years": float(rng.choice([20, 25, 30])), "comm_state": str(rng.choice(STATES))}
+            deals.append({"property_type": "Commercial", "name": f"Deal {i}", "inputs": inputs})
+    return deals
+
+
+def run(count=DEALS, repeats=3, seed=0):
+    """Wall time per case (best and median of ``repeats``); one result dict per case"""
+    deals = sample_deals(count, np.random.default_rng(seed))
+    workers = os.cpu_count() or 1
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    directory = tempfile.mkdtemp(prefix="export-bench-")
+    cases = {f"export.portfolio.{count}": lambda: export.write_portfolio(deals, os.path.join(directory, "p.xlsx"))}
+    for fmt in export.FORMATS:
+        cases[f"export.{fmt}.{count}"] = lambda fmt=fmt: export.export_deals(deals, directory, fmt)
+        if pool is not None:
+            cases[f"export.{fmt}.{count}.pool{workers}"] = lambda fmt=fmt: export.export_deals(deals, directory, fmt,
+                                                                                               executor=pool)
+    results = []
+    try:
+        for name, func in cases.items():
+            timings = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                func()
+                timings.append(time.perf_counter() - start)
+            results.append({"name": name, "size": count, "repeats": repeats, "best_s": min(timings),
+                            "median_s": float(np.median(timings)), "deals_per_s": count / min(timings)})
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        shutil.rmtree(directory, ignore_errors=True)
+    return results
@@ -0,0 +1,103 @@
+"""Raw formula and pro forma throughput for residential and commercial deals at scalar and batch sizes.
+
+Each deal type is timed on the float fast path and on the integer-cents kernel
+(``money.*``), and loan schedules both ways (``amortization.float/exact.*``).
+"""
+import time
+
+import numpy as np
+
+from calculator import money
+from calculator.amortization import schedule
+from calculator.deals import CommercialDeal, ResidentialDeal
+from calculator.proforma import commercial_proforma, residential_proforma
+from calculator.rates import STATES
+
+SIZES = (1, 1_000, 1_000_000)
+
+
+def residential_inputs(size, rng):
+    """ResidentialDeal kwargs: scalars for size 1, random arrays otherwise"""
+    if size == 1:
+        return {"purchase_price": 650000, "down_payment": 20, "interest_rate": 6.5,
+                "loan_years": 15, "monthly_rent": 5000, "state": "CA"}
+    return {
+        "purchase_price": rng.uniform(150_000, 1_500_000, size),
+        "down_payment": rng.uniform(0, 50, size),
+        "interest_rate": rng.uniform(3, 10, size),
+        "loan_years": rng.choice([15, 30], size),
+        "monthly_rent": rng.uniform(1_000, 10_000, size),
+        "state": rng.choice(STATES, size),
+    }
+
+
+def commercial_inputs(size, rng):
+    """CommercialDeal kwargs: scalars for size 1, random arrays otherwise"""
+    if size == 1:
+        return {"purchase_price": 1970000, "down_payment": 30, "annual_gross_rents": 152195,
+                "vacancy_rate": 3, "other_expenses": 5000, "interest_rate": 6.5,
+                "loan_years": 25, "state": "CA"}
+    return {
+        "purchase_price": rng.uniform(500_000, 20_000_000, size),
+        "down_payment": rng.uniform(20, 50, size),
+        "annual_gross_rents": rng.uniform(50_000, 2_000_000, size),
+        "vacancy_rate": rng.uniform(0, 20, size),
+        "other_expenses": rng.uniform(0, 100_000, size),
+        "interest_rate": rng.uniform(3, 10, size),
+        "loan_years": rng.choice([20, 25, 30], size),
+        "state": rng.choice(STATES, size),
+    }
+
+
+DEALS = {
+    "residential": (ResidentialDeal, residential_inputs),
+    "commercial": (CommercialDeal, commercial_inputs),
+}
+PROFORMAS = {"residential": residential_proforma, "commercial": commercial_proforma}
+PROFORMA_HOLD_YEARS = 20
+EXACT = {"residential": money.residential, "commercial": money.commercial}
+# Schedules are (deals, 360) arrays; larger batches only measure memory bandwidth
+SCHEDULE_MAX_SIZE = 10_000
+
+
+def time_call(func, min_time=0.2, max_repeats=1000):
+    """Best-of timing: repeats ``func`` until ``min_time`` has passed, returns (best, median, repeats)"""
+    timings = []
+    started = time.perf_counter()
+    while len(timings) < max_repeats and (len(timings) < 3 or time.perf_counter() - started < min_time):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), float(np.median(timings)), len(timings)
+
+
+def run(sizes=SIZES, seed=0, min_time=0.2):
+    """Throughput of each deal's metrics and of a 20-year pro forma with IRR, per deal type and batch size"""
+    rng = np.random.default_rng(seed)
+    results = []
+    for name, (deal_class, make_inputs) in DEALS.items():
+        for size in sizes:
+            inputs = make_inputs(size, rng)
+            deal = deal_class(**inputs)
+            cases = {
+                f"formulas.{name}.{size}": lambda: deal_class(**inputs).metrics(),
+                f"proforma.{name}.{size}": lambda: PROFORMAS[name](deal, PROFORMA_HOLD_YEARS),
+                f"money.{name}.{size}": lambda: EXACT[name](deal_class(**inputs)),
+            }
+            if name == "residential" and size <= SCHEDULE_MAX_SIZE:
+                loan, rate, years = deal.loan_amount, deal.interest_rate, deal.loan_years
+                loan_cents, rate_units = money.to_cents(loan), money.to_rate(rate)
+                cases[f"amortization.float.{size}"] = lambda: schedule(loan, rate, years)
+                cases[f"amortization.exact.{size}"] = lambda: money.schedule(loan_cents, rate_units, years)
+            for case, func in cases.items():
+                best, median, repeats = time_call(func, min_time=min_time)
+                results.append({
+                    "name": case,
+                    "deal": name,
+                    "size": size,
+                    "repeats": repeats,
+                    "best_s": best,
+                    "median_s": median,
+                    "deals_per_s": size / best,
+                })
+    return results
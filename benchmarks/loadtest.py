@@ -0,0 +1,288 @@
+"""Concurrent-session load test: N simulated browser tabs replaying widget changes against one app server.
+
+Each level starts one server, ``serve.py`` (``streamlit run app.py`` with the
+production flags), on a free port and waits until it has prewarmed and is
+healthy, so the first rerun isn't charged for start-up. N sessions then
+connect to that server over Streamlit's websocket protocol from one asyncio
+client, the way N browser tabs would, so they share its result caches, its
+interpreter and its GIL. Each session replays a Residential or Commercial
+scenario from ``benchmarks.reruns``, sending the widget states a browser sends
+(a widget inside a fragment reruns only its fragment), and every rerun's
+latency, from the message going out to the script finishing, is recorded.
+
+The server process's RSS is sampled for the whole level: ``idle_rss_bytes`` is
+after prewarm with no sessions, ``peak_rss_bytes`` the highest seen with all
+of them running. On a single-core host the client shares the CPU with the
+server, so latencies are an upper bound.
+"""
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+
+from benchmarks.api import free_port
+from benchmarks.reruns import SCENARIOS
+from calculator.profiling import rss_bytes
+
+SERVE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "serve.py")
+
+
+class RssSampler(threading.Thread):
+    """Background thread tracking the peak RSS of process ``pid``"""
+
+    def __init__(self, pid, interval=0.05):
+        super().__init__(name="rss-sampler", daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.peak = rss_bytes(pid)
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                rss = rss_bytes(self.pid)
+            except Exception:  # the server exited; the level reports its errors
+                return
+            if rss is not None and (self.peak is None or rss > self.peak):
+                self.peak = rss
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        return self.peak
+
+
+def start_server(port, timeout=120):
+    """Start ``serve.py`` on ``port``; returns the process once it has prewarmed and is healthy"""
+    process = subprocess.Popen([sys.executable, SERVE, "--server.port", str(port)], stdout=subprocess.PIPE,
+                               stderr=subprocess.STDOUT, text=True, cwd=os.path.dirname(SERVE))
+    ready = threading.Event()
+
+    def drain():
+        # serve.py logs "server healthy" after its prewarm, once the health check passes
+        for line in process.stdout:
+            if line.startswith("[startup] server healthy"):
+                ready.set()
+
+    threading.Thread(target=drain, name="server-log", daemon=True).start()
+    deadline = time.monotonic() + timeout
+    while not ready.wait(0.1):
+        if process.poll() is not None or time.monotonic() > deadline:
+            process.kill()
+            raise RuntimeError("app server did not start")
+    return process
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def session_steps(steps, index, unique):
+    """Steps for one session; with ``unique`` every session nudges its numbers so it misses the caches"""
+    if not unique:
+        return steps
+    nudged = []
+    for element, key, value in steps:
+        if element == "number_input":
+            value = type(value)(value * (1 + 0.001 * (index + 1)))
+        nudged.append((element, key, value))
+    return nudged
+
+
+class Session:
+    """One browser tab: a websocket to the server and the widget states it has sent so far"""
+
+    def __init__(self, websocket, query_string):
+        self.websocket = websocket
+        self.query_string = query_string
+        self.page_script_hash = ""
+        # Widget key -> (element proto, fragment id) as rendered by the latest run
+        self.widgets = {}
+        self.states = {}
+
+    def set_value(self, element, key, value):
+        """Change one widget the way the browser encodes it; returns the fragment to rerun ("" for the page)"""
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        if key not in self.widgets:
+            raise KeyError(f"no {element} with key {key!r} on the page")
+        proto, fragment_id = self.widgets[key]
+        state = WidgetState()
+        if element == "number_input":
+            state.double_value = value
+        elif element == "toggle":
+            state.bool_value = value
+        elif element == "text_input":
+            state.string_value = value
+        elif element in ("selectbox", "radio", "select_slider"):
+            label = str(value)
+            if label not in proto.options:
+                raise ValueError(f"{value!r} is not an option of {key!r}")
+            if element == "select_slider":
+                state.string_array_value.data.append(label)
+            else:
+                state.string_value = label
+        else:
+            raise ValueError(f"can't set {element} widgets")
+        self.states[key] = state
+        return fragment_id
+
+    async def rerun(self, fragment_id=""):
+        """Send a rerun and read its output until the script finishes; returns the app's error, or None"""
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        message = BackMsg()
+        rerun = message.rerun_script
+        rerun.query_string = self.query_string
+        rerun.page_script_hash = self.page_script_hash
+        rerun.fragment_id = fragment_id
+        for key, state in self.states.items():
+            widget = rerun.widget_states.widgets.add()
+            widget.CopyFrom(state)
+            widget.id = self.widgets[key][0].id
+        await self.websocket.send(message.SerializeToString())
+
+        error = None
+        while True:
+            forward = ForwardMsg.FromString(await self.websocket.recv())
+            kind = forward.WhichOneof("type")
+            if kind == "script_finished":
+                if forward.script_finished == ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    continue
+                if forward.script_finished == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                    error = error or "script failed to compile"
+                return error
+            if kind == "new_session":
+                self.page_script_hash = forward.new_session.page_script_hash
+            elif kind == "delta" and forward.delta.WhichOneof("type") == "new_element":
+                element = forward.delta.new_element
+                proto = getattr(element, element.WhichOneof("type"))
+                if element.HasField("exception"):
+                    error = error or proto.message
+                # Widget ids are "$$ID-<hash>-<key>"
+                widget_id = getattr(proto, "id", "")
+                if widget_id.startswith("$$ID-"):
+                    self.widgets[widget_id.split("-", 2)[2]] = (proto, forward.delta.fragment_id)
+
+
+async def open_session(port, scenario):
+    """Connect one tab to the server; returns its ``Session``"""
+    import websockets
+
+    property_type, _ = SCENARIOS[scenario]
+    websocket = await websockets.connect(f"ws://127.0.0.1:{port}/_stcore/stream", max_size=None)
+    return Session(websocket, f"property_type={property_type}")
+
+
+async def replay(session, index, scenario, unique, think_time, delay, timeout, record):
+    """Replay one scenario on an open session; calls ``record(scenario, step, latency, error)`` per rerun"""
+    _, steps = SCENARIOS[scenario]
+    actions = [(None, "initial_load", None)] + list(session_steps(steps, index, unique))
+    try:
+        if delay:
+            await asyncio.sleep(delay)
+        for element, key, value in actions:
+            error = None
+            start = time.perf_counter()
+            try:
+                fragment_id = session.set_value(element, key, value) if element else ""
+                error = await asyncio.wait_for(session.rerun(fragment_id), timeout)
+            except Exception as exc:
+                error = repr(exc)
+            record(scenario, key, time.perf_counter() - start, error)
+            if error:
+                return
+            if think_time:
+                await asyncio.sleep(think_time)
+    finally:
+        await session.websocket.close()
+
+
+def run_level(sessions, scenarios=None, unique=False, think_time=0.0, ramp=0.0, timeout=120):
+    """Run ``sessions`` concurrent sessions against one fresh server, alternating scenarios
+
+    Returns the latency/throughput/RSS summary.
+    """
+    scenarios = list(scenarios or SCENARIOS)
+    scenarios = [scenarios[i % len(scenarios)] for i in range(sessions)]
+    port = free_port()
+    server = start_server(port, timeout)
+    latencies, errors = [], []
+
+    def record(scenario, step, latency, error):
+        latencies.append(latency)
+        if error:
+            errors.append(f"{scenario}.{step}: {error}")
+
+    async def main():
+        # Every tab connects before the clock starts
+        opened = await asyncio.gather(*(open_session(port, scenario) for scenario in scenarios),
+                                      return_exceptions=True)
+        replays = []
+        for i, (scenario, session) in enumerate(zip(scenarios, opened)):
+            if isinstance(session, Exception):
+                errors.append(f"{scenario}.connect: {session!r}")
+                continue
+            replays.append(replay(session, i, scenario, unique, think_time, ramp * i / sessions, timeout, record))
+        started = time.perf_counter()
+        await asyncio.gather(*replays)
+        return time.perf_counter() - started
+
+    try:
+        idle = rss_bytes(server.pid)
+        sampler = RssSampler(server.pid)
+        sampler.start()
+        wall = asyncio.run(main())
+        peak = sampler.stop()
+    finally:
+        stop_server(server)
+
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if latencies else (np.nan,) * 3
+    return {
+        "sessions": sessions,
+        "reruns": len(latencies),
+        "errors": errors,
+        "wall_s": wall,
+        "throughput_rps": len(latencies) / wall if wall else 0.0,
+        "mean_s": float(np.mean(latencies)) if latencies else None,
+        "p50_s": float(p50),
+        "p95_s": float(p95),
+        "p99_s": float(p99),
+        "max_s": max(latencies, default=None),
+        "idle_rss_bytes": idle,
+        "peak_rss_bytes": peak,
+        "rss_per_session_bytes": (peak - idle) / sessions if peak and idle else None,
+    }
+
+
+def check_slo(level, p95_ms=None, rss_mb=None):
+    """List of SLO breaches for one level's summary"""
+    breaches = []
+    if level["errors"]:
+        breaches.append(f"{len(level['errors'])} failed reruns")
+    if p95_ms is not None and level["p95_s"] * 1000 > p95_ms:
+        breaches.append(f"p95 {level['p95_s'] * 1000:.0f} ms > {p95_ms:.0f} ms")
+    if rss_mb is not None and level["peak_rss_bytes"] and level["peak_rss_bytes"] / 2**20 > rss_mb:
+        breaches.append(f"peak RSS {level['peak_rss_bytes'] / 2**20:.0f} MB > {rss_mb:.0f} MB")
+    return breaches
+
+
+def run(levels=(1, 5, 10, 20), scenarios=None, unique=False, think_time=0.0, ramp=0.0,
+        p95_ms=None, rss_mb=None, timeout=120):
+    """Run each concurrency level in turn; every level's summary carries its SLO breaches"""
+    results = []
+    for sessions in levels:
+        level = run_level(sessions, scenarios, unique, think_time, ramp, timeout)
+        level["slo_breaches"] = check_slo(level, p95_ms, rss_mb)
+        results.append(level)
+    return results
@@ -0,0 +1,35 @@
+"""Portfolio roll-up cost: building the monthly series for many deals and summing them by group."""
+import time
+
+import numpy as np
+
+from benchmarks.export import sample_deals
+from calculator.portfolio import DEFAULT_MONTHS, GROUPS, Portfolio
+
+DEALS = 10_000
+
+
+def run(count=DEALS, months=DEFAULT_MONTHS, repeats=3, seed=0):
+    """Wall time per case (best and median of ``repeats``); one result dict per case"""
+    rng = np.random.default_rng(seed)
+    deals = sample_deals(count, rng)
+    for deal, offset in zip(deals, rng.integers(0, 15 * 12, count)):
+        deal["acquired"] = np.datetime64("2010-01", "M") + offset
+    portfolio = Portfolio(deals, months=months)
+    cases = {f"portfolio.build.{count}x{months}": lambda: Portfolio(deals, months=months),
+             f"portfolio.totals.{count}x{months}": portfolio.totals}
+    for by in GROUPS:
+        cases[f"portfolio.rollup.{by}.{count}x{months}"] = lambda by=by: portfolio.rollup((by,))
+    cases[f"portfolio.rollup.{'+'.join(GROUPS)}.{count}x{months}"] = lambda: portfolio.rollup(GROUPS)
+
+    results = []
+    for name, func in cases.items():
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+        results.append({"name": name, "size": count, "months": months, "repeats": repeats, "best_s": min(timings),
+                        "median_s": float(np.median(timings)), "deals_per_s": count / min(timings),
+                        "series_bytes": portfolio.nbytes})
+    return results
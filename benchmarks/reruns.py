@@ -0,0 +1,88 @@
+"""End-to-end rerun latency of ``app.py``, driven headlessly through Streamlit's AppTest.
+
+Each scenario opens the page once and then changes one widget per step, timing
+the rerun that follows. The first repeat runs against cold caches; later
+repeats reuse the process-wide caches the way a busy server would.
+"""
+import os
+import time
+
+import numpy as np
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+# (element type, widget key, new value) per step, in the order a user would touch them
+SCENARIOS = {
+    "residential": ("Residential", [
+        ("number_input", "purchase_price_input", 700000),
+        ("number_input", "down_payment_input", 25.0),
+        ("number_input", "interest_rate_input", 7.0),
+        ("selectbox", "loan_years_input", 30),
+        ("number_input", "monthly_rent_input", 5500),
+        ("selectbox", "state_input", "TX"),
+        ("text_input", "property_url_input", "https://www.zillow.com/homedetails/123-Main-St-Phoenix-AZ-85001/1_zpid/"),
+        ("selectbox", "res_amortization_year", 2),
+        ("radio", "res_sens_metric", "Annual ROI"),
+        ("number_input", "res_sens_price_low", 500000),
+        ("toggle", "res_sim_on", True),
+        ("select_slider", "res_sim_paths", 10_000),
+    ]),
+    "commercial": ("Commercial", [
+        ("number_input", "comm_purchase_price_input", 2500000),
+        ("number_input", "comm_down_payment_input", 35.0),
+        ("number_input", "comm_gross_rents_input", 180000),
+        ("number_input", "comm_noi_input", 110000),
+        ("number_input", "comm_vacancy_input", 5.0),
+        ("number_input", "comm_expenses_input", 8000),
+        ("number_input", "comm_interest_input", 7.25),
+        ("selectbox", "comm_loan_years_input", 20),
+        ("selectbox", "comm_state_input", "TX"),
+        ("selectbox", "comm_amortization_year", 2),
+        ("radio", "comm_sens_metric", "Cash-on-Cash Return"),
+        ("toggle", "comm_sim_on", True),
+        ("select_slider", "comm_sim_paths", 10_000),
+    ]),
+}
+
+
+def _timed_run(at, timeout):
+    start = time.perf_counter()
+    at.run(timeout=timeout)
+    elapsed = time.perf_counter() - start
+    if at.exception:
+        raise RuntimeError(f"app raised: {at.exception[0].message}")
+    return elapsed
+
+
+def replay(property_type, steps, timeout=60):
+    """One pass of a scenario; returns [(step name, seconds), ...] starting with the initial load"""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP, default_timeout=timeout)
+    at.query_params["property_type"] = property_type
+    timings = [("initial_load", _timed_run(at, timeout))]
+    for element, key, value in steps:
+        getattr(at, element)(key=key).set_value(value)
+        timings.append((key, _timed_run(at, timeout)))
+    return timings
+
+
+def run(scenarios=None, repeats=3, timeout=60):
+    """Per-step rerun latency for each scenario: cold (first pass) and warm (median of the rest)"""
+    results = []
+    for name in scenarios or SCENARIOS:
+        property_type, steps = SCENARIOS[name]
+        passes = [replay(property_type, steps, timeout) for _ in range(repeats)]
+        for i, (step, _) in enumerate(passes[0]):
+            samples = [timings[i][1] for timings in passes]
+            warm = samples[1:] or samples
+            results.append({
+                "name": f"reruns.{name}.{i:02d}.{step}",
+                "scenario": name,
+                "step": step,
+                "repeats": repeats,
+                "cold_s": samples[0],
+                "median_s": float(np.median(warm)),
+                "max_s": max(warm),
+            })
+    return results
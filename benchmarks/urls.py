@@ -0,0 +1,56 @@
+"""Listing URL throughput: parsing and deduplicating scraped Zillow, LoopNet, Crexi and Realtor.com links."""
+import time
+
+import numpy as np
+
+from calculator.addresses import ListingIndex, parse_urls
+from calculator.rates import STATES
+
+URLS = 200_000
+DUPLICATE_SHARE = 0.3  # share of URLs that repeat an earlier listing, on the same or another site
+STREETS = ("Main-St", "N-Central-Ave", "W-Broadway-Rd", "E-Camelback-Rd", "Oak-Ln", "Sunset-Blvd")
+CITIES = ("Phoenix", "Tucson", "Austin", "Las-Vegas", "Detroit", "San-Diego")
+STATE_SLUGS = {"AZ": "arizona", "CA": "california", "IN": "indiana", "NV": "nevada", "TX": "texas", "MI": "michigan"}
+
+
+def sample_urls(count, rng):
+    """``count`` listing URLs across the four sites, ``DUPLICATE_SHARE`` of them repeats of earlier listings"""
+    listings = max(1, int(count * (1 - DUPLICATE_SHARE)))
+    numbers = rng.integers(1, 99_999, listings)
+    streets = rng.integers(0, len(STREETS), listings)
+    cities = rng.integers(0, len(CITIES), listings)
+    states = rng.integers(0, len(STATES), listings)
+    zips = rng.integers(10_000, 99_999, listings)
+    picks = np.concatenate([np.arange(listings), rng.integers(0, listings, count - listings)])
+    sites = rng.integers(0, 4, count)
+    urls = []
+    for pick, site in zip(picks, sites):
+        number, street, city = numbers[pick], STREETS[streets[pick]], CITIES[cities[pick]]
+        state, zip_code = STATES[states[pick]], zips[pick]
+        if site == 0:
+            urls.append(f"https://www.zillow.com/homedetails/{number}-{street}-{city}-{state}-{zip_code}/{pick}_zpid/")
+        elif site == 1:
+            urls.append(f"https://www.loopnet.com/Listing/{number}-{street}-{city}-{state}/{pick}/")
+        elif site == 2:
+            urls.append(f"https://www.crexi.com/properties/{pick}/{STATE_SLUGS[state]}-{number}-{street.lower()}")
+        else:
+            urls.append(f"https://www.realtor.com/realestateandhomes-detail/{number}-{street}_{city}_{state}_"
+                        f"{zip_code}_M{pick}-{zip_code}?view=qv")
+    return urls
+
+
+def run(count=URLS, repeats=3, seed=0):
+    """Wall time per case (best and median of ``repeats``); one result dict per case"""
+    urls = sample_urls(count, np.random.default_rng(seed))
+    cases = {f"urls.parse.{count}": lambda: parse_urls(urls),
+             f"urls.dedupe.{count}": lambda: ListingIndex().add_many(urls)}
+    results = []
+    for name, func in cases.items():
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+        results.append({"name": name, "size": count, "repeats": repeats, "best_s": min(timings),
+                        "median_s": float(np.median(timings)), "urls_per_s": count / min(timings)})
+    return results
@@ -0,0 +1,4 @@
+"""Deal calculation engine shared by the Streamlit app and headless tools"""
+from calculator.deals import CommercialDeal, ResidentialDeal
+
+__all__ = ["CommercialDeal", "ResidentialDeal"]
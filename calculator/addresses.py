@@ -0,0 +1,342 @@
+"""Listing URL parsing and deduplication: site, listing ID and street address from Zillow, LoopNet, Crexi and Realtor.com links.
+
+    python -m calculator.addresses urls.txt -o unique.csv      # dedupe a scraped URL list, URLs/sec on stderr
+
+Each site puts the address in the path in its own shape:
+
+    zillow.com/homedetails/123-Main-St-Phoenix-AZ-85001/12345678_zpid/
+    loopnet.com/Listing/500-W-Broadway-Tucson-AZ/31234567/
+    crexi.com/properties/654321/arizona-2100-e-camelback-rd
+    realtor.com/realestateandhomes-detail/123-Main-St_Phoenix_AZ_85001_M12345-67890
+
+One compiled pattern splits host and path and one more per site pulls out the
+listing ID and (percent-decoded) address slug; :func:`parse_url` caches recent
+results for the page, :func:`parse_urls` is the uncached batch path.
+:class:`ListingIndex` dedupes millions of URLs in memory: two URLs are the
+same listing when they share a site and listing ID, or when they carry the
+same normalized street address (unit included), state and ZIP (or city),
+which also catches one property listed on two sites.
+
+Hyphenated slugs are split into street and city at the last street suffix or
+unit (``St``, ``#4``, ``Apt 4``). A slug with neither, like the LoopNet one
+above, can't be split: its street line keeps the city ("500 W Broadway
+Tucson, AZ") and it dedupes on the city-less street key (street and city
+words run together, plus the state), which every address with a known city
+also carries.
+"""
+import argparse
+import re
+import sys
+import time
+from functools import lru_cache
+from urllib.parse import unquote
+
+SITES = ("zillow", "loopnet", "crexi", "realtor")
+
+STATE_NAMES = {
+    "alabama": "AL", "alaska": "AK", "arizona": "AZ", "arkansas": "AR", "california": "CA", "colorado": "CO",
+    "connecticut": "CT", "delaware": "DE", "district-of-columbia": "DC", "florida": "FL", "georgia": "GA",
+    "hawaii": "HI", "idaho": "ID", "illinois": "IL", "indiana": "IN", "iowa": "IA", "kansas": "KS",
+    "kentucky": "KY", "louisiana": "LA", "maine": "ME", "maryland": "MD", "massachusetts": "MA",
+    "michigan": "MI", "minnesota": "MN", "mississippi": "MS", "missouri": "MO", "montana": "MT",
+    "nebraska": "NE", "nevada": "NV", "new-hampshire": "NH", "new-jersey": "NJ", "new-mexico": "NM",
+    "new-york": "NY", "north-carolina": "NC", "north-dakota": "ND", "ohio": "OH", "oklahoma": "OK",
+    "oregon": "OR", "pennsylvania": "PA", "rhode-island": "RI", "south-carolina": "SC", "south-dakota": "SD",
+    "tennessee": "TN", "texas": "TX", "utah": "UT", "vermont": "VT", "virginia": "VA", "washington": "WA",
+    "west-virginia": "WV", "wisconsin": "WI", "wyoming": "WY",
+}
+STATE_CODES = frozenset(STATE_NAMES.values())
+
+# USPS street suffixes and directionals: long forms map to the abbreviation used in address keys
+STREET_WORDS = {
+    "STREET": "ST", "AVENUE": "AVE", "AV": "AVE", "ROAD": "RD", "DRIVE": "DR", "BOULEVARD": "BLVD",
+    "LANE": "LN", "COURT": "CT", "PLACE": "PL", "PARKWAY": "PKWY", "HIGHWAY": "HWY", "CIRCLE": "CIR",
+    "TERRACE": "TER", "TRAIL": "TRL", "SQUARE": "SQ", "ALLEY": "ALY", "CROSSING": "XING",
+    "NORTH": "N", "SOUTH": "S", "EAST": "E", "WEST": "W", "APARTMENT": "APT", "SUITE": "STE",
+}
+STREET_SUFFIXES = frozenset({"ST", "AVE", "RD", "DR", "BLVD", "LN", "WAY", "CT", "PL", "PKWY", "HWY", "CIR", "TER",
+                             "TRL", "LOOP", "SQ", "ALY", "PATH", "PIKE", "RUN", "XING", "ROW", "WALK", *STREET_WORDS})
+DIRECTIONS = frozenset({"N", "S", "E", "W", "NE", "NW", "SE", "SW"})
+UNIT_WORDS = frozenset({"APT", "APARTMENT", "UNIT", "STE", "SUITE", "#"})
+_SPLIT_WORDS = STREET_SUFFIXES | UNIT_WORDS
+# Address word -> the word used in keys: street abbreviations, and every unit marker as "#"
+KEY_WORDS = {**STREET_WORDS, **{word: "#" for word in UNIT_WORDS}}
+
+_URL = re.compile(r"\s*https?://(?:www\.)?([^/?#\s]+)([^?#\s]*)", re.IGNORECASE)
+_PATHS = {
+    "zillow": re.compile(r"/(?:homedetails|homes)/([^/]+)(?:/(\d+)_zpid)?", re.IGNORECASE),
+    "loopnet": re.compile(r"/Listing/([^/]+)/(\d+)", re.IGNORECASE),
+    "crexi": re.compile(r"/(?:lease/)?properties/(\d+)/([^/]+)", re.IGNORECASE),
+    "realtor": re.compile(r"/realestateandhomes-detail/([^/]+?)_(M[\d-]+)", re.IGNORECASE),
+}
+# Longest names first, so "west-virginia" wins over "virginia"
+_STATE_PREFIX = re.compile("(" + "|".join(sorted(STATE_NAMES, key=len, reverse=True)) + ")-")
+_NOT_WORD = re.compile(r"[^A-Z0-9#]+")
+_HOSTS = {f"{site}.com": site for site in SITES}
+
+
+def _site(host):
+    site = _HOSTS.get(host)
+    if site is None and "." in host:
+        site = _HOSTS.get(host.split(".", host.count(".") - 1)[-1])
+    return site
+
+
+def _is_zip(word):
+    return len(word) == 5 and word.isdigit()
+
+
+def _is_unit(word):
+    """``#4``: a unit number written as one word"""
+    return word[:1] == "#" and len(word) > 1
+
+
+def _split_street(words):
+    """(street words, city words) after the last unit (``#4``, ``Apt 4``) or street suffix
+
+    A unit number right after the suffix stays with the street. City words
+    are None when there is neither, so the city can't be told from the street.
+    """
+    upper = [word.upper() for word in words]
+    for i in range(len(words) - 1, 0, -1):
+        word = upper[i]
+        if word not in _SPLIT_WORDS and word[:1] != "#":
+            continue
+        if _is_unit(word):
+            return words[:i + 1], words[i + 1:]
+        if word in UNIT_WORDS and i + 1 < len(words):
+            return words[:i + 2], words[i + 2:]
+        if word in STREET_SUFFIXES:
+            end = i + 1
+            if end < len(words) and _is_unit(upper[end]):
+                end += 1
+            elif end + 1 < len(words) and upper[end] in UNIT_WORDS:
+                end += 2
+            return words[:end], words[end:]
+    return words, None
+
+
+def _key_words(words):
+    """Upper-case address words with USPS abbreviations and every unit marker (``#4``, ``Apt 4``) as ``# 4``"""
+    upper = " ".join(words).upper()
+    if not upper.replace(" ", "").isalnum():
+        upper = _NOT_WORD.sub(" ", upper).replace("#", " # ")
+    return " ".join([KEY_WORDS.get(word, word) for word in upper.split()])
+
+
+@lru_cache(maxsize=4096)
+def _city_key(city):
+    """:func:`_key_words` for a city name; there are far fewer cities than addresses"""
+    return _key_words(city.split())
+
+
+def _address(street, city, state, zip_code):
+    """Display address, dedupe key and city-less street key
+
+    Keys need a house number and a state. The key is ``street|state|ZIP or
+    city``, or the street key when there is neither; the street key is
+    ``street city|state``, None when the address is known to have no city.
+    ``city`` is None when the slug couldn't be split (the city, if any, is
+    then still in ``street``).
+    """
+    line = " ".join(street)
+    place = " ".join(part for part in (state, zip_code) if part)
+    address = ", ".join(part for part in (line, " ".join(city or ()), place) if part) or None
+    if not (street and street[0][:1].isdigit() and state):
+        return address, None, None
+    if not (zip_code or city or city is None):
+        return address, None, None
+    words = _key_words(street)
+    street_key = None
+    if city is None:
+        street_key = f"{words}|{state}"
+    elif city:
+        street_key = f"{words} {_city_key(' '.join(city))}|{state}"
+    if zip_code or city:
+        return address, f"{words}|{state}|{zip_code or ' '.join(city).upper()}", street_key
+    return address, street_key, street_key
+
+
+def _hyphen_slug(slug):
+    """Street, city, state and ZIP from ``123-Main-St-Phoenix-AZ-85001`` (ZIP optional; commas mark the city)"""
+    slug = slug.removesuffix("_rb")
+    if "%" in slug:
+        slug = unquote(slug)
+    if "," in slug:
+        slug = slug.replace(",", "-,-")
+    words = [word for word in slug.split("-") if word]
+    zip_code = words.pop() if words and _is_zip(words[-1]) else None
+    state = words.pop().upper() if words and words[-1].upper() in STATE_CODES else None
+    if words and words[-1] == ",":
+        words.pop()
+    if "," in words:
+        comma = words.index(",")
+        street, city = words[:comma], [word for word in words[comma:] if word != ","]
+    else:
+        street, city = _split_street(words)
+    return street, city, state, zip_code
+
+
+def _parse(url):
+    match = _URL.match(url or "")
+    if match is None:
+        return None
+    host, path = match.group(1).lower(), match.group(2).rstrip("/")
+    parsed = {"url": f"https://{host}{path}", "site": _site(host), "listing_id": None, "address": None,
+              "street": None, "city": None, "state": None, "zip_code": None, "key": None, "street_key": None}
+    pattern = _PATHS.get(parsed["site"])
+    found = pattern.search(path) if pattern else None
+    if found is None:
+        return parsed
+
+    site = parsed["site"]
+    if site in ("zillow", "loopnet"):
+        slug, parsed["listing_id"] = found.groups()
+        street, city, state, zip_code = _hyphen_slug(slug)
+    elif site == "crexi":
+        parsed["listing_id"], slug = found.groups()
+        # Crexi slugs are the state's name, then the property name or street address, all lowercase
+        slug, state, city, zip_code = unquote(slug).lower(), None, [], None
+        prefix = _STATE_PREFIX.match(slug)
+        if prefix:
+            slug, state = slug[prefix.end():], STATE_NAMES[prefix.group(1)]
+        street = [word.upper() if word.upper() in DIRECTIONS else word.title() for word in slug.split("-") if word]
+    else:
+        slug, parsed["listing_id"] = found.groups()
+        parts = unquote(slug).split("_")
+        zip_code = parts.pop() if len(parts) > 1 and _is_zip(parts[-1]) else None
+        state = parts.pop().upper() if len(parts) > 1 and parts[-1].upper() in STATE_CODES else None
+        street = parts[0].split("-") if parts else []
+        city = " ".join(parts[1:]).split("-") if len(parts) > 1 else []
+
+    parsed["address"], parsed["key"], parsed["street_key"] = _address(street, city, state, zip_code)
+    parsed["street"] = " ".join(street) or None
+    parsed["city"] = " ".join(city or ()) or None
+    parsed["state"], parsed["zip_code"] = state, zip_code
+    return parsed
+
+
+@lru_cache(maxsize=4096)
+def _cached(url):
+    return _parse(url)
+
+
+def parse_url(url):
+    """Parsed listing URL as a dict, or None when it is not an http(s) URL
+
+    Keys: ``url`` (canonical: https, no ``www.``, query, fragment or trailing
+    slash), ``site`` (one of ``SITES`` or None), ``listing_id``, ``address``
+    ("123 Main St, Phoenix, AZ 85001"), ``street``, ``city``, ``state``,
+    ``zip_code``, ``key`` (the address dedupe key, or None) and ``street_key``
+    (the city-less form of it, or None).
+    """
+    parsed = _cached(url.strip()) if url else None
+    return dict(parsed) if parsed is not None else None
+
+
+def parse_urls(urls):
+    """:func:`parse_url` for a batch, without the cache; one dict (or None) per URL, in order"""
+    return [_parse(url) for url in urls]
+
+
+class ListingIndex:
+    """In-memory dedupe index over listing URLs
+
+    Every URL gets a listing number: the number of an earlier URL with the
+    same site and listing ID, address key or street key, else a new one. Unknown
+    sites fall back to the canonical URL; unparseable input gets -1.
+    """
+
+    def __init__(self):
+        self._by_listing = {}
+        self._by_address = {}
+        self.first_urls = []
+        self.stats = {"urls": 0, "unique": 0, "duplicates": 0, "invalid": 0}
+
+    def __len__(self):
+        return len(self.first_urls)
+
+    def add(self, url):
+        return self.add_many([url])[0]
+
+    def add_many(self, urls):
+        """Listing number per URL, in order"""
+        by_listing, by_address, first_urls = self._by_listing, self._by_address, self.first_urls
+        numbers = []
+        for parsed in parse_urls(urls):
+            if parsed is None:
+                numbers.append(-1)
+                self.stats["invalid"] += 1
+                continue
+            listing = (parsed["site"], parsed["listing_id"]) if parsed["listing_id"] else (None, parsed["url"])
+            address, street = parsed["key"], parsed["street_key"]
+            number = by_listing.get(listing)
+            if number is None and address is not None:
+                number = by_address.get(address)
+            if number is None and street is not None:
+                number = by_address.get(street)
+            if number is None:
+                number = len(first_urls)
+                first_urls.append(parsed["url"])
+            by_listing.setdefault(listing, number)
+            if address is not None:
+                by_address.setdefault(address, number)
+            if street is not None:
+                by_address.setdefault(street, number)
+            numbers.append(number)
+        self.stats["urls"] += len(numbers)
+        self.stats["unique"] = len(first_urls)
+        self.stats["duplicates"] = self.stats["urls"] - self.stats["invalid"] - self.stats["unique"]
+        return numbers
+
+
+def read_urls(path, chunk_size=100_000):
+    """Non-blank lines of a text file, ``chunk_size`` at a time"""
+    chunk = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                chunk.append(line)
+                if len(chunk) >= chunk_size:
+                    yield chunk
+                    chunk = []
+    if chunk:
+        yield chunk
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m calculator.addresses",
+                                     description="Parse and dedupe listing URLs (Zillow, LoopNet, Crexi, Realtor.com)")
+    parser.add_argument("input", help="text file with one listing URL per line")
+    parser.add_argument("-o", "--output", help="CSV of unique listings to write (first URL of each, with its address)")
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    args = parser.parse_args(argv)
+
+    index = ListingIndex()
+    unique = {}
+    start = time.perf_counter()
+    for chunk in read_urls(args.input, args.chunk_size):
+        for url, number in zip(chunk, index.add_many(chunk)):
+            if number >= 0 and number not in unique:
+                unique[number] = url
+        elapsed = time.perf_counter() - start
+        print(f"{index.stats['urls']:,} URLs  {index.stats['urls'] / elapsed:,.0f} URLs/sec", file=sys.stderr)
+    seconds = time.perf_counter() - start
+
+    if args.output:
+        import csv
+        fields = ["url", "site", "listing_id", "address", "street", "city", "state", "zip_code"]
+        with open(args.output, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=fields, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(parse_urls(unique.values()))
+    stats = index.stats
+    print(f"{stats['urls']:,} URLs -> {stats['unique']:,} listings ({stats['duplicates']:,} duplicates, "
+          f"{stats['invalid']:,} invalid) in {seconds:.2f}s ({stats['urls'] / seconds if seconds else 0:,.0f} URLs/sec)",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
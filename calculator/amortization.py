@@ -0,0 +1,70 @@
+"""Closed-form amortization schedules.
+
+Balances come straight from the annuity formula (the same -FV(rate, k, -pmt, loan)
+the screening workbooks use) instead of iterating payment by payment, so a full
+360-payment schedule, or one per listing, is a single NumPy pass.
+"""
+import numpy as np
+
+from calculator.deals import monthly_payment
+
+
+def balance_after(loan_amount, annual_rate, loan_years, payments_made):
+    """Remaining balance after ``payments_made`` monthly payments"""
+    loan_amount = np.asarray(loan_amount, dtype=float)
+    monthly_rate = np.asarray(annual_rate, dtype=float) / 12
+    num_payments = np.asarray(loan_years) * 12
+    k = np.minimum(np.asarray(payments_made, dtype=float), num_payments)
+    payment = np.asarray(monthly_payment(loan_amount, annual_rate, loan_years))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        growth = (1 + monthly_rate) ** k
+        balance = loan_amount * growth - payment * (growth - 1) / monthly_rate
+    balance = np.where(monthly_rate == 0, loan_amount - payment * k, balance)
+    # Clear the float dust left on the final payment
+    return np.where(k >= num_payments, 0.0, balance)
+
+
+def schedule(loan_amount, annual_rate, loan_years):
+    """Every payment of the loan as arrays: payment number, principal, interest, balance
+
+    Scalar inputs give 1-D arrays of length ``loan_years * 12``. Array inputs give
+    arrays of shape ``inputs.shape + (max_payments,)``; payments past a shorter
+    loan's term are zero.
+    """
+    loan_amount = np.asarray(loan_amount, dtype=float)
+    annual_rate = np.asarray(annual_rate, dtype=float)
+    loan_years = np.asarray(loan_years)
+    num_payments = loan_years * 12
+    max_payments = int(np.max(num_payments))
+
+    k = np.arange(1, max_payments + 1)
+    expand = (...,) + (None,)
+    payment = np.asarray(monthly_payment(loan_amount, annual_rate, loan_years))[expand]
+    balance = balance_after(loan_amount[expand], annual_rate[expand], loan_years[expand], k)
+    previous = balance_after(loan_amount[expand], annual_rate[expand], loan_years[expand], k - 1)
+    interest = previous * (annual_rate[expand] / 12)
+    active = k <= num_payments[expand]
+    return {
+        "Payment": k,
+        "Principal": np.where(active, payment - interest, 0.0),
+        "Interest": np.where(active, interest, 0.0),
+        "Balance": balance,
+    }
+
+
+def annual_summary(sched):
+    """Roll a schedule up to loan years: principal and interest paid, year-end balance"""
+    months = sched["Balance"].shape[-1]
+    years = -(-months // 12)
+    pad = years * 12 - months
+
+    def by_year(values):
+        values = np.pad(values, [(0, 0)] * (values.ndim - 1) + [(0, pad)])
+        return values.reshape(values.shape[:-1] + (years, 12))
+
+    return {
+        "Year": np.arange(1, years + 1),
+        "Principal": by_year(sched["Principal"]).sum(axis=-1),
+        "Interest": by_year(sched["Interest"]).sum(axis=-1),
+        "Balance": sched["Balance"][..., np.minimum(np.arange(1, years + 1) * 12, months) - 1],
+    }
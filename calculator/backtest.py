@@ -0,0 +1,320 @@
+"""Historical rate backtests: re-run deals as if financed in every month since 1971.
+
+    python -m calculator.backtest --fetch                       # download PMMS, write data/mortgage_rates.csv
+    python -m calculator.backtest --fetch PMMS_history.csv      # same, from a file downloaded by hand
+    python -m calculator.backtest deals.csv                     # cash flow by rate regime
+    python -m calculator.backtest deals.csv --start 2000-01 -o per-deal.csv
+
+The history (``data/mortgage_rates.csv``) is Freddie Mac's PMMS 30-year fixed
+rate, a weekly survey averaged to calendar months (``--fetch`` reads
+Freddie Mac's ``PMMS_history.csv`` or FRED's ``MORTGAGE30US`` download). It is
+written once as a ``.npy`` structured array (``data/mortgage_rates.npy``, or
+``RATE_HISTORY_PATH``) that every process memory-maps; it is rebuilt whenever
+the CSV is newer. Rows are consecutive months, so a date resolves to a row by
+subtraction. There is no public commercial series to bundle; commercial rates
+are the residential rate plus ``COMMERCIAL_SPREAD``.
+
+A backtest swaps each deal's interest rate for the rate of every month in the
+window and keeps every other input, so N deals x M months are one broadcast
+``(N, 1) x (1, M)`` evaluation of the deal formulas. Results are annual cash
+flow and cash-on-cash (the Annual ROI at 90% occupancy for residential deals).
+"""
+import argparse
+import csv
+import os
+import sys
+import urllib.request
+from functools import lru_cache
+
+import numpy as np
+
+from calculator.deals import OCCUPANCY_RATES
+from calculator.params import (COMMERCIAL_DEFAULTS, PROPERTY_TYPES, RESIDENTIAL_DEFAULTS, commercial_deal,
+                               param_columns, residential_deal)
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+SOURCE_PATH = os.path.join(DATA_DIR, "mortgage_rates.csv")
+DEFAULT_PATH = os.path.join(DATA_DIR, "mortgage_rates.npy")
+# Commercial mortgages have priced roughly 50-100 bp over the residential 30-year; 75 bp is the midpoint
+COMMERCIAL_SPREAD = 0.75
+HISTORY_DTYPE = np.dtype([("month", "M8[M]"), ("residential", "f8"), ("commercial", "f8")])
+PMMS_URL = "https://www.freddiemac.com/pmms/docs/PMMS_history.csv"
+# Date and 30-year rate columns of the sources monthly_rates reads: this module's monthly CSV,
+# Freddie Mac's PMMS history and FRED's MORTGAGE30US download
+DATE_COLUMNS = ("month", "date", "observation_date", "DATE")
+RATE_COLUMNS = ("residential_30y", "pmms30", "MORTGAGE30US")
+
+# Rate regimes by the month's rate, in percent: [low, high)
+REGIME_EDGES = (0.0, 4.0, 6.0, 8.0, 10.0, np.inf)
+REGIME_LABELS = ("Under 4%", "4-6%", "6-8%", "8-10%", "10%+")
+
+BUILDERS = {"Residential": residential_deal, "Commercial": commercial_deal}
+DEFAULTS = {"Residential": RESIDENTIAL_DEFAULTS, "Commercial": COMMERCIAL_DEFAULTS}
+RATE_PARAMS = {"Residential": "interest_rate", "Commercial": "comm_interest_rate"}
+DEFAULT_OCCUPANCY = 0.90
+
+
+def _month(text):
+    """Calendar month of ``1990-01``, ``1990-01-05`` or ``1/5/1990``"""
+    text = text.strip()
+    if "/" in text:
+        month, _, year = text.split("/")
+        text = f"{year}-{int(month):02d}"
+    return np.datetime64(text[:7], "M")
+
+
+def monthly_rates(source):
+    """``(months, rates)`` from a rate CSV, averaging the weekly readings of each calendar month"""
+    with open(source, newline="") as f:
+        reader = csv.DictReader(line for line in f if not line.startswith("#"))
+        fields = reader.fieldnames or ()
+        date_column = next((name for name in DATE_COLUMNS if name in fields), None)
+        rate_column = next((name for name in RATE_COLUMNS if name in fields), None)
+        if date_column is None or rate_column is None:
+            raise ValueError(f"{source} needs a date column (one of {DATE_COLUMNS}) "
+                             f"and a 30-year rate column (one of {RATE_COLUMNS})")
+        months, rates = [], []
+        for row in reader:
+            rate = (row[rate_column] or "").strip()
+            # FRED writes "." for a week without a reading
+            if rate in ("", "."):
+                continue
+            months.append(_month(row[date_column]))
+            rates.append(float(rate))
+    if not months:
+        raise ValueError(f"{source} has no rates")
+    months, inverse, counts = np.unique(np.array(months, dtype="M8[M]"), return_inverse=True, return_counts=True)
+    gaps = np.flatnonzero(np.diff(months).astype(int) != 1)
+    if len(gaps):
+        raise ValueError(f"{source} has no rate for the month after {months[gaps[0]]}")
+    return months, np.bincount(inverse, weights=rates) / counts
+
+
+def fetch_history(source=PMMS_URL, output=SOURCE_PATH):
+    """Average a weekly PMMS file (URL or path) to months and write it as the history CSV; returns the months"""
+    if source.startswith(("http://", "https://")):
+        download = f"{output}.{os.getpid()}.download"
+        try:
+            urllib.request.urlretrieve(source, download)
+            months, rates = monthly_rates(download)
+        finally:
+            if os.path.exists(download):
+                os.remove(download)
+    else:
+        months, rates = monthly_rates(source)
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    partial = f"{output}.{os.getpid()}.tmp"
+    with open(partial, "w", newline="") as f:
+        f.write("# Freddie Mac Primary Mortgage Market Survey (PMMS): U.S. 30-year fixed-rate mortgage, percent\n"
+                f"# Monthly averages of the weekly survey from {source}; written by python -m calculator.backtest --fetch\n")
+        writer = csv.writer(f)
+        writer.writerow(["month", "residential_30y"])
+        writer.writerows([str(month), f"{rate:.3f}"] for month, rate in zip(months, rates))
+    os.replace(partial, output)
+    return months
+
+
+def build_history(source=SOURCE_PATH, output=DEFAULT_PATH, spread=COMMERCIAL_SPREAD):
+    """Read the monthly (or weekly) rate CSV, write it as a ``.npy`` file and return it opened"""
+    months, rates = monthly_rates(source)
+    history = np.zeros(len(months), dtype=HISTORY_DTYPE)
+    history["month"] = months
+    history["residential"] = rates
+    history["commercial"] = history["residential"] + spread
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    # Write then rename, so a process memory-mapping the old file never sees a partial one
+    partial = f"{output}.{os.getpid()}.tmp"
+    with open(partial, "wb") as f:
+        np.save(f, history)
+    os.replace(partial, output)
+    return RateHistory.open(output)
+
+
+class RateHistory:
+    """Monthly residential and commercial mortgage rates (percent), one row per consecutive month"""
+
+    def __init__(self, history, path=None):
+        self.history = history
+        self.path = path
+
+    @classmethod
+    def open(cls, path):
+        """Memory-map a history written by :func:`build_history`"""
+        history = np.load(path, mmap_mode="r")
+        if history.dtype != HISTORY_DTYPE:
+            raise ValueError(f"Rate history {path} has dtype {history.dtype}, expected {HISTORY_DTYPE}")
+        return cls(history, path=path)
+
+    def __repr__(self):
+        return f"RateHistory({self.first} to {self.last}, path={self.path!r})"
+
+    def __len__(self):
+        return len(self.history)
+
+    @property
+    def first(self):
+        return self.history["month"][0]
+
+    @property
+    def last(self):
+        return self.history["month"][-1]
+
+    def index(self, months):
+        """Row of each month (``"1990-01"`` or a date in it); raises KeyError outside the history"""
+        rows = (np.asarray(months, dtype="M8[M]") - self.first).astype(int)
+        if np.any((rows < 0) | (rows >= len(self))):
+            raise KeyError(f"Months outside the rate history ({self.first} to {self.last})")
+        return rows
+
+    def rates(self, property_type, months):
+        """Rate in percent for each month"""
+        return np.asarray(self.history[property_type.lower()][self.index(months)])
+
+    def window(self, start=None, end=None):
+        """Rows from ``start`` to ``end`` (inclusive months; default the whole history)"""
+        first = 0 if start is None else int(self.index(start))
+        last = len(self) - 1 if end is None else int(self.index(end))
+        return self.history[first:last + 1]
+
+
+@lru_cache(maxsize=None)
+def rate_history(path=None):
+    """The process-wide history, built from the history CSV the first time (or when it's stale or outdated)
+
+    Raises FileNotFoundError when there is no usable history and no CSV to build it from.
+    """
+    path = path or os.environ.get("RATE_HISTORY_PATH") or DEFAULT_PATH
+    has_source = os.path.exists(SOURCE_PATH)
+    if os.path.exists(path) and not (has_source and os.path.getmtime(SOURCE_PATH) > os.path.getmtime(path)):
+        try:
+            return RateHistory.open(path)
+        except ValueError:
+            pass
+    if not has_source:
+        raise FileNotFoundError("No mortgage-rate history yet: run `python -m calculator.backtest --fetch` "
+                                f"to write {os.path.relpath(SOURCE_PATH)} from Freddie Mac's PMMS")
+    return build_history(output=path)
+
+
+def backtest(property_type, deals, start=None, end=None, history=None):
+    """Every deal re-run at every month's rate in the window
+
+    ``deals`` is a list of query-param mappings (missing or blank values are
+    defaults). Returns ``months`` and ``rates`` (M,), the deals' own ``quoted_rate``
+    (N,), and ``annual_cash_flow`` and ``cash_on_cash`` (percent) shaped (N, M).
+    """
+    if property_type not in PROPERTY_TYPES:
+        raise ValueError(f"property_type must be one of {PROPERTY_TYPES}, got {property_type!r}")
+    window = (history or rate_history()).window(start, end)
+    rates = np.asarray(window[property_type.lower()])
+    columns = {name: values[:, None] for name, values in param_columns(deals, DEFAULTS[property_type]).items()}
+    quoted = columns[RATE_PARAMS[property_type]][:, 0]
+    columns[RATE_PARAMS[property_type]] = rates[None, :]
+    deal = BUILDERS[property_type](columns)
+    if property_type == "Residential":
+        scenario = OCCUPANCY_RATES.index(DEFAULT_OCCUPANCY)
+        annual_cash_flow = deal.cash_flows[..., scenario] * 12
+        cash_on_cash = deal.annual_returns[..., scenario]
+    else:
+        annual_cash_flow = deal.annual_cash_flow
+        cash_on_cash = deal.cash_on_cash_return
+    shape = (len(deals), len(rates))
+    return {
+        "months": np.asarray(window["month"]),
+        "rates": rates,
+        "quoted_rate": quoted,
+        "annual_cash_flow": np.broadcast_to(annual_cash_flow, shape),
+        "cash_on_cash": np.broadcast_to(cash_on_cash, shape),
+    }
+
+
+def regimes(result, edges=REGIME_EDGES, labels=REGIME_LABELS):
+    """Distribution of annual cash flow and cash-on-cash across deals and months, one row per rate regime"""
+    import pandas as pd
+    codes = np.digitize(result["rates"], edges[1:-1])
+    rows = []
+    for code, label in enumerate(labels):
+        in_regime = codes == code
+        if not in_regime.any():
+            continue
+        cash_flow = result["annual_cash_flow"][:, in_regime]
+        coc = result["cash_on_cash"][:, in_regime]
+        cf_p10, cf_p50, cf_p90 = np.percentile(cash_flow, (10, 50, 90))
+        coc_p10, coc_p50, coc_p90 = np.percentile(coc, (10, 50, 90))
+        rows.append({
+            "regime": label,
+            "months": int(in_regime.sum()),
+            "min_rate": float(result["rates"][in_regime].min()),
+            "max_rate": float(result["rates"][in_regime].max()),
+            "positive_share": float((cash_flow >= 0).mean()),
+            "cash_flow_p10": cf_p10, "cash_flow_p50": cf_p50, "cash_flow_p90": cf_p90,
+            "cash_on_cash_p10": coc_p10, "cash_on_cash_p50": coc_p50, "cash_on_cash_p90": coc_p90,
+        })
+    return pd.DataFrame(rows)
+
+
+def deal_summary(result):
+    """Per-deal results across the window: share of months with positive cash flow, worst/median/best"""
+    cash_flow = result["annual_cash_flow"]
+    worst = np.argmin(cash_flow, axis=1)
+    return {
+        "quoted_rate": result["quoted_rate"],
+        "positive_share": (cash_flow >= 0).mean(axis=1),
+        "worst_cash_flow": cash_flow.min(axis=1),
+        "median_cash_flow": np.median(cash_flow, axis=1),
+        "best_cash_flow": cash_flow.max(axis=1),
+        "worst_month": result["months"][worst],
+        "worst_rate": result["rates"][worst],
+        "median_cash_on_cash": np.median(result["cash_on_cash"], axis=1),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m calculator.backtest",
+                                     description="Re-run deals at every historical month's mortgage rate")
+    parser.add_argument("input", nargs="?", help="CSV of deals (query-param columns and an optional property_type)")
+    parser.add_argument("--start", help="first origination month, e.g. 1990-01")
+    parser.add_argument("--end", help="last origination month")
+    parser.add_argument("-o", "--output", help="CSV of per-deal results to write")
+    parser.add_argument("--fetch", nargs="?", const=PMMS_URL, metavar="SOURCE",
+                        help=f"rebuild {os.path.relpath(SOURCE_PATH)} from weekly PMMS rates (a URL or file; "
+                             "default: Freddie Mac's history)")
+    args = parser.parse_args(argv)
+    if args.fetch:
+        months = fetch_history(args.fetch)
+        print(f"Wrote {len(months)} months ({months[0]} to {months[-1]}) to {SOURCE_PATH}", file=sys.stderr)
+        if not args.input:
+            return 0
+    elif not args.input:
+        parser.error("pass a deals CSV or --fetch")
+    try:
+        history = rate_history()
+    except FileNotFoundError as exc:
+        parser.exit(1, f"{exc}\n")
+
+    import time
+    import pandas as pd
+    from calculator.export import read_deals
+    deals = read_deals(args.input)
+    frames = []
+    for property_type in PROPERTY_TYPES:
+        rows = [i for i, deal in enumerate(deals) if deal["property_type"] == property_type]
+        if not rows:
+            continue
+        started = time.perf_counter()
+        result = backtest(property_type, [deals[i]["inputs"] for i in rows], args.start, args.end, history)
+        seconds = time.perf_counter() - started
+        print(f"{property_type}: {len(rows):,} deals x {len(result['months'])} months in {seconds:.2f}s "
+              f"({result['months'][0]} to {result['months'][-1]})", file=sys.stderr)
+        print(regimes(result).to_string(index=False, float_format="{:,.2f}".format))
+        summary = pd.DataFrame(deal_summary(result))
+        summary.insert(0, "name", [deals[i].get("name") for i in rows])
+        summary.insert(0, "property_type", property_type)
+        frames.append(summary)
+    if args.output and frames:
+        pd.concat(frames, ignore_index=True).to_csv(args.output, index=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
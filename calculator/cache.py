@@ -0,0 +1,165 @@
+"""Input-keyed result cache shared across Streamlit sessions.
+
+Keys are built from the same values that live in ``st.query_params``, normalized
+so ``"650000"``, ``650000`` and ``650000.0`` hit the same entry; everyone who
+opens the same shared link is served the same cached results. Sessions that
+must not see each other's changes get copies (``ResultCache(copy=copy_value)``).
+"""
+import copy
+import sys
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+import numpy as np
+
+_MISSING = object()
+
+
+def canonical(value):
+    """Canonical, hashable form of one input value"""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, str):
+        value = value.strip()
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return value if isinstance(value, (str, int, float, tuple)) else repr(value)
+    if np.isfinite(number) and number == int(number):
+        return str(int(number))
+    return repr(number)
+
+
+def normalize_params(params):
+    """Sorted tuple of (name, canonical value) pairs for a query-param style mapping"""
+    return tuple(sorted((name, canonical(value)) for name, value in params.items()))
+
+
+def copy_value(value):
+    """Copy of a cached result that one caller can change without changing it for the others
+
+    DataFrames and Plotly figures are copied, arrays come back as read-only
+    views, tuples, lists and dicts are copied item by item and anything else
+    (deal objects) is copied shallowly.
+    """
+    if isinstance(value, (str, bytes, int, float, bool, type(None))):
+        return value
+    if isinstance(value, np.ndarray):
+        view = value.view()
+        view.flags.writeable = False
+        return view
+    if isinstance(value, tuple):
+        return tuple(copy_value(item) for item in value)
+    if isinstance(value, list):
+        return [copy_value(item) for item in value]
+    if isinstance(value, dict):
+        return {name: copy_value(item) for name, item in value.items()}
+    # Neither library is imported until the app builds its first table or chart
+    pandas = sys.modules.get("pandas")
+    if pandas is not None and isinstance(value, (pandas.DataFrame, pandas.Series)):
+        return value.copy()
+    plotly = sys.modules.get("plotly.basedatatypes")
+    if plotly is not None and isinstance(value, plotly.BaseFigure):
+        # The cached figure was validated when it was built; rebuilding from its dict skips that (~5x faster)
+        return type(value)(value.to_dict(), _validate=False)
+    return copy.copy(value)
+
+
+class ResultCache:
+    """Thread-safe LRU cache with an optional time-to-live and hit/miss counters
+
+    With ``copy`` (e.g. :func:`copy_value`) every lookup returns ``copy(value)``
+    instead of the stored object.
+    """
+
+    def __init__(self, maxsize=256, ttl=None, clock=time.monotonic, copy=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.copy = copy
+        self._clock = clock
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            value = _MISSING
+            if entry is not _MISSING:
+                stored_at, value = entry
+                if self.ttl is None or self._clock() - stored_at < self.ttl:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                else:
+                    value = _MISSING
+                    del self._data[key]
+                    self.expirations += 1
+            if value is _MISSING:
+                self.misses += 1
+                return default
+        return self.copy(value) if self.copy else value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = (self._clock(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        """Cached value for ``key``, computing and storing it on a miss
+
+        ``compute`` runs outside the lock so one slow build never blocks other sessions.
+        """
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.put(key, value)
+            if self.copy:
+                value = self.copy(value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+def memoize(cache, namespace=None):
+    """Decorator caching a function's result in ``cache`` under its normalized arguments"""
+    def decorator(func):
+        name = namespace or func.__qualname__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (name, tuple(canonical(a) for a in args), normalize_params(kwargs))
+            return cache.get_or_compute(key, lambda: func(*args, **kwargs))
+
+        wrapper.cache = cache
+        return wrapper
+    return decorator
@@ -0,0 +1,209 @@
+"""Residential and commercial deal formulas.
+
+Every input may be a scalar or a NumPy array; inputs broadcast against each
+other and every metric comes back with the broadcast shape. Scalar inputs give
+NumPy scalars back so the Streamlit page can format them directly.
+
+Percentages are taken in the same units the sidebar and query params use
+(``down_payment=20`` means 20%, ``interest_rate=6.5`` means 6.5%). Tax and
+insurance rates come from :mod:`calculator.rates`; an optional ``zip_code``
+uses the ZIP/county rate store and falls back to the state rate.
+"""
+import numpy as np
+
+from calculator import rates
+
+# Residential assumptions
+RESIDENTIAL_INSURANCE_RATE = 0.01  # 1% of purchase price per year
+RESIDENTIAL_PM_FEE_RATE = 0.10  # 10% of monthly rent
+RESIDENTIAL_MAINTENANCE = 250  # flat monthly maintenance
+OCCUPANCY_RATES = (0.75, 0.90, 1.0)
+
+# Commercial assumptions
+COMMERCIAL_PM_FEE_RATE = 0.04  # 4% of gross rents
+CLOSING_COST_RATE = 0.03  # Excel J3=H3*0.03
+
+
+def _scalar(value):
+    """Unwrap 0-d arrays into NumPy scalars, leave everything else alone"""
+    return value[()] if isinstance(value, np.ndarray) and value.ndim == 0 else value
+
+
+def monthly_payment(loan_amount, annual_rate, loan_years):
+    """Monthly principal & interest payment for a fully amortizing loan
+
+    ``annual_rate`` is a decimal (0.065). A zero rate falls back to straight-line
+    repayment instead of dividing by zero.
+    """
+    loan_amount = np.asarray(loan_amount, dtype=float)
+    monthly_rate = np.asarray(annual_rate, dtype=float) / 12
+    num_payments = np.asarray(loan_years) * 12
+    with np.errstate(divide="ignore", invalid="ignore"):
+        growth = (1 + monthly_rate) ** num_payments
+        payment = loan_amount * (monthly_rate * growth) / (growth - 1)
+        payment = np.where(monthly_rate == 0, loan_amount / num_payments, payment)
+    return _scalar(payment)
+
+
+class ResidentialDeal:
+    """Monthly expenses, occupancy scenarios and ROI for a residential (1-4 unit) deal"""
+
+    def __init__(self, purchase_price, down_payment, interest_rate, loan_years, monthly_rent, state, zip_code=None):
+        purchase_price = np.asarray(purchase_price, dtype=float)
+        monthly_rent = np.asarray(monthly_rent, dtype=float)
+
+        self.purchase_price = _scalar(purchase_price)
+        self.monthly_rent = _scalar(monthly_rent)
+        self.down_payment_pct = _scalar(np.asarray(down_payment, dtype=float) / 100)
+        self.interest_rate = _scalar(np.asarray(interest_rate, dtype=float) / 100)
+        self.loan_years = _scalar(np.asarray(loan_years))
+        self.state = _scalar(np.asarray(state))
+        self.tax_rate = rates.lookup("tax", state, zip_code)
+
+        # Loan
+        self.amount_down = _scalar(purchase_price * self.down_payment_pct)
+        self.loan_amount = _scalar(purchase_price * (1 - self.down_payment_pct))
+        self.monthly_rate = _scalar(self.interest_rate / 12)
+        self.num_payments = _scalar(self.loan_years * 12)
+
+        # Monthly Principal & Interest Payment
+        self.monthly_pi = monthly_payment(self.loan_amount, self.interest_rate, self.loan_years)
+
+        # Other monthly costs
+        self.monthly_insurance = _scalar((purchase_price * RESIDENTIAL_INSURANCE_RATE) / 12)
+        self.monthly_tax = _scalar((purchase_price * self.tax_rate) / 12)
+        self.pm_fee = _scalar(monthly_rent * RESIDENTIAL_PM_FEE_RATE)
+        self.maintenance = RESIDENTIAL_MAINTENANCE
+
+        self.total_monthly = _scalar(
+            self.monthly_pi + self.monthly_insurance + self.monthly_tax + self.pm_fee + self.maintenance
+        )
+
+        # Cash flow at each occupancy scenario, stacked on the last axis
+        self.cash_flows = np.stack([self.cash_flow(rate) for rate in OCCUPANCY_RATES], axis=-1)
+        self.annual_returns = np.stack([self.annual_return(rate) for rate in OCCUPANCY_RATES], axis=-1)
+
+    def cash_flow(self, occupancy):
+        """Monthly cash flow at the given occupancy rate (0-1)"""
+        monthly_income = self.monthly_rent * np.asarray(occupancy, dtype=float)
+        return _scalar(monthly_income - self.total_monthly)
+
+    def annual_return(self, occupancy):
+        """Annual ROI on the down payment, in percent; 0 when nothing is put down"""
+        cash_flow = np.asarray(self.cash_flow(occupancy))
+        cash_down = np.asarray(self.purchase_price * self.down_payment_pct)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            annual = (cash_flow * 12) / cash_down * 100
+        return _scalar(np.where(cash_down > 0, annual, 0.0))
+
+    def expenses(self):
+        """Monthly expense line items in display order"""
+        return {
+            "Principal & Interest": self.monthly_pi,
+            "Insurance": self.monthly_insurance,
+            "Property Tax": self.monthly_tax,
+            "Property Management": self.pm_fee,
+            "Maintenance": self.maintenance,
+        }
+
+    def metrics(self):
+        """Flat dict of every output, one array (or scalar) per metric"""
+        result = {
+            "loan_amount": self.loan_amount,
+            "amount_down": self.amount_down,
+            "monthly_pi": self.monthly_pi,
+            "monthly_insurance": self.monthly_insurance,
+            "monthly_tax": self.monthly_tax,
+            "pm_fee": self.pm_fee,
+            "maintenance": self.maintenance,
+            "total_monthly": self.total_monthly,
+        }
+        for i, rate in enumerate(OCCUPANCY_RATES):
+            pct = int(round(rate * 100))
+            result[f"cash_flow_{pct}"] = _scalar(self.cash_flows[..., i])
+            result[f"annual_roi_{pct}"] = _scalar(self.annual_returns[..., i])
+        return result
+
+
+class CommercialDeal:
+    """NOI, debt service and cash-on-cash for a commercial (5+ unit) deal
+
+    Mirrors the formulas in ``Commercial_Prop_Screening_Tool.xlsx``.
+    """
+
+    def __init__(self, purchase_price, down_payment, annual_gross_rents, vacancy_rate,
+                 other_expenses, interest_rate, loan_years, state, annual_noi_listing=None, zip_code=None):
+        purchase_price = np.asarray(purchase_price, dtype=float)
+        annual_gross_rents = np.asarray(annual_gross_rents, dtype=float)
+
+        self.purchase_price = _scalar(purchase_price)
+        self.annual_gross_rents = _scalar(annual_gross_rents)
+        self.annual_noi_listing = annual_noi_listing
+        self.down_payment_pct = _scalar(np.asarray(down_payment, dtype=float) / 100)
+        self.vacancy_rate = _scalar(np.asarray(vacancy_rate, dtype=float) / 100)
+        self.other_expenses = _scalar(np.asarray(other_expenses, dtype=float))
+        self.interest_rate = _scalar(np.asarray(interest_rate, dtype=float) / 100)
+        self.loan_years = _scalar(np.asarray(loan_years))
+        self.state = _scalar(np.asarray(state))
+        self.tax_rate = rates.lookup("commercial_tax", state, zip_code)
+        self.insurance_rate = rates.lookup("commercial_insurance", state, zip_code)
+
+        # Amount down =H3*H5 and closing costs =H3*0.03
+        self.amount_down = _scalar(purchase_price * self.down_payment_pct)
+        self.closing_costs = _scalar(purchase_price * CLOSING_COST_RATE)
+        self.total_cash_down = _scalar(self.amount_down + self.closing_costs)
+
+        # Annual operating expenses (J8:J11)
+        self.annual_insurance = _scalar(purchase_price * self.insurance_rate)
+        self.annual_property_tax = _scalar(purchase_price * self.tax_rate)
+        self.annual_pm_fee = _scalar(annual_gross_rents * COMMERCIAL_PM_FEE_RATE)
+        self.total_operating_expenses = _scalar(
+            self.annual_insurance + self.annual_property_tax + self.annual_pm_fee + self.other_expenses
+        )
+
+        # NOI Estimated: =(K4*(1-L5))-SUM(J8:J11)
+        self.adjusted_gross_income = _scalar(annual_gross_rents * (1 - self.vacancy_rate))
+        self.noi_estimated = _scalar(self.adjusted_gross_income - self.total_operating_expenses)
+
+        # Loan and annual debt service
+        self.loan_amount = _scalar(purchase_price - self.amount_down)
+        self.monthly_rate = _scalar(self.interest_rate / 12)
+        self.num_payments = _scalar(self.loan_years * 12)
+        self.monthly_payment = monthly_payment(self.loan_amount, self.interest_rate, self.loan_years)
+        self.annual_debt_service = _scalar(self.monthly_payment * 12)
+
+        # Cash flow =L8-L9 and cash-on-cash =L10/L11
+        self.annual_cash_flow = _scalar(self.noi_estimated - self.annual_debt_service)
+        total_cash_down = np.asarray(self.total_cash_down)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            coc = (np.asarray(self.annual_cash_flow) / total_cash_down) * 100
+        self.cash_on_cash_return = _scalar(np.where(total_cash_down > 0, coc, 0.0))
+
+    def expenses(self):
+        """Annual expense line items in display order"""
+        return {
+            "Purchase Loan P&I": self.annual_debt_service,
+            "Property Insurance Insurance": self.annual_insurance,
+            "Property Taxes": self.annual_property_tax,
+            "PM Fee": self.annual_pm_fee,
+            "All Other Operating Expenses": self.other_expenses,
+        }
+
+    def metrics(self):
+        """Flat dict of every output, one array (or scalar) per metric"""
+        return {
+            "amount_down": self.amount_down,
+            "closing_costs": self.closing_costs,
+            "total_cash_down": self.total_cash_down,
+            "annual_insurance": self.annual_insurance,
+            "annual_property_tax": self.annual_property_tax,
+            "annual_pm_fee": self.annual_pm_fee,
+            "total_operating_expenses": self.total_operating_expenses,
+            "adjusted_gross_income": self.adjusted_gross_income,
+            "noi_estimated": self.noi_estimated,
+            "loan_amount": self.loan_amount,
+            "monthly_payment": self.monthly_payment,
+            "annual_debt_service": self.annual_debt_service,
+            "annual_cash_flow": self.annual_cash_flow,
+            "cash_on_cash_return": self.cash_on_cash_return,
+        }
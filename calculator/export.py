@@ -0,0 +1,691 @@
+"""Deal reports for sharing outside the app: an XLSX or PDF per deal, or one portfolio workbook.
+
+    python -m calculator.export deals.csv reports/ --format xlsx --workers 4
+    python -m calculator.export deals.csv portfolio.xlsx --format portfolio
+
+Per-deal workbooks follow the layout of ``Residential_Prop_Screening_Tool.xlsx``
+and ``Commercial_Prop_Screening_Tool.xlsx`` (inputs and the monthly breakdown
+in B1:M12, the amortization schedule from row 13) with the engine's values in
+place of formulas, plus a hold-period projection sheet. Workbooks are written
+with openpyxl's write-only mode, which streams rows to disk instead of holding
+a cell grid in memory, and PDFs are written directly as one page of text, so no
+PDF library is needed. Deals are scored a chunk at a time in one vectorized
+pass, and chunks are rendered in parallel when an executor is given.
+
+Deals are dicts shaped like :meth:`DealLibrary.get` rows: ``property_type``,
+``inputs`` (query-param names; blanks take the app defaults) and an optional
+``name``.
+"""
+import argparse
+import datetime
+import io
+import os
+import re
+import sys
+import time
+import zipfile
+import zlib
+from xml.sax.saxutils import escape
+
+import numpy as np
+
+from calculator.amortization import annual_summary, schedule
+from calculator.params import (COMMERCIAL_DEFAULTS, PROPERTY_TYPES, RESIDENTIAL_DEFAULTS, commercial_deal,
+                               residential_deal)
+from calculator.proforma import DEFAULT_HOLD_YEARS, SUMMARY, commercial_proforma, residential_proforma
+from calculator.solver import commercial_targets, residential_targets
+
+FORMATS = ("xlsx", "pdf")
+CHUNK_SIZE = 25  # deals per pool task: large enough to vectorize, small enough to spread
+
+BUILDERS = {"Residential": residential_deal, "Commercial": commercial_deal}
+TARGETS = {"Residential": residential_targets, "Commercial": commercial_targets}
+PROFORMAS = {"Residential": residential_proforma, "Commercial": commercial_proforma}
+SHEETS = {"Residential": "BuyRent Calculator", "Commercial": "Apartment Investment"}
+DEFAULTS = {**RESIDENTIAL_DEFAULTS, **COMMERCIAL_DEFAULTS}
+
+# Number formats of the screening workbooks
+MONEY = '_("$"* #,##0.00_);_("$"* \\(#,##0.00\\);_("$"* "-"??_);_(@_)'
+PERCENT = "0.00%"
+RATE = "0.000%"
+WHOLE = "0"
+DATE = "mm-dd-yy"
+MULTIPLE = '0.00"x"'
+
+# Summary lines shared by the XLSX side panel and the PDF: (label, report key, format)
+RESIDENTIAL_LINES = {
+    "Deal": [
+        ("State", "state", None), ("Purchase Price", "purchase_price", MONEY), ("Down Payment", "amount_down", MONEY),
+        ("Loan Amount", "loan_amount", MONEY), ("Interest Rate", "interest_rate", RATE),
+        ("Loan Term (years)", "loan_years", WHOLE), ("Monthly Rent", "monthly_rent", MONEY),
+        ("Tax Rate", "tax_rate", RATE),
+    ],
+    "Monthly Expenses": [
+        ("Principal & Interest", "monthly_pi", MONEY), ("Insurance", "monthly_insurance", MONEY),
+        ("Property Tax", "monthly_tax", MONEY), ("Property Management", "pm_fee", MONEY),
+        ("Maintenance", "maintenance", MONEY), ("Total Monthly", "total_monthly", MONEY),
+    ],
+    "Investment Returns": [
+        ("Cash Flow @ 75%", "cash_flow_75", MONEY), ("Cash Flow @ 90%", "cash_flow_90", MONEY),
+        ("Cash Flow @ 100%", "cash_flow_100", MONEY), ("Annual ROI @ 75%", "annual_roi_75", PERCENT),
+        ("Annual ROI @ 90%", "annual_roi_90", PERCENT), ("Annual ROI @ 100%", "annual_roi_100", PERCENT),
+    ],
+}
+COMMERCIAL_LINES = {
+    "Deal": [
+        ("State", "state", None), ("Purchase Price", "purchase_price", MONEY), ("Down Payment", "amount_down", MONEY),
+        ("Closing Costs", "closing_costs", MONEY), ("Total Cash Down", "total_cash_down", MONEY),
+        ("Loan Amount", "loan_amount", MONEY), ("Interest Rate", "interest_rate", RATE),
+        ("Loan Term (years)", "loan_years", WHOLE), ("Annual Gross Rents", "annual_gross_rents", MONEY),
+        ("Vacancy Rate", "vacancy_rate", PERCENT),
+    ],
+    "Annual Operations": [
+        ("Insurance", "annual_insurance", MONEY), ("Property Tax", "annual_property_tax", MONEY),
+        ("PM Fee", "annual_pm_fee", MONEY), ("Other Expenses", "other_expenses", MONEY),
+        ("NOI (Estimated)", "noi_estimated", MONEY), ("Debt Service", "annual_debt_service", MONEY),
+        ("Cash Flow", "annual_cash_flow", MONEY), ("Cash-on-Cash", "cash_on_cash_return", PERCENT),
+        ("DSCR", "dscr", "0.00"),
+    ],
+}
+TARGET_LINES = [
+    ("Max Price @ Target Return", "max_price_target_return", MONEY),
+    ("Max Price @ Target DSCR", "max_price_target_dscr", MONEY),
+    ("Break-even Occupancy", "break_even_occupancy", PERCENT),
+    ("Min Down for Cash Flow", "min_down_payment", PERCENT),
+    ("Max Interest Rate", "max_interest_rate", PERCENT),
+]
+PROJECTION_LINES = [
+    ("IRR", "irr", PERCENT), ("NPV @ 8%", "npv", MONEY), ("Equity Multiple", "equity_multiple", MULTIPLE),
+    ("Net Sale Proceeds", "sale_proceeds", MONEY), ("Total Profit", "total_profit", MONEY),
+]
+# Report keys held in percent (the rest of the rates are decimals, as in the workbooks)
+PERCENT_KEYS = {"annual_roi_75", "annual_roi_90", "annual_roi_100", "cash_on_cash_return", "break_even_occupancy",
+                "min_down_payment", "max_interest_rate", "irr"}
+PROJECTION_COLUMNS = [
+    ("Year", "year", WHOLE), ("Income", "income", MONEY), ("Operating Expenses", "operating_expenses", MONEY),
+    ("NOI", "noi", MONEY), ("Debt Service", "debt_service", MONEY), ("Cash Flow", "cash_flow", MONEY),
+    ("Loan Balance", "loan_balance", MONEY), ("Property Value", "property_value", MONEY), ("Equity", "equity", MONEY),
+]
+
+
+def _inputs_frame(deals):
+    """Columns of query-param values for a list of deals (blanks become NaN, numeric text becomes numbers)"""
+    import pandas as pd
+    frame = pd.DataFrame.from_records([deal.get("inputs") or {} for deal in deals])
+    frame = frame.replace("", np.nan).infer_objects()
+    for name in frame.columns:
+        if not isinstance(DEFAULTS.get(name, ""), str):
+            frame[name] = pd.to_numeric(frame[name], errors="coerce")
+    return frame
+
+
+def _first_of_next_month(today=None):
+    today = today or datetime.date.today()
+    return datetime.date(today.year + today.month // 12, today.month % 12 + 1, 1)
+
+
+def _add_months(date, months):
+    month = date.month - 1 + months
+    return datetime.date(date.year + month // 12, month % 12 + 1, 1)
+
+
+def reports(property_type, deals, hold_years=DEFAULT_HOLD_YEARS):
+    """One flat report dict per deal (scalars, the schedule and the yearly projection), scored in one pass"""
+    deal = BUILDERS[property_type](_inputs_frame(deals))
+    projection = PROFORMAS[property_type](deal, hold_years)
+    count = len(deals)
+    values = {
+        "state": deal.state, "tax_rate": deal.tax_rate, "purchase_price": deal.purchase_price,
+        "down_payment_pct": deal.down_payment_pct, "interest_rate": deal.interest_rate,
+        "loan_years": deal.loan_years, "num_payments": deal.num_payments,
+        **deal.metrics(), **TARGETS[property_type](deal), **{name: projection[name] for name in SUMMARY},
+    }
+    if property_type == "Residential":
+        values.update(monthly_rent=deal.monthly_rent, monthly_payment=deal.monthly_pi)
+    else:
+        values.update(annual_gross_rents=deal.annual_gross_rents, vacancy_rate=deal.vacancy_rate,
+                      other_expenses=deal.other_expenses, insurance_rate=deal.insurance_rate,
+                      annual_noi_listing=deal.annual_noi_listing, monthly_payment=deal.monthly_payment)
+    values["total_interest"] = (np.asarray(values["monthly_payment"]) * np.asarray(deal.num_payments)
+                                - np.asarray(deal.loan_amount))
+    columns = {name: np.broadcast_to(value, count) for name, value in values.items()}
+
+    sched = schedule(np.broadcast_to(deal.loan_amount, count), np.broadcast_to(deal.interest_rate, count),
+                     np.broadcast_to(deal.loan_years, count))
+    years = annual_summary(sched)
+    series = {name: np.broadcast_to(projection[name], (count, hold_years)) for _, name, _ in PROJECTION_COLUMNS[1:]}
+
+    for i, source in enumerate(deals):
+        report = {name: column[i].item() if hasattr(column[i], "item") else column[i]
+                  for name, column in columns.items()}
+        terms = int(report["num_payments"])
+        report.update(
+            property_type=property_type, name=source.get("name") or "", hold_years=hold_years,
+            schedule={name: sched[name][i, :terms] for name in ("Principal", "Interest", "Balance")},
+            annual_schedule={name: years[name][i, :-(-terms // 12)] for name in ("Principal", "Interest", "Balance")},
+            projection={name: yearly[i] for name, yearly in series.items()},
+        )
+        yield report
+
+
+def _display(report, key):
+    """Cell value for a report key: percent-valued metrics become decimals for Excel's % formats"""
+    value = report.get(key)
+    if isinstance(value, float) and not np.isfinite(value):
+        return None
+    if key in PERCENT_KEYS and value is not None:
+        return value / 100
+    return value
+
+
+def _lines(report):
+    """(section, [(label, key, format), ...]) pairs for a report's summary"""
+    sections = RESIDENTIAL_LINES if report["property_type"] == "Residential" else COMMERCIAL_LINES
+    targets = [line for line in TARGET_LINES if line[1] in report]
+    projection = [(f"{label} ({report['hold_years']} yr)" if key == "irr" else label, key, fmt)
+                  for label, key, fmt in PROJECTION_LINES]
+    return [*sections.items(), ("Deal Targets", targets), ("Hold-Period Projection", projection)]
+
+
+def file_name(report, index, extension):
+    """Safe, sortable file name for one deal's report"""
+    label = re.sub(r"[^A-Za-z0-9]+", "-", report["name"]).strip("-")[:40]
+    return f"{index + 1:04d}-{report['property_type'].lower()}{'-' + label if label else ''}.{extension}"
+
+
+# XLSX
+
+def _sheet_cells(report, start_date):
+    """Cells of the screening workbook's top block as {row: {column letter: (value, format)}}"""
+    r = report
+    residential = r["property_type"] == "Residential"
+    cells = {
+        1: {"B": "Simple Loan Calculator", "G": "State", "H": r["state"]},
+        2: {"B": "Enter values", "G": "Tax rate", "H": (r["tax_rate"], RATE)},
+        3: {"B": "Loan amount", "E": (r["loan_amount"], MONEY), "G": "Purchase Price", "H": (r["purchase_price"], MONEY)},
+        4: {"B": "Annual interest rate", "E": (r["interest_rate"], RATE), "G": "Amount Down",
+            "H": (r["amount_down"], MONEY)},
+        5: {"B": "Loan period in years", "E": (r["loan_years"], WHOLE), "G": "% Down",
+            "H": (r["down_payment_pct"], PERCENT)},
+        6: {"B": "Start date of loan", "E": (start_date, DATE)},
+        7: {},
+        8: {"B": "TOTAL Monthly Pmt & Overhead"},
+        9: {"B": "Number of payments", "E": (r["num_payments"], WHOLE)},
+        10: {"B": "Total interest", "E": (r["total_interest"], MONEY)},
+        11: {"B": "Total cost of loan", "E": (r["total_interest"] + r["loan_amount"], MONEY)},
+        12: {"B": "No.", "C": "Payment\nDate", "D": "Beginning\nBalance", "E": "Payment", "F": "Principal",
+             "G": "Interest", "H": "Ending\nBalance"},
+    }
+    if residential:
+        expenses = [("P&I", r["monthly_pi"]), ("Insurance", r["monthly_insurance"]), ("Taxes", r["monthly_tax"]),
+                    ("PM Fee", r["pm_fee"]), ("Maint/Overhead", r["maintenance"])]
+        cells[2]["K"] = "ESTIMATED Monthly"
+        cells[3]["K"] = "Gross Rents"
+        cells[4]["K"] = (r["monthly_rent"], MONEY)
+        cells[5]["L"] = "Vacancy Rate"
+        for column, pct in zip("KLM", (75, 90, 100)):
+            cells[6][column] = f"{pct} % Monthly"
+            cells[7][column] = "Gross Rents"
+            cells[8][column] = (r["monthly_rent"] * pct / 100, MONEY)
+            cells[9][column] = (r["total_monthly"], MONEY)
+            cells[10][column] = (r[f"cash_flow_{pct}"], MONEY)
+            cells[12][column] = (_display(r, f"annual_roi_{pct}"), PERCENT)
+        cells[12]["J"] = (r["amount_down"], MONEY)
+        cells[13] = {"J": "Cash Down", "K": "ROI 75% Occ", "L": "ROI 90% Occ", "M": "ROI 100% Occ"}
+    else:
+        expenses = [("Purchase Loan P&I", r["monthly_payment"]),
+                    ("Property Insurance Insurance", r["annual_insurance"] / 12),
+                    ("Property Taxes", r["annual_property_tax"] / 12), ("PM Fee", r["annual_pm_fee"] / 12),
+                    ("All Other Operating Expenses", r["other_expenses"] / 12)]
+        cells[1]["F"] = "Ins Rate"
+        cells[2].update({"F": (r["insurance_rate"], PERCENT), "J": "Estimated Closing Costs ", "K": "Annual Gross Rents",
+                         "L": "Annual NOI from Listing", "M": "Annual NOI Estimated"})
+        cells[3]["J"] = (r["closing_costs"], MONEY)
+        cells[4].update({"K": (r["annual_gross_rents"], MONEY), "L": (_display(r, "annual_noi_listing"), MONEY),
+                         "M": (r["noi_estimated"], MONEY)})
+        cells[5].update({"K": "Vacancy Rate", "L": (r["vacancy_rate"], PERCENT)})
+        cells[6]["J"] = "Annual Expenses"
+        for row, value in zip(range(7, 12), (r["annual_debt_service"], r["annual_insurance"], r["annual_property_tax"],
+                                             r["annual_pm_fee"], r["other_expenses"])):
+            cells[row]["J"] = (value, MONEY)
+        for row, key, label in ((8, "noi_estimated", "Annual NOI Estimated"),
+                                (9, "annual_debt_service", "Annual Debt Service"),
+                                (10, "annual_cash_flow", "Annual Cash Flow"), (11, "total_cash_down", "Cash Down")):
+            cells[row].update({"L": (r[key], MONEY), "M": label})
+        cells[12].update({"L": (_display(r, "cash_on_cash_return"), PERCENT),
+                          "M": "Annual Cash on Cash Return (Year 1)"})
+    for row, (label, value) in zip(range(7, 12), expenses):
+        cells[row].update({"G": label, "H": (value, MONEY)})
+    cells[8]["E"] = (sum(value for _, value in expenses), MONEY)
+    return cells
+
+
+def _column_letter(index):
+    """Column letters for a 0-based column index (0 -> "A", 26 -> "AA")"""
+    letters = ""
+    index += 1
+    while index:
+        index, rest = divmod(index - 1, 26)
+        letters = chr(65 + rest) + letters
+    return letters
+
+
+COLUMNS = [_column_letter(i) for i in range(702)]
+COLUMN_INDEX = {letters: i for i, letters in enumerate(COLUMNS)}
+EXCEL_EPOCH = datetime.date(1899, 12, 30)
+_XML_INVALID = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '{sheets}</Types>'
+)
+_PACKAGE_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/></Relationships>'
+)
+
+
+class StreamingWorkbook:
+    """Write-only XLSX: rows go straight into the zip as they are appended, one sheet at a time
+
+    Cells are numbers, text, dates or ``None`` (skipped); a ``(value, number
+    format)`` tuple, or the ``formats`` of :meth:`append`, styles a cell. Memory
+    stays flat however many rows are written.
+    """
+
+    def __init__(self, target):
+        # Fast deflate: sheet XML is repetitive, so level 1 is nearly as small at a fraction of the time
+        self._zip = zipfile.ZipFile(target, "w", zipfile.ZIP_DEFLATED, compresslevel=1)
+        self._sheets = []
+        self._styles = {}
+        self._stream = None
+        self._row = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def sheet(self, title, widths=None):
+        """Start a new sheet (ending the current one); ``widths`` maps column letters to widths"""
+        self._end_sheet()
+        self._sheets.append(title[:31])
+        self._stream = self._zip.open(f"xl/worksheets/sheet{len(self._sheets)}.xml", "w", force_zip64=True)
+        self._row = 0
+        cols = "".join(f'<col min="{COLUMN_INDEX[c] + 1}" max="{COLUMN_INDEX[c] + 1}" width="{w}" customWidth="1"/>'
+                       for c, w in (widths or {}).items())
+        self._stream.write(('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                            '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                            + (f"<cols>{cols}</cols>" if cols else "") + "<sheetData>").encode())
+
+    def _style(self, number_format):
+        if number_format not in self._styles:
+            self._styles[number_format] = len(self._styles) + 1
+        return self._styles[number_format]
+
+    def append(self, values, formats=()):
+        """Write the next row from a list of cells (column A first)"""
+        self._row += 1
+        row = self._row
+        parts = []
+        for i, value in enumerate(values):
+            number_format = formats[i] if i < len(formats) else None
+            if type(value) is tuple:
+                value, number_format = value
+            if value is None:
+                continue
+            style = f' s="{self._style(number_format)}"' if number_format else ""
+            if isinstance(value, str):
+                text = escape(_XML_INVALID.sub("", value))
+                parts.append(f'<c r="{COLUMNS[i]}{row}"{style} t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>')
+                continue
+            if isinstance(value, datetime.date):
+                value = (value - EXCEL_EPOCH).days
+            elif isinstance(value, (bool, np.bool_)):
+                parts.append(f'<c r="{COLUMNS[i]}{row}"{style} t="b"><v>{int(value)}</v></c>')
+                continue
+            value = float(value)
+            if value != value or value in (np.inf, -np.inf):
+                continue
+            parts.append(f'<c r="{COLUMNS[i]}{row}"{style}><v>{value!r}</v></c>')
+        self._stream.write(f'<row r="{row}">{"".join(parts)}</row>'.encode())
+
+    def append_numbers(self, rows, formats, first_column=0):
+        """Write many rows of finite numbers sharing one format per column: one string template for them all"""
+        cells = "".join(f'<c r="{COLUMNS[first_column + i]}{{0}}"' + (f' s="{self._style(fmt)}"' if fmt else "")
+                        + f'><v>{{{i + 1}!r}}</v></c>' for i, fmt in enumerate(formats))
+        template = '<row r="{0}">' + cells + "</row>"
+        start = self._row + 1
+        self._row += len(rows)
+        self._stream.write("".join(template.format(row, *values)
+                                   for row, values in enumerate(rows, start=start)).encode())
+
+    def append_cells(self, cells, template=(), formats=()):
+        """Write the next row from {column letter: cell}, over an optional list of cells from column A"""
+        values = list(template)
+        for column, content in cells.items():
+            index = COLUMN_INDEX[column]
+            values.extend([None] * (index + 1 - len(values)))
+            values[index] = content
+        self.append(values, formats)
+
+    def _end_sheet(self):
+        if self._stream is not None:
+            self._stream.write(b"</sheetData></worksheet>")
+            self._stream.close()
+            self._stream = None
+
+    def close(self):
+        if self._zip is None:
+            return
+        if not self._sheets:
+            self.sheet("Sheet1")
+        self._end_sheet()
+        sheets = range(1, len(self._sheets) + 1)
+        self._zip.writestr("[Content_Types].xml", _CONTENT_TYPES.format(sheets="".join(
+            f'<Override PartName="/xl/worksheets/sheet{i}.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>' for i in sheets)))
+        self._zip.writestr("_rels/.rels", _PACKAGE_RELS)
+        self._zip.writestr("xl/workbook.xml", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"><sheets>'
+            + "".join(f'<sheet name="{escape(title, {chr(34): "&quot;"})}" sheetId="{i}" r:id="rId{i}"/>'
+                      for i, title in zip(sheets, self._sheets))
+            + "</sheets></workbook>"))
+        self._zip.writestr("xl/_rels/workbook.xml.rels", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            + "".join(f'<Relationship Id="rId{i}" Type="http://schemas.openxmlformats.org/officeDocument/2006/'
+                      f'relationships/worksheet" Target="worksheets/sheet{i}.xml"/>' for i in sheets)
+            + f'<Relationship Id="rId{len(self._sheets) + 1}" Type="http://schemas.openxmlformats.org/'
+            'officeDocument/2006/relationships/styles" Target="styles.xml"/></Relationships>'))
+        formats = "".join(f'<numFmt numFmtId="{163 + i}" formatCode="{escape(code, {chr(34): "&quot;"})}"/>'
+                          for code, i in self._styles.items())
+        xfs = "".join(f'<xf numFmtId="{163 + i}" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+                      for i in self._styles.values())
+        self._zip.writestr("xl/styles.xml", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+            f'<numFmts count="{len(self._styles)}">{formats}</numFmts>'
+            '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+            '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+            '<fill><patternFill patternType="gray125"/></fill></fills>'
+            '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+            '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+            f'<cellXfs count="{len(self._styles) + 1}"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+            f'{xfs}</cellXfs>'
+            '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles></styleSheet>'))
+        self._zip.close()
+        self._zip = None
+
+
+def write_xlsx(report, target, start_date=None):
+    """Write one deal's workbook (screening layout, then targets and projection) to a path or binary file"""
+    start_date = start_date or _first_of_next_month()
+    cells = _sheet_cells(report, start_date)
+    with StreamingWorkbook(target) as wb:
+        wb.sheet(SHEETS[report["property_type"]], {
+            "A": 2.7, "B": 5.7, "C": 13.7, "D": 16.7, "E": 14.5, "F": 13.7, "G": 26, "H": 14.7, "I": 2.7,
+            "J": 24, "K": 12.8, "L": 13, "M": 20.3})
+        for row in range(1, 13):
+            wb.append_cells(cells.pop(row))
+
+        # Amortization schedule, one row per payment; rows shared with the side panel are written cell by cell
+        sched = report["schedule"]
+        count = len(sched["Balance"])
+        first = (start_date - EXCEL_EPOCH).days
+        dates = [(_add_months(start_date, k) - start_date).days + first for k in range(count)]
+        beginning = np.concatenate([[report["loan_amount"]], sched["Balance"][:-1]])
+        payment = sched["Principal"] + sched["Interest"]
+        formats = (WHOLE, DATE, MONEY, MONEY, MONEY, MONEY, MONEY)
+        batch = []
+        for k, values in enumerate(zip(range(1, count + 1), dates, beginning.tolist(), payment.tolist(),
+                                       sched["Principal"].tolist(), sched["Interest"].tolist(),
+                                       sched["Balance"].tolist())):
+            extra = cells.pop(13 + k, None)
+            if extra:
+                wb.append_numbers(batch, formats, first_column=1)
+                batch = []
+                wb.append_cells(extra, [None, *values], [None, *formats])
+            else:
+                batch.append(values)
+        wb.append_numbers(batch, formats, first_column=1)
+        for row in sorted(cells):
+            wb.append_cells(cells[row])
+
+        # Deal Targets and hold-period returns above the yearly projection
+        wb.sheet("Hold-Period Projection", {"A": 26, **{column: 16 for column in "BCDEFGHI"}})
+        for section, lines in _lines(report)[-2:]:
+            wb.append([section])
+            for label, key, fmt in lines:
+                wb.append([label, (_display(report, key), fmt)])
+            wb.append([])
+        wb.append([label for label, _, _ in PROJECTION_COLUMNS])
+        series = [report["projection"][key].tolist() for _, key, _ in PROJECTION_COLUMNS[1:]]
+        wb.append_numbers(list(zip(range(1, report["hold_years"] + 1), *series)),
+                          [fmt for _, _, fmt in PROJECTION_COLUMNS])
+
+
+def write_portfolio(deals, target, chunk_size=1_000):
+    """One workbook row per deal (inputs and every output), scored and streamed a chunk at a time"""
+    from calculator.screening import OUTPUT_COLUMNS, score_frame
+
+    with StreamingWorkbook(target) as wb:
+        wb.sheet("Portfolio")
+        header = None
+        for start in range(0, len(deals), chunk_size):
+            chunk = deals[start:start + chunk_size]
+            frame = _inputs_frame(chunk)
+            frame["property_type"] = [deal["property_type"] for deal in chunk]
+            scored = score_frame(frame)
+            scored.insert(0, "name", [deal.get("name") or "" for deal in chunk])
+            if header is None:
+                inputs = [name for name in scored.columns if name not in OUTPUT_COLUMNS]
+                header = inputs + [name for name in OUTPUT_COLUMNS if name in scored.columns]
+                wb.append(header)
+            for row in scored.reindex(columns=header).itertuples(index=False):
+                wb.append(row)
+        if header is None:
+            wb.append(["name", "property_type"])
+
+
+# PDF
+
+def _pdf_text(text):
+    """PDF string literal body: WinAnsi bytes with ( ) \\ escaped"""
+    data = str(text).encode("cp1252", "replace").decode("latin-1")
+    return data.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _pdf_value(value, fmt):
+    if value is None:
+        return "-"
+    if isinstance(value, str):
+        return value
+    if fmt == MONEY:
+        return f"-${-value:,.0f}" if value < 0 else f"${value:,.0f}"
+    if fmt in (PERCENT, RATE):
+        return f"{value * 100:.{3 if fmt == RATE else 2}f}%"
+    if fmt == MULTIPLE:
+        return f"{value:.2f}x"
+    if fmt == WHOLE:
+        return f"{value:,.0f}"
+    return f"{value:,.2f}"
+
+
+def write_pdf(report, target):
+    """Write one deal's one-page PDF summary (figures on the left, yearly loan balance on the right)"""
+    title = f"{report['property_type']} Deal Report"
+    ops = ["BT", "/F2 16 Tf", f"1 0 0 1 50 750 Tm ({_pdf_text(title)}) Tj"]
+    if report["name"]:
+        ops += ["/F1 11 Tf", f"1 0 0 1 50 732 Tm ({_pdf_text(report['name'])}) Tj"]
+
+    y = 705
+    for section, lines in _lines(report):
+        ops += ["/F2 10 Tf", f"1 0 0 1 50 {y} Tm ({_pdf_text(section)}) Tj", "/F1 9 Tf"]
+        for label, key, fmt in lines:
+            y -= 12
+            value = _pdf_value(_display(report, key), fmt)
+            ops += [f"1 0 0 1 60 {y} Tm ({_pdf_text(label)}) Tj", f"1 0 0 1 200 {y} Tm ({_pdf_text(value)}) Tj"]
+        y -= 20
+
+    y = 705
+    ops += ["/F2 10 Tf", f"1 0 0 1 320 {y} Tm (Loan Schedule by Year) Tj", "/F1 9 Tf"]
+    y -= 14
+    for x, label in ((320, "Year"), (360, "Principal"), (440, "Interest"), (510, "Balance")):
+        ops.append(f"1 0 0 1 {x} {y} Tm ({label}) Tj")
+    years = report["annual_schedule"]
+    for year, (principal, interest, balance) in enumerate(zip(years["Principal"], years["Interest"],
+                                                              years["Balance"]), start=1):
+        y -= 12
+        ops += [f"1 0 0 1 320 {y} Tm ({year}) Tj",
+                f"1 0 0 1 360 {y} Tm ({_pdf_value(float(principal), MONEY)}) Tj",
+                f"1 0 0 1 440 {y} Tm ({_pdf_value(float(interest), MONEY)}) Tj",
+                f"1 0 0 1 510 {y} Tm ({_pdf_value(float(balance), MONEY)}) Tj"]
+    ops += ["/F1 7 Tf", f"1 0 0 1 50 30 Tm (Generated {datetime.date.today():%Y-%m-%d} by Property Calculator) Tj",
+            "ET"]
+
+    content = zlib.compress("\n".join(ops).encode("latin-1"))
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 6 0 R "
+        b"/Resources << /Font << /F1 4 0 R /F2 5 0 R >> >> >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>",
+        b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(content) + content + b"\nendstream",
+    ]
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    if hasattr(target, "write"):
+        target.write(bytes(out))
+    else:
+        with open(target, "wb") as f:
+            f.write(out)
+
+
+WRITERS = {"xlsx": write_xlsx, "pdf": write_pdf}
+
+
+def render(deal, fmt):
+    """One deal's report as bytes, for a download button"""
+    if fmt not in WRITERS:
+        raise ValueError(f"format must be one of {FORMATS}, got {fmt!r}")
+    buffer = io.BytesIO()
+    WRITERS[fmt](next(reports(deal["property_type"], [deal])), buffer)
+    return buffer.getvalue()
+
+
+def _render_chunk(fmt, directory, property_type, deals, indexes):
+    """Pool task: score a chunk of deals of one property type and write a file per deal; returns paths"""
+    paths = []
+    for index, report in zip(indexes, reports(property_type, deals)):
+        path = os.path.join(directory, file_name(report, index, fmt))
+        WRITERS[fmt](report, path)
+        paths.append(path)
+    return paths
+
+
+def export_deals(deals, directory, fmt="xlsx", executor=None, chunk_size=CHUNK_SIZE):
+    """Write an XLSX or PDF per deal into ``directory``; returns the paths in input order
+
+    Pass a ``concurrent.futures`` executor to render chunks in parallel.
+    """
+    if fmt not in WRITERS:
+        raise ValueError(f"format must be one of {FORMATS}, got {fmt!r}")
+    unknown = {deal["property_type"] for deal in deals} - set(PROPERTY_TYPES)
+    if unknown:
+        raise ValueError(f"Unknown property_type values: {sorted(unknown)}")
+    os.makedirs(directory, exist_ok=True)
+    tasks = []
+    for property_type in PROPERTY_TYPES:
+        indexes = [i for i, deal in enumerate(deals) if deal["property_type"] == property_type]
+        for start in range(0, len(indexes), chunk_size):
+            chunk = indexes[start:start + chunk_size]
+            tasks.append((fmt, directory, property_type, [deals[i] for i in chunk], chunk))
+    if executor is None:
+        results = [_render_chunk(*task) for task in tasks]
+    else:
+        results = list(executor.map(_render_chunk, *zip(*tasks))) if tasks else []
+    # Chunks are grouped by property type; put each path back at its deal's position
+    paths = [None] * len(deals)
+    for task, chunk_paths in zip(tasks, results):
+        for i, path in zip(task[-1], chunk_paths):
+            paths[i] = path
+    return paths
+
+
+def bundle(deals, fmt="xlsx", executor=None):
+    """A zip of one report per deal, or the portfolio workbook itself for ``fmt="portfolio"``, as bytes"""
+    import tempfile
+    buffer = io.BytesIO()
+    if fmt == "portfolio":
+        write_portfolio(deals, buffer)
+        return buffer.getvalue()
+    with tempfile.TemporaryDirectory() as directory:
+        paths = export_deals(deals, directory, fmt, executor)
+        # Workbooks and PDFs are already deflated, so the zip only stores them
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as archive:
+            for path in paths:
+                archive.write(path, os.path.basename(path))
+    return buffer.getvalue()
+
+
+def read_deals(path, property_type="Residential"):
+    """Deals from a CSV of query-param columns plus optional ``property_type`` and ``name`` columns"""
+    import pandas as pd
+    from calculator.library import clean_inputs
+    frame = pd.read_csv(path, dtype=str, keep_default_na=False)
+    deals = []
+    for row in frame.to_dict("records"):
+        kind = (row.get("property_type") or property_type).strip().capitalize()
+        deals.append({"property_type": kind, "name": row.get("name") or "", "inputs": clean_inputs(row, kind)})
+    return deals
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export deal reports: an XLSX or PDF per deal, or a portfolio workbook")
+    parser.add_argument("input", help="CSV of deals (query-param columns, optional property_type and name)")
+    parser.add_argument("output", help="directory for per-deal files, or the .xlsx path for --format portfolio")
+    parser.add_argument("--format", choices=[*FORMATS, "portfolio"], default="xlsx")
+    parser.add_argument("--property-type", choices=PROPERTY_TYPES, default="Residential",
+                        help="formulas for rows without a property_type value")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="processes for per-deal files")
+    args = parser.parse_args(argv)
+
+    deals = read_deals(args.input, args.property_type)
+    start = time.perf_counter()
+    if args.format == "portfolio":
+        write_portfolio(deals, args.output)
+    elif args.workers > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            export_deals(deals, args.output, args.format, executor=pool)
+    else:
+        export_deals(deals, args.output, args.format)
+    seconds = time.perf_counter() - start
+    print(f"Exported {len(deals):,} deals in {seconds:.2f}s ({len(deals) / seconds:,.0f} deals/sec) -> {args.output}",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,396 @@
+"""Saved-deal library in SQLite: inputs, cached outputs, ranked comparisons and incremental recompute.
+
+    python -m calculator.library import listings.csv
+    python -m calculator.library top --by cash_on_cash --state TX -n 20
+    python -m calculator.library refresh
+
+Deals are stored with the query params they were built from and every output
+of :func:`calculator.screening.score_frame`. The columns comparisons filter
+and rank on (state, price, annual cash flow, cash-on-cash, DSCR, IRR) are
+real indexed columns, so ranking thousands of deals is one indexed query.
+
+Each output depends on global assumptions (state tax and insurance rates, the
+closing-cost and PM-fee factors, solver and pro forma defaults, the ZIP rate
+store). The values the stored outputs were computed with are kept in the
+``assumptions`` table; :meth:`DealLibrary.refresh` compares them with the
+current ones and recomputes only the deals that read a changed value, e.g. a
+Texas tax rate change recomputes the Texas residential deals and nothing else.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from calculator import deals, proforma, rates, solver
+from calculator.cache import normalize_params
+from calculator.params import COMMERCIAL_DEFAULTS, PROPERTY_TYPES, RESIDENTIAL_DEFAULTS
+from calculator.screening import COMMERCIAL_OUTPUTS, RESIDENTIAL_OUTPUTS, score_frame
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "deals.sqlite3")
+SCHEMA_VERSION = 1
+
+DEFAULTS = {"Residential": RESIDENTIAL_DEFAULTS, "Commercial": COMMERCIAL_DEFAULTS}
+OUTPUTS = {"Residential": RESIDENTIAL_OUTPUTS, "Commercial": COMMERCIAL_OUTPUTS}
+PREFIX = {"Residential": "", "Commercial": "comm_"}
+
+# Indexed comparison columns; residential cash flow and return are the 90% occupancy scenario
+RANK_COLUMNS = ("purchase_price", "annual_cash_flow", "cash_on_cash", "dscr", "irr")
+
+# Assumptions each property type reads regardless of state; state-level rates are added per deal
+GLOBAL_DEPENDENCIES = {
+    "Residential": ("residential_insurance_rate", "residential_pm_fee_rate", "residential_maintenance",
+                    "target_return", "occupancy"),
+    "Commercial": ("closing_cost_rate", "commercial_pm_fee_rate", "target_return", "target_dscr"),
+}
+STATE_DEPENDENCIES = {"Residential": ("tax",), "Commercial": ("commercial_tax", "commercial_insurance")}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS deals (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    name TEXT,
+    property_type TEXT NOT NULL,
+    state TEXT NOT NULL,
+    zip_code TEXT NOT NULL DEFAULT '',
+    purchase_price REAL,
+    annual_cash_flow REAL,
+    cash_on_cash REAL,
+    dscr REAL,
+    irr REAL,
+    inputs TEXT NOT NULL,
+    outputs TEXT NOT NULL,
+    saved_at REAL NOT NULL,
+    computed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS deals_type_state ON deals (property_type, state);
+CREATE INDEX IF NOT EXISTS deals_price ON deals (purchase_price);
+CREATE INDEX IF NOT EXISTS deals_cash_flow ON deals (annual_cash_flow);
+CREATE INDEX IF NOT EXISTS deals_cash_on_cash ON deals (cash_on_cash);
+CREATE INDEX IF NOT EXISTS deals_dscr ON deals (dscr);
+CREATE INDEX IF NOT EXISTS deals_irr ON deals (irr);
+CREATE INDEX IF NOT EXISTS deals_zip ON deals (zip_code) WHERE zip_code != '';
+CREATE TABLE IF NOT EXISTS assumptions (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def current_assumptions():
+    """Every global value a stored output depends on, as ``{key: json text}``
+
+    Read from the modules at call time, so edits to the rate tables or
+    constants (or a rebuilt rate store) show up on the next refresh.
+    """
+    values = {
+        "residential_insurance_rate": deals.RESIDENTIAL_INSURANCE_RATE,
+        "residential_pm_fee_rate": deals.RESIDENTIAL_PM_FEE_RATE,
+        "residential_maintenance": deals.RESIDENTIAL_MAINTENANCE,
+        "commercial_pm_fee_rate": deals.COMMERCIAL_PM_FEE_RATE,
+        "closing_cost_rate": deals.CLOSING_COST_RATE,
+        "target_return": solver.DEFAULT_TARGET_RETURN,
+        "target_dscr": solver.DEFAULT_TARGET_DSCR,
+        "occupancy": solver.DEFAULT_OCCUPANCY,
+        "proforma.hold_years": proforma.DEFAULT_HOLD_YEARS,
+        **{f"proforma.{name}": value for name, value in proforma.DEFAULT_ASSUMPTIONS.items()},
+    }
+    for kind, table in rates.STATE_TABLES.items():
+        values.update({f"{kind}:{state}": rate for state, rate in table.items()})
+    store = rates.rate_store()
+    values["rate_store"] = _store_stamp(store.path)
+    return {key: json.dumps(value) for key, value in values.items()}
+
+
+def _store_stamp(path):
+    """Identity of the active ZIP/county rate store (its build metadata), or null when there is none"""
+    if path is None:
+        return None
+    with open(os.path.join(path, "meta.json"), "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+
+def clean_inputs(params, property_type):
+    """The model params of one deal with numbers parsed; blanks and unknown names are dropped"""
+    inputs = {}
+    for name, default in DEFAULTS[property_type].items():
+        value = params.get(name)
+        if value is None or (isinstance(value, float) and np.isnan(value)) or str(value).strip() == "":
+            continue
+        inputs[name] = str(value).strip() if isinstance(default, str) else float(value)
+    return inputs
+
+
+def deal_key(property_type, inputs):
+    """Stable identity of a deal: saving the same inputs twice updates one row"""
+    return hashlib.sha256(repr((property_type, normalize_params(inputs))).encode()).hexdigest()[:24]
+
+
+def _json_value(value):
+    value = value.item() if isinstance(value, np.generic) else value
+    return None if isinstance(value, float) and not np.isfinite(value) else value
+
+
+def _score(property_types, inputs):
+    """Output dicts and comparison columns for parallel lists of property types and input dicts"""
+    frame = pd.DataFrame.from_records(inputs, columns=sorted({name for row in inputs for name in row}) or None)
+    frame["property_type"] = property_types
+    results = []
+    for property_type, row in zip(property_types, score_frame(frame).to_dict("records")):
+        outputs = {name: _json_value(row[name]) for name in OUTPUTS[property_type]}
+        if property_type == "Residential":
+            annual_cash_flow = row["cash_flow_90"] * 12
+            cash_on_cash = row["annual_roi_90"]
+        else:
+            annual_cash_flow = row["annual_cash_flow"]
+            cash_on_cash = row["cash_on_cash_return"]
+        results.append((outputs, {
+            "annual_cash_flow": _json_value(annual_cash_flow),
+            "cash_on_cash": _json_value(cash_on_cash),
+            "dscr": _json_value(row["dscr"]),
+            "irr": _json_value(row["irr"]),
+        }))
+    return results
+
+
+class DealLibrary:
+    """A SQLite file of saved deals, safe to share across threads (one connection behind a lock)"""
+
+    def __init__(self, path=None, chunk_size=10_000):
+        self.path = path or os.environ.get("DEAL_LIBRARY_PATH") or DEFAULT_PATH
+        self.chunk_size = chunk_size
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            version = self._db.execute("PRAGMA user_version").fetchone()[0]
+            if version not in (0, SCHEMA_VERSION):
+                raise ValueError(f"Deal library {self.path} has schema {version}, expected {SCHEMA_VERSION}")
+            self._db.executescript(SCHEMA)
+            self._db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def __repr__(self):
+        return f"DealLibrary({self.count()} deals, path={self.path!r})"
+
+    def close(self):
+        self._db.close()
+
+    def count(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM deals").fetchone()[0]
+
+    def save(self, deals_params, property_type="Residential", names=None):
+        """Save deals given as query-param mappings (or a DataFrame of them); returns their ids
+
+        A ``property_type`` entry on a deal overrides ``property_type``.
+        Outputs are computed in one vectorized pass.
+        """
+        if isinstance(deals_params, pd.DataFrame):
+            deals_params = deals_params.to_dict("records")
+        deals_params = list(deals_params)
+        names = list(names) if names is not None else [params.get("name") for params in deals_params]
+        kinds = []
+        for params in deals_params:
+            kind = str(params.get("property_type") or property_type).strip().capitalize()
+            if kind not in PROPERTY_TYPES:
+                raise ValueError(f"property_type must be one of {PROPERTY_TYPES}, got {params.get('property_type')!r}")
+            kinds.append(kind)
+
+        self.refresh()
+        ids = []
+        for start in range(0, len(deals_params), self.chunk_size):
+            chunk = slice(start, start + self.chunk_size)
+            chunk_kinds = kinds[chunk]
+            inputs = [clean_inputs(params, kind) for params, kind in zip(deals_params[chunk], chunk_kinds)]
+            now = time.time()
+            rows = []
+            for kind, row_inputs, name, (outputs, ranked) in zip(chunk_kinds, inputs, names[chunk],
+                                                                  _score(chunk_kinds, inputs)):
+                defaults, prefix = DEFAULTS[kind], PREFIX[kind]
+                rows.append({
+                    "key": deal_key(kind, row_inputs),
+                    "name": name if name is None or name == name else None,
+                    "property_type": kind,
+                    "state": row_inputs.get(f"{prefix}state", defaults[f"{prefix}state"]),
+                    "zip_code": row_inputs.get(f"{prefix}zip_code", ""),
+                    "purchase_price": row_inputs.get(f"{prefix}purchase_price", defaults[f"{prefix}purchase_price"]),
+                    "inputs": json.dumps(row_inputs, sort_keys=True),
+                    "outputs": json.dumps(outputs),
+                    "saved_at": now,
+                    "computed_at": now,
+                    **ranked,
+                })
+            with self._lock, self._db:
+                self._db.executemany("""
+                    INSERT INTO deals (key, name, property_type, state, zip_code, purchase_price, annual_cash_flow,
+                                       cash_on_cash, dscr, irr, inputs, outputs, saved_at, computed_at)
+                    VALUES (:key, :name, :property_type, :state, :zip_code, :purchase_price, :annual_cash_flow,
+                            :cash_on_cash, :dscr, :irr, :inputs, :outputs, :saved_at, :computed_at)
+                    ON CONFLICT (key) DO UPDATE SET name = COALESCE(excluded.name, name), saved_at = excluded.saved_at
+                """, rows)
+                ids += [self._db.execute("SELECT id FROM deals WHERE key = ?", (row["key"],)).fetchone()[0]
+                        for row in rows]
+        return ids
+
+    def delete(self, ids):
+        with self._lock, self._db:
+            self._db.executemany("DELETE FROM deals WHERE id = ?", [(int(deal_id),) for deal_id in ids])
+
+    def get(self, deal_id):
+        """One saved deal as a dict with parsed ``inputs`` and ``outputs``, or None"""
+        with self._lock:
+            row = self._db.execute("SELECT * FROM deals WHERE id = ?", (int(deal_id),)).fetchone()
+        if row is None:
+            return None
+        deal = dict(row)
+        deal["inputs"], deal["outputs"] = json.loads(deal["inputs"]), json.loads(deal["outputs"])
+        return deal
+
+    def deals(self, ids=None):
+        """Every saved deal (or those in ``ids``) as dicts with parsed ``inputs``, for portfolio roll-ups"""
+        query = "SELECT id, name, property_type, state, inputs, saved_at FROM deals"
+        args = ()
+        if ids is not None:
+            args = tuple(int(deal_id) for deal_id in ids)
+            query += f" WHERE id IN ({', '.join('?' * len(args))})" if args else " WHERE 0"
+        with self._lock:
+            rows = self._db.execute(query + " ORDER BY id", args).fetchall()
+        return [{**dict(row), "inputs": json.loads(row["inputs"])} for row in rows]
+
+    def stamp(self):
+        """(count, latest saved_at): changes whenever a deal is saved or deleted"""
+        with self._lock:
+            return tuple(self._db.execute("SELECT COUNT(*), MAX(saved_at) FROM deals").fetchone())
+
+    def compare(self, property_type=None, states=None, min_price=None, max_price=None, min_cash_flow=None,
+                min_cash_on_cash=None, by="cash_on_cash", descending=True, limit=100):
+        """Saved deals matching the filters, best first by one of ``RANK_COLUMNS``, as a DataFrame"""
+        if by not in RANK_COLUMNS:
+            raise ValueError(f"by must be one of {RANK_COLUMNS}, got {by!r}")
+        where, args = [], []
+        if property_type:
+            where.append("property_type = ?")
+            args.append(property_type)
+        if states:
+            states = [states] if isinstance(states, str) else list(states)
+            where.append(f"state IN ({', '.join('?' * len(states))})")
+            args += states
+        for clause, value in (("purchase_price >= ?", min_price), ("purchase_price <= ?", max_price),
+                              ("annual_cash_flow >= ?", min_cash_flow), ("cash_on_cash >= ?", min_cash_on_cash)):
+            if value is not None:
+                where.append(clause)
+                args.append(float(value))
+        query = (f"SELECT id, name, property_type, state, zip_code, {', '.join(RANK_COLUMNS)}, saved_at FROM deals"
+                 + (f" WHERE {' AND '.join(where)}" if where else "")
+                 + f" ORDER BY {by} IS NULL, {by} {'DESC' if descending else 'ASC'}"
+                 + (" LIMIT ?" if limit else ""))
+        if limit:
+            args.append(int(limit))
+        with self._lock:
+            rows = self._db.execute(query, args).fetchall()
+        columns = ["id", "name", "property_type", "state", "zip_code", *RANK_COLUMNS, "saved_at"]
+        return pd.DataFrame([tuple(row) for row in rows], columns=columns)
+
+    def _affected(self, changed):
+        """WHERE clause and args selecting the deals that read any of the ``changed`` assumption keys"""
+        if any(key.startswith("proforma.") for key in changed):
+            return "1", []
+        clauses, args = [], []
+        for property_type in PROPERTY_TYPES:
+            if any(key in changed for key in GLOBAL_DEPENDENCIES[property_type]):
+                clauses.append("property_type = ?")
+                args.append(property_type)
+                continue
+            states = sorted({key.split(":", 1)[1] for key in changed
+                             for kind in STATE_DEPENDENCIES[property_type] if key.startswith(f"{kind}:")})
+            if states:
+                clauses.append(f"(property_type = ? AND state IN ({', '.join('?' * len(states))}))")
+                args += [property_type, *states]
+        if "rate_store" in changed:
+            clauses.append("zip_code != ''")
+        return " OR ".join(clauses), args
+
+    def refresh(self):
+        """Recompute the deals whose assumptions changed since their outputs were stored; returns how many"""
+        current = current_assumptions()
+        with self._lock:
+            stored = dict(self._db.execute("SELECT key, value FROM assumptions").fetchall())
+        changed = {key for key in current.keys() | stored.keys() if current.get(key) != stored.get(key)}
+        if not changed:
+            return 0
+        recomputed = 0
+        if stored:
+            where, args = self._affected(changed)
+            if where:
+                recomputed = self.recompute(where, args)
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM assumptions")
+            self._db.executemany("INSERT INTO assumptions (key, value) VALUES (?, ?)", current.items())
+        return recomputed
+
+    def recompute(self, where="1", args=()):
+        """Recompute the stored outputs of the deals matching a WHERE clause, one vectorized pass per chunk"""
+        with self._lock:
+            rows = self._db.execute(f"SELECT id, property_type, inputs FROM deals WHERE {where}", args).fetchall()
+        for start in range(0, len(rows), self.chunk_size):
+            chunk = rows[start:start + self.chunk_size]
+            kinds = [row["property_type"] for row in chunk]
+            now = time.time()
+            updates = [{"id": row["id"], "outputs": json.dumps(outputs), "computed_at": now, **ranked}
+                       for row, (outputs, ranked) in zip(chunk, _score(kinds, [json.loads(row["inputs"])
+                                                                               for row in chunk]))]
+            with self._lock, self._db:
+                self._db.executemany("""
+                    UPDATE deals SET outputs = :outputs, annual_cash_flow = :annual_cash_flow,
+                                     cash_on_cash = :cash_on_cash, dscr = :dscr, irr = :irr, computed_at = :computed_at
+                    WHERE id = :id
+                """, updates)
+        return len(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m calculator.library", description="Saved-deal library")
+    parser.add_argument("--path", default=None, help=f"library file (default: $DEAL_LIBRARY_PATH or {DEFAULT_PATH})")
+    commands = parser.add_subparsers(dest="command", required=True)
+    load = commands.add_parser("import", help="save every row of a CSV file of query-param columns")
+    load.add_argument("csv")
+    load.add_argument("--property-type", choices=PROPERTY_TYPES, default="Residential",
+                      help="for rows without a property_type column")
+    top = commands.add_parser("top", help="rank saved deals")
+    top.add_argument("--by", choices=RANK_COLUMNS, default="cash_on_cash")
+    top.add_argument("--type", choices=PROPERTY_TYPES, default=None)
+    top.add_argument("--state", nargs="*", default=None)
+    top.add_argument("--min-price", type=float, default=None)
+    top.add_argument("--max-price", type=float, default=None)
+    top.add_argument("-n", type=int, default=20)
+    commands.add_parser("refresh", help="recompute deals whose assumptions changed")
+    args = parser.parse_args(argv)
+
+    library = DealLibrary(args.path)
+    if args.command == "import":
+        start = time.perf_counter()
+        ids = library.save(pd.read_csv(args.csv, dtype=str, keep_default_na=False), args.property_type)
+        print(f"Saved {len(ids):,} deals in {time.perf_counter() - start:.2f}s; {library}", file=sys.stderr)
+    elif args.command == "top":
+        start = time.perf_counter()
+        ranked = library.compare(args.type, args.state, args.min_price, args.max_price, by=args.by, limit=args.n)
+        print(ranked.drop(columns="saved_at").to_string(index=False))
+        print(f"{len(ranked)} of {library.count():,} deals in {(time.perf_counter() - start) * 1000:.1f} ms",
+              file=sys.stderr)
+    else:
+        start = time.perf_counter()
+        print(f"Recomputed {library.refresh():,} deals in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,512 @@
+"""Listing-data importer: price, rent, NOI and state for listing URLs, one or thousands at a time.
+
+    python -m calculator.listings serve fixtures.json --port 8765           # local stand-in service
+    python -m calculator.listings import urls.txt -o listings.csv --endpoint http://127.0.0.1:8765/listing
+
+Listing data comes from a pluggable backend: any object with an
+``async fetch(url)`` returning a dict of raw fields. :class:`HttpJsonBackend`
+asks a listing-data service (``LISTING_API_URL``) for
+``GET <endpoint>?url=<listing url>`` over a pool of keep-alive connections;
+:class:`StandInServer` is a local service answering from a fixtures file, for
+development and benchmarks. :class:`ListingImporter` adds an on-disk LRU
+response cache with a TTL (read and written off the event loop), a
+concurrency limit and coalescing of duplicate URLs.
+:class:`BackgroundImporter` runs it on its own event loop so the page can hand
+off a URL and keep rendering.
+"""
+import argparse
+import asyncio
+import csv
+import hashlib
+import http.client
+import json
+import os
+import queue
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlencode, urlsplit, urlunsplit
+
+from calculator.rates import STATES
+
+# Raw fields a backend may return; everything is optional except the URL
+LISTING_FIELDS = ("address", "state", "zip_code", "price", "monthly_rent", "annual_gross_rents", "noi")
+
+# Listing field -> query param it fills in, per property type
+RESIDENTIAL_PARAMS = {
+    "price": "purchase_price",
+    "monthly_rent": "monthly_rent",
+    "state": "state",
+    "zip_code": "zip_code",
+}
+
+COMMERCIAL_PARAMS = {
+    "price": "comm_purchase_price",
+    "annual_gross_rents": "comm_annual_gross_rents",
+    "noi": "comm_annual_noi_listing",
+    "state": "comm_state",
+    "zip_code": "comm_zip_code",
+}
+
+PARAMS = {"Residential": RESIDENTIAL_PARAMS, "Commercial": COMMERCIAL_PARAMS}
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "property-calculator", "listings")
+
+
+class ListingError(Exception):
+    """A listing could not be fetched or the service returned nothing usable"""
+
+
+def normalize_url(url):
+    """Listing URL without query string, fragment, trailing slash or case differences in the host"""
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        raise ListingError(f"Not a listing URL: {url!r}") from None
+    if parts.scheme not in ("http", "https") or not parts.netloc:
+        raise ListingError(f"Not a listing URL: {url!r}")
+    return urlunsplit(("https", parts.netloc.lower().removeprefix("www."), parts.path.rstrip("/"), "", ""))
+
+
+def _number(value):
+    if value is None or isinstance(value, (int, float)):
+        return value
+    text = re.sub(r"[$,\s]", "", str(value))
+    return float(text) if text else None
+
+
+def clean_listing(raw, url):
+    """Listing dict with numbers parsed ("$1,250,000" -> 1250000.0), state/ZIP normalized and rents filled in"""
+    listing = {"url": url}
+    for field in LISTING_FIELDS:
+        value = raw.get(field)
+        if field in ("price", "monthly_rent", "annual_gross_rents", "noi"):
+            try:
+                value = _number(value)
+            except ValueError:
+                raise ListingError(f"Bad {field} {value!r} for {url}") from None
+        elif value is not None:
+            value = str(value).strip()
+        listing[field] = value
+
+    state = (listing["state"] or "").upper()
+    listing["state"] = state if state in STATES else None
+    zip_code = re.match(r"\d{5}", listing["zip_code"] or "")
+    listing["zip_code"] = zip_code.group() if zip_code else None
+
+    # Residential listings quote monthly rent, commercial ones annual rents
+    if listing["monthly_rent"] is None and listing["annual_gross_rents"] is not None:
+        listing["monthly_rent"] = listing["annual_gross_rents"] / 12
+    if listing["annual_gross_rents"] is None and listing["monthly_rent"] is not None:
+        listing["annual_gross_rents"] = listing["monthly_rent"] * 12
+    return listing
+
+
+def to_params(listing, property_type):
+    """Query-param values the listing fills in for one property type (fields it lacks are left out)"""
+    return {param: listing[field] for field, param in PARAMS[property_type].items()
+            if listing.get(field) is not None}
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class ResponseCache:
+    """One JSON file per listing URL under ``directory``, at most ``maxsize`` of them
+
+    Entries older than ``ttl`` seconds are misses and are deleted; past
+    ``maxsize`` files the least recently used is evicted. Recency is kept in
+    memory and in the files' mtimes, so it survives a restart. Thread-safe, so
+    the importer can read and write it from worker threads.
+    """
+
+    def __init__(self, directory, ttl=86400, maxsize=10_000):
+        self.directory = directory
+        self.ttl = ttl
+        self.maxsize = maxsize
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._names = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _name(self, url):
+        return hashlib.sha256(url.encode()).hexdigest()[:32] + ".json"
+
+    def _index(self):
+        """Cached file names, least recently used first; read from the directory on first use (under the lock)"""
+        if self._names is None:
+            entries = []
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(".json"):
+                    try:
+                        entries.append((entry.stat().st_mtime, entry.name))
+                    except FileNotFoundError:
+                        pass
+            self._names = OrderedDict((name, None) for _, name in sorted(entries))
+            self._evict()
+        return self._names
+
+    def _evict(self):
+        while len(self._names) > self.maxsize:
+            name, _ = self._names.popitem(last=False)
+            _remove(os.path.join(self.directory, name))
+            self.evictions += 1
+
+    def get(self, url):
+        name = self._name(url)
+        path = os.path.join(self.directory, name)
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            entry = None
+        with self._lock:
+            names = self._index()
+            if entry is None or entry.get("url") != url:
+                self.misses += 1
+                return None
+            if time.time() - entry.get("fetched", 0) > self.ttl:
+                names.pop(name, None)
+                _remove(path)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            names[name] = None
+            names.move_to_end(name)
+            self.hits += 1
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry["listing"]
+
+    def set(self, url, listing):
+        name = self._name(url)
+        path = os.path.join(self.directory, name)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"url": url, "fetched": time.time(), "listing": listing}, f)
+        os.replace(tmp, path)
+        with self._lock:
+            names = self._index()
+            names[name] = None
+            names.move_to_end(name)
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            for name in os.listdir(self.directory):
+                if name.endswith(".json"):
+                    _remove(os.path.join(self.directory, name))
+            self._names = OrderedDict()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._index())
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._index()),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+class HttpJsonBackend:
+    """``GET <endpoint>?url=<listing url>`` on a listing-data service that answers with JSON
+
+    Requests reuse up to ``pool_size`` keep-alive connections; blocking I/O runs
+    on a thread per pooled connection so the event loop never waits on a socket.
+    """
+
+    def __init__(self, endpoint, pool_size=8, timeout=10.0, headers=None):
+        parts = urlsplit(endpoint)
+        self.endpoint = endpoint
+        self.path = parts.path or "/"
+        self._connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        self._host = parts.netloc
+        self.timeout = timeout
+        self.headers = {"Accept": "application/json", "Connection": "keep-alive", **(headers or {})}
+        self.pool_size = pool_size
+        self._pool = queue.LifoQueue()
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="listing-http")
+        self.connections_opened = 0
+
+    def _connection(self):
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            self.connections_opened += 1
+            return self._connection_class(self._host, timeout=self.timeout)
+
+    def fetch_sync(self, url):
+        """Blocking fetch of one listing's raw fields"""
+        path = f"{self.path}?{urlencode({'url': url})}"
+        for attempt in range(2):
+            connection = self._connection()
+            try:
+                connection.request("GET", path, headers=self.headers)
+                response = connection.getresponse()
+                body = response.read()
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                # A pooled connection the server already closed; retry once on a fresh one
+                if attempt:
+                    raise
+                continue
+            if response.will_close:
+                connection.close()
+            else:
+                self._pool.put(connection)
+            break
+        if response.status == 404:
+            raise ListingError(f"No listing data for {url}")
+        if response.status >= 400:
+            raise ListingError(f"Listing service returned HTTP {response.status} for {url}")
+        try:
+            return json.loads(body)
+        except ValueError:
+            raise ListingError(f"Listing service returned invalid JSON for {url}") from None
+
+    async def fetch(self, url):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self.fetch_sync, url)
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        while not self._pool.empty():
+            self._pool.get_nowait().close()
+
+
+class ListingImporter:
+    """Cached, concurrency-limited listing fetches on top of a backend"""
+
+    def __init__(self, backend, cache=None, concurrency=8):
+        self.backend = backend
+        self.cache = cache
+        self.concurrency = concurrency
+        self._semaphore = None
+        self._in_flight = {}
+        self.stats = {"cache_hits": 0, "fetched": 0, "errors": 0, "fetch_seconds": 0.0}
+
+    async def fetch(self, url):
+        """Cleaned listing dict for one URL; raises ListingError"""
+        url = normalize_url(url)
+        if self.cache is not None:
+            # The cache is files on disk, so it is read and written on worker threads
+            listing = await asyncio.to_thread(self.cache.get, url)
+            if listing is not None:
+                self.stats["cache_hits"] += 1
+                return listing
+        # Concurrent requests for the same URL share one fetch
+        task = self._in_flight.get(url)
+        if task is None:
+            task = self._in_flight[url] = asyncio.ensure_future(self._fetch(url))
+            task.add_done_callback(lambda _: self._in_flight.pop(url, None))
+        return await asyncio.shield(task)
+
+    async def _fetch(self, url):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        async with self._semaphore:
+            start = time.perf_counter()
+            try:
+                listing = clean_listing(await self.backend.fetch(url), url)
+            except ListingError:
+                self.stats["errors"] += 1
+                raise
+            except Exception as exc:
+                self.stats["errors"] += 1
+                raise ListingError(f"Fetching {url} failed: {exc}") from exc
+            finally:
+                self.stats["fetch_seconds"] += time.perf_counter() - start
+        self.stats["fetched"] += 1
+        if self.cache is not None:
+            await asyncio.to_thread(self.cache.set, url, listing)
+        return listing
+
+    async def fetch_many(self, urls):
+        """One result per URL, in order: the listing dict, or the ListingError it raised"""
+        async def one(url):
+            try:
+                return await self.fetch(url)
+            except ListingError as exc:
+                return exc
+        return await asyncio.gather(*(one(url) for url in urls))
+
+
+class BackgroundImporter:
+    """A ListingImporter on a dedicated event-loop thread; ``submit`` returns a concurrent Future"""
+
+    def __init__(self, importer):
+        self.importer = importer
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="listing-importer", daemon=True)
+        self._thread.start()
+
+    def submit(self, url):
+        return asyncio.run_coroutine_threadsafe(self.importer.fetch(url), self._loop)
+
+    def submit_many(self, urls):
+        return asyncio.run_coroutine_threadsafe(self.importer.fetch_many(urls), self._loop)
+
+
+def default_importer():
+    """BackgroundImporter for ``LISTING_API_URL``, or None when no listing service is configured
+
+    ``LISTING_CACHE_DIR``, ``LISTING_CACHE_TTL`` (seconds), ``LISTING_CACHE_SIZE`` (files) and
+    ``LISTING_CONCURRENCY`` tune it.
+    """
+    endpoint = os.environ.get("LISTING_API_URL")
+    if not endpoint:
+        return None
+    concurrency = int(os.environ.get("LISTING_CONCURRENCY", 8))
+    cache = ResponseCache(os.environ.get("LISTING_CACHE_DIR", DEFAULT_CACHE_DIR),
+                          ttl=float(os.environ.get("LISTING_CACHE_TTL", 86400)),
+                          maxsize=int(os.environ.get("LISTING_CACHE_SIZE", 10_000)))
+    return BackgroundImporter(ListingImporter(HttpJsonBackend(endpoint, pool_size=concurrency), cache, concurrency))
+
+
+class StandInServer:
+    """Local listing-data service answering ``GET /listing?url=...`` from a dict of fixtures
+
+    Fixtures are keyed by listing URL and hold raw fields (see ``LISTING_FIELDS``);
+    ``latency`` seconds are added to every response to mimic a remote service.
+    """
+
+    def __init__(self, fixtures, host="127.0.0.1", port=0, latency=0.0):
+        self.fixtures = {normalize_url(url): fields for url, fields in fixtures.items()}
+        self.latency = latency
+        self.requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                from urllib.parse import parse_qs
+                server.requests += 1
+                if server.latency:
+                    time.sleep(server.latency)
+                query = parse_qs(urlsplit(self.path).query)
+                try:
+                    fields = server.fixtures.get(normalize_url(query.get("url", [""])[0]))
+                except ListingError:
+                    fields = None
+                body = json.dumps(fields if fields is not None else {"error": "not found"}).encode()
+                self.send_response(200 if fields is not None else 404)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def endpoint(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/listing"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="listing-stand-in", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def write_csv(path, urls, results, property_type):
+    """Listing results as a screen.py-ready CSV in the query-param column names of ``property_type``"""
+    params = list(PARAMS[property_type].values())
+    url_column = "property_url" if property_type == "Residential" else "comm_property_url"
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["property_type", url_column, "address"] + params + ["import_error"])
+        writer.writeheader()
+        for url, result in zip(urls, results):
+            row = {"property_type": property_type, url_column: url}
+            if isinstance(result, Exception):
+                row["import_error"] = str(result)
+            else:
+                row.update(to_params(result, property_type), address=result.get("address") or "")
+            writer.writerow(row)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m calculator.listings", description="Listing-data importer")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", help="run the stand-in listing service")
+    serve.add_argument("fixtures", help="JSON file mapping listing URLs to raw fields")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+
+    batch = commands.add_parser("import", help="fetch listing data for a file of URLs (one per line)")
+    batch.add_argument("urls")
+    batch.add_argument("-o", "--output", required=True, help="CSV to write (query-param columns, ready for screen.py)")
+    batch.add_argument("--property-type", choices=list(PARAMS), default="Residential")
+    batch.add_argument("--endpoint", default=os.environ.get("LISTING_API_URL"), help="listing service (default: $LISTING_API_URL)")
+    batch.add_argument("--concurrency", type=int, default=16)
+    batch.add_argument("--cache-dir", default=os.environ.get("LISTING_CACHE_DIR", DEFAULT_CACHE_DIR))
+    batch.add_argument("--cache-ttl", type=float, default=86400)
+    batch.add_argument("--cache-size", type=int, default=int(os.environ.get("LISTING_CACHE_SIZE", 10_000)),
+                       help="most listings kept on disk; the least recently used are evicted")
+    batch.add_argument("--no-cache", action="store_true")
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        with open(args.fixtures) as f:
+            server = StandInServer(json.load(f), port=args.port, latency=args.latency)
+        print(f"Serving {len(server.fixtures)} listings at {server.endpoint}", file=sys.stderr)
+        try:
+            server.httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    if not args.endpoint:
+        parser.error("no listing service: pass --endpoint or set LISTING_API_URL")
+    with open(args.urls) as f:
+        urls = [line.strip() for line in f if line.strip()]
+    backend = HttpJsonBackend(args.endpoint, pool_size=args.concurrency)
+    cache = None if args.no_cache else ResponseCache(args.cache_dir, ttl=args.cache_ttl, maxsize=args.cache_size)
+    importer = ListingImporter(backend, cache, args.concurrency)
+
+    start = time.perf_counter()
+    results = asyncio.run(importer.fetch_many(urls))
+    elapsed = time.perf_counter() - start
+    backend.close()
+    write_csv(args.output, urls, results, args.property_type)
+
+    failed = sum(isinstance(result, Exception) for result in results)
+    print(f"{len(urls):,} URLs in {elapsed:.2f}s ({len(urls) / elapsed if elapsed else 0:,.0f}/s): "
+          f"{importer.stats['fetched']:,} fetched, {importer.stats['cache_hits']:,} cached, {failed:,} failed, "
+          f"{backend.connections_opened} connections", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+"""Exact fixed-point money: int64 cents and integer rates, for results that match a lender's table to the cent.
+
+The float formulas in :mod:`calculator.deals` and :mod:`calculator.amortization`
+are the fast path; their results are only rounded for display, so a 360-payment
+schedule summed in floats can be a few cents away from a lender's. Here every
+amount is an int64 number of cents and every rate an int64 number of
+``RATE_SCALE`` units (hundredths of a basis point, so 6.125% is exactly
+61_250). Each step rounds to the cent the way a lender does, half away from
+zero: the payment once, then each month's interest on the remaining balance,
+with the last payment clearing whatever is left.
+
+Everything is vectorized over deals; a schedule loops over payment months
+only, with one array operation per month across the whole batch.
+"""
+import numpy as np
+
+from calculator.deals import (CLOSING_COST_RATE, COMMERCIAL_PM_FEE_RATE, OCCUPANCY_RATES, RESIDENTIAL_INSURANCE_RATE,
+                              RESIDENTIAL_MAINTENANCE, RESIDENTIAL_PM_FEE_RATE, _scalar)
+
+RATE_SCALE = 1_000_000  # rate units per 1.0 (100%)
+
+
+def _round(values):
+    """Round half away from zero to int64"""
+    values = np.asarray(values, dtype=float)
+    return (np.sign(values) * np.floor(np.abs(values) + 0.5)).astype(np.int64)
+
+
+def to_cents(dollars):
+    return _round(np.asarray(dollars, dtype=float) * 100)
+
+
+def to_dollars(cents):
+    return _scalar(np.asarray(cents, dtype=np.int64) / 100)
+
+
+def to_rate(fraction):
+    """Rate units from a decimal rate (0.065 -> 65_000)"""
+    return _round(np.asarray(fraction, dtype=float) * RATE_SCALE)
+
+
+def divide(numerator, denominator):
+    """Integer division rounded half away from zero, exact for int64 operands"""
+    numerator = np.asarray(numerator, dtype=np.int64)
+    denominator = np.asarray(denominator, dtype=np.int64)
+    quotient = (2 * np.abs(numerator) + denominator) // (2 * denominator)
+    return np.sign(numerator) * quotient
+
+
+def apply_rate(cents, rate):
+    """``cents * rate`` to the nearest cent, ``rate`` in rate units"""
+    return divide(np.asarray(cents, dtype=np.int64) * rate, RATE_SCALE)
+
+
+def monthly_payment(loan_cents, rate, loan_years):
+    """Level monthly payment in cents, rounded to the cent; ``rate`` is the annual rate in rate units"""
+    loan_cents = np.asarray(loan_cents, dtype=np.int64)
+    rate = np.asarray(rate, dtype=np.int64)
+    num_payments = np.asarray(loan_years, dtype=np.int64) * 12
+    monthly_rate = rate / (12 * RATE_SCALE)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        growth = (1 + monthly_rate) ** num_payments
+        payment = np.where(rate == 0, 0.0, loan_cents * (monthly_rate * growth) / (growth - 1))
+    return np.where(rate == 0, divide(loan_cents, num_payments), _round(payment))
+
+
+def schedule(loan_cents, rate, loan_years):
+    """Every payment of the loan in int64 cents: payment number, principal, interest, balance
+
+    Same keys and shapes as :func:`calculator.amortization.schedule`, so
+    :func:`~calculator.amortization.annual_summary` works on it unchanged.
+    Interest each month is the balance times the monthly rate, rounded to the
+    cent; the final payment pays off the balance exactly.
+    """
+    loan_cents = np.asarray(loan_cents, dtype=np.int64)
+    rate = np.asarray(rate, dtype=np.int64)
+    num_payments = np.asarray(loan_years, dtype=np.int64) * 12
+    loan_cents, rate, num_payments = np.broadcast_arrays(loan_cents, rate, num_payments)
+    max_payments = int(np.max(num_payments))
+    payment = monthly_payment(loan_cents, rate, num_payments // 12)
+
+    principal = np.zeros(loan_cents.shape + (max_payments,), dtype=np.int64)
+    interest = np.zeros_like(principal)
+    balance = np.zeros_like(principal)
+    remaining = loan_cents.copy()
+    for k in range(max_payments):
+        active = k < num_payments
+        month_interest = divide(remaining * rate, 12 * RATE_SCALE)
+        month_principal = np.where(k == num_payments - 1, remaining, np.minimum(payment - month_interest, remaining))
+        month_principal = np.where(active, month_principal, 0)
+        interest[..., k] = np.where(active, month_interest, 0)
+        principal[..., k] = month_principal
+        remaining = remaining - month_principal
+        balance[..., k] = remaining
+    return {"Payment": np.arange(1, max_payments + 1), "Principal": principal, "Interest": interest,
+            "Balance": balance}
+
+
+def residential(deal):
+    """Exact monthly breakdown of a :class:`ResidentialDeal` in int64 cents, keyed like ``deal.metrics()``"""
+    price = to_cents(deal.purchase_price)
+    rent = to_cents(deal.monthly_rent)
+    amount_down = apply_rate(price, to_rate(deal.down_payment_pct))
+    loan_amount = price - amount_down
+    monthly_pi = monthly_payment(loan_amount, to_rate(deal.interest_rate), deal.loan_years)
+    monthly_insurance = divide(price * to_rate(RESIDENTIAL_INSURANCE_RATE), 12 * RATE_SCALE)
+    monthly_tax = divide(price * to_rate(deal.tax_rate), 12 * RATE_SCALE)
+    pm_fee = apply_rate(rent, to_rate(RESIDENTIAL_PM_FEE_RATE))
+    maintenance = to_cents(RESIDENTIAL_MAINTENANCE)
+    total_monthly = monthly_pi + monthly_insurance + monthly_tax + pm_fee + maintenance
+    result = {
+        "loan_amount": loan_amount,
+        "amount_down": amount_down,
+        "monthly_pi": monthly_pi,
+        "monthly_insurance": monthly_insurance,
+        "monthly_tax": monthly_tax,
+        "pm_fee": pm_fee,
+        "maintenance": maintenance,
+        "total_monthly": total_monthly,
+    }
+    for occupancy in OCCUPANCY_RATES:
+        result[f"cash_flow_{int(round(occupancy * 100))}"] = apply_rate(rent, to_rate(occupancy)) - total_monthly
+    return {name: _scalar(np.asarray(value)) for name, value in result.items()}
+
+
+def commercial(deal):
+    """Exact annual figures of a :class:`CommercialDeal` in int64 cents, keyed like ``deal.metrics()``"""
+    price = to_cents(deal.purchase_price)
+    gross = to_cents(deal.annual_gross_rents)
+    other_expenses = to_cents(deal.other_expenses)
+    amount_down = apply_rate(price, to_rate(deal.down_payment_pct))
+    closing_costs = apply_rate(price, to_rate(CLOSING_COST_RATE))
+    annual_insurance = apply_rate(price, to_rate(deal.insurance_rate))
+    annual_property_tax = apply_rate(price, to_rate(deal.tax_rate))
+    annual_pm_fee = apply_rate(gross, to_rate(COMMERCIAL_PM_FEE_RATE))
+    total_operating_expenses = annual_insurance + annual_property_tax + annual_pm_fee + other_expenses
+    adjusted_gross_income = gross - apply_rate(gross, to_rate(deal.vacancy_rate))
+    noi_estimated = adjusted_gross_income - total_operating_expenses
+    loan_amount = price - amount_down
+    payment = monthly_payment(loan_amount, to_rate(deal.interest_rate), deal.loan_years)
+    annual_debt_service = payment * 12
+    result = {
+        "amount_down": amount_down,
+        "closing_costs": closing_costs,
+        "total_cash_down": amount_down + closing_costs,
+        "annual_insurance": annual_insurance,
+        "annual_property_tax": annual_property_tax,
+        "annual_pm_fee": annual_pm_fee,
+        "total_operating_expenses": total_operating_expenses,
+        "adjusted_gross_income": adjusted_gross_income,
+        "noi_estimated": noi_estimated,
+        "loan_amount": loan_amount,
+        "monthly_payment": payment,
+        "annual_debt_service": annual_debt_service,
+        "annual_cash_flow": noi_estimated - annual_debt_service,
+    }
+    return {name: _scalar(np.asarray(value)) for name, value in result.items()}
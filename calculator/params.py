@@ -0,0 +1,91 @@
+"""Query-param names, their defaults, and builders from param mappings to deals.
+
+The same names are used in shareable URLs (``st.query_params``), in batch
+listing files and in API requests, so a shared link translates directly.
+"""
+import numpy as np
+
+from calculator.deals import CommercialDeal, ResidentialDeal
+
+PROPERTY_TYPES = ["Residential", "Commercial"]
+
+RESIDENTIAL_DEFAULTS = {
+    "purchase_price": 650000,
+    "down_payment": 20,
+    "interest_rate": 6.5,
+    "loan_years": 15,
+    "monthly_rent": 5000,
+    "state": "CA",
+    "zip_code": "",
+    "property_url": "",
+}
+
+# Excel defaults from Commercial_Prop_Screening_Tool.xlsx
+COMMERCIAL_DEFAULTS = {
+    "comm_state": "CA",
+    "comm_purchase_price": 1970000,
+    "comm_down_payment": 30,
+    "comm_annual_gross_rents": 152195,
+    "comm_annual_noi_listing": 106548,
+    "comm_vacancy_rate": 3,
+    "comm_other_expenses": 5000,
+    "comm_loan_years": 25,
+    "comm_interest_rate": 6.5,
+    "comm_zip_code": "",
+    "comm_property_url": "",
+}
+
+
+def _value(params, name, defaults):
+    """Param value with the default filled in, for scalars and columns alike"""
+    value = params.get(name)
+    if value is None:
+        return defaults[name]
+    if hasattr(value, "fillna"):
+        return value.fillna(defaults[name]).to_numpy()
+    if isinstance(value, np.ndarray) and value.dtype.kind == "f":
+        return np.where(np.isnan(value), defaults[name], value)
+    return value
+
+
+def residential_deal(params):
+    """ResidentialDeal from a mapping of residential query-param names"""
+    v = lambda name: _value(params, name, RESIDENTIAL_DEFAULTS)
+    return ResidentialDeal(
+        np.asarray(v("purchase_price"), dtype=float),
+        np.asarray(v("down_payment"), dtype=float),
+        np.asarray(v("interest_rate"), dtype=float),
+        np.asarray(v("loan_years"), dtype=float),
+        np.asarray(v("monthly_rent"), dtype=float),
+        np.asarray(v("state"), dtype=str),
+        zip_code=v("zip_code"),
+    )
+
+
+def commercial_deal(params):
+    """CommercialDeal from a mapping of commercial query-param names"""
+    v = lambda name: _value(params, name, COMMERCIAL_DEFAULTS)
+    return CommercialDeal(
+        np.asarray(v("comm_purchase_price"), dtype=float),
+        np.asarray(v("comm_down_payment"), dtype=float),
+        np.asarray(v("comm_annual_gross_rents"), dtype=float),
+        np.asarray(v("comm_vacancy_rate"), dtype=float),
+        np.asarray(v("comm_other_expenses"), dtype=float),
+        np.asarray(v("comm_interest_rate"), dtype=float),
+        np.asarray(v("comm_loan_years"), dtype=float),
+        np.asarray(v("comm_state"), dtype=str),
+        annual_noi_listing=v("comm_annual_noi_listing"),
+        zip_code=v("comm_zip_code"),
+    )
+
+
+def param_columns(rows, defaults):
+    """Column mapping for the builders from a list of param mappings; missing or blank values become defaults"""
+    columns = {}
+    for name, default in defaults.items():
+        values = [row.get(name) for row in rows]
+        if isinstance(default, str):
+            columns[name] = np.array([default if value in (None, "") else str(value) for value in values])
+        else:
+            columns[name] = np.array([default if value in (None, "") else value for value in values], dtype=float)
+    return columns
@@ -0,0 +1,223 @@
+"""Randomized parity checks between the calculation engine and the bundled workbooks.
+
+    python -m calculator.parity                       # 100k random cases per workbook
+    python -m calculator.parity --cases 1000000 --seed 7 --kind commercial
+
+Random deals are pushed through both ``CommercialDeal`` / ``ResidentialDeal``
+and the compiled workbook (:mod:`calculator.workbook`) in one vectorized pass.
+Each input is then redrawn on its own and only the workbook cells downstream
+of it are recomputed, which checks that every input reaches the same outputs
+in both. Interest rates stay above zero: the workbook blanks its loan cells at
+0% while the engine falls back to straight-line repayment.
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from calculator.amortization import balance_after
+from calculator.deals import CommercialDeal, ResidentialDeal
+from calculator.rates import STATES
+
+# Engine argument -> (workbook cell, factor from query-param units to workbook units)
+COMMERCIAL_INPUTS = {
+    "state": ("H1", None),
+    "purchase_price": ("H3", 1),
+    "down_payment": ("H5", 0.01),
+    "interest_rate": ("E4", 0.01),
+    "loan_years": ("E5", 1),
+    "annual_gross_rents": ("K4", 1),
+    "vacancy_rate": ("L5", 0.01),
+    "other_expenses": ("J11", 1),
+}
+
+RESIDENTIAL_INPUTS = {
+    "state": ("H1", None),
+    "purchase_price": ("H3", 1),
+    "down_payment": ("H5", 0.01),
+    "interest_rate": ("E4", 0.01),
+    "loan_years": ("E5", 1),
+    "monthly_rent": ("K4", 1),
+}
+
+# Workbook cell -> engine value for the same quantity (in workbook units)
+COMMERCIAL_OUTPUTS = {
+    "E3": lambda deal: deal.loan_amount,
+    "H4": lambda deal: deal.amount_down,
+    "J3": lambda deal: deal.closing_costs,
+    "H7": lambda deal: deal.monthly_payment,
+    "J7": lambda deal: deal.annual_debt_service,
+    "J8": lambda deal: deal.annual_insurance,
+    "J9": lambda deal: deal.annual_property_tax,
+    "J10": lambda deal: deal.annual_pm_fee,
+    "M4": lambda deal: deal.noi_estimated,
+    "L10": lambda deal: deal.annual_cash_flow,
+    "L11": lambda deal: deal.total_cash_down,
+    "L12": lambda deal: deal.cash_on_cash_return / 100,
+    # Ending balance after the 12th payment on the amortization table
+    "H24": lambda deal: balance_after(deal.loan_amount, deal.interest_rate, deal.loan_years, 12),
+}
+
+RESIDENTIAL_OUTPUTS = {
+    "E3": lambda deal: deal.loan_amount,
+    "H4": lambda deal: deal.amount_down,
+    "H7": lambda deal: deal.monthly_pi,
+    "H8": lambda deal: deal.monthly_insurance,
+    "H9": lambda deal: deal.monthly_tax,
+    "H10": lambda deal: deal.pm_fee,
+    "E8": lambda deal: deal.total_monthly,
+    "K10": lambda deal: deal.cash_flow(0.75),
+    "L10": lambda deal: deal.cash_flow(0.90),
+    "M10": lambda deal: deal.cash_flow(1.0),
+    "H24": lambda deal: balance_after(deal.loan_amount, deal.interest_rate, deal.loan_years, 12),
+}
+
+# Reported but not failed: deliberate differences between the app and the workbook
+RESIDENTIAL_KNOWN_DIFFERENCES = {
+    "K12": (lambda deal: deal.annual_return(0.75) / 100,
+            "workbook cash-on-cash divides by down payment + 3% closing costs (J12); "
+            "the app's Annual ROI divides by the down payment only"),
+    "L12": (lambda deal: deal.annual_return(0.90) / 100, "same as K12, at 90% occupancy"),
+}
+
+CHECKS = {
+    "commercial": (CommercialDeal, COMMERCIAL_INPUTS, COMMERCIAL_OUTPUTS, {}),
+    "residential": (ResidentialDeal, RESIDENTIAL_INPUTS, RESIDENTIAL_OUTPUTS, RESIDENTIAL_KNOWN_DIFFERENCES),
+}
+
+
+def random_inputs(kind, cases, rng):
+    """Random engine inputs in query-param units for ``cases`` deals"""
+    common = {
+        "state": rng.choice(STATES, cases),
+        "down_payment": rng.uniform(5, 95, cases),
+        "interest_rate": rng.uniform(0.25, 15, cases),
+    }
+    if kind == "commercial":
+        return {
+            **common,
+            "purchase_price": rng.uniform(300_000, 30_000_000, cases),
+            "loan_years": rng.integers(1, 31, cases),
+            "annual_gross_rents": rng.uniform(20_000, 3_000_000, cases),
+            "vacancy_rate": rng.uniform(0, 30, cases),
+            "other_expenses": rng.uniform(0, 200_000, cases),
+        }
+    return {
+        **common,
+        "purchase_price": rng.uniform(100_000, 2_000_000, cases),
+        "loan_years": rng.choice([15, 30], cases),
+        "monthly_rent": rng.uniform(500, 15_000, cases),
+    }
+
+
+def workbook_inputs(inputs, mapping, names=None):
+    """Engine inputs converted to ``{cell: values}``; states go in lower case like the workbooks' own H1"""
+    cells = {}
+    for name in names or mapping:
+        cell, factor = mapping[name]
+        value = inputs[name]
+        cells[cell] = np.char.lower(value.astype(str)) if factor is None else value * factor
+    return cells
+
+
+def compare(expected, actual, rtol, atol):
+    """(mismatches, max abs diff, max rel diff) between workbook and engine values"""
+    expected = np.broadcast_to(np.asarray(expected, dtype=float), np.shape(actual))
+    actual = np.asarray(actual, dtype=float)
+    diff = np.abs(expected - actual)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rel = np.where(expected != 0, diff / np.abs(expected), diff)
+    mismatches = int(np.count_nonzero(~np.isclose(actual, expected, rtol=rtol, atol=atol)))
+    return mismatches, float(np.nanmax(diff)), float(np.nanmax(rel))
+
+
+def check(kind, cases=100_000, seed=0, rtol=1e-9, atol=1e-6):
+    """Run the full-batch and per-input incremental parity checks for one workbook; returns a report dict"""
+    from calculator.workbook import load_model
+
+    deal_class, input_map, outputs, known = CHECKS[kind]
+    rng = np.random.default_rng(seed)
+    timings = {}
+
+    start = time.perf_counter()
+    model = load_model(kind, tuple(outputs) + tuple(known))
+    timings["compile_s"] = time.perf_counter() - start
+
+    inputs = random_inputs(kind, cases, rng)
+    start = time.perf_counter()
+    evaluation = model.evaluate(workbook_inputs(inputs, input_map))
+    timings["workbook_s"] = time.perf_counter() - start
+    start = time.perf_counter()
+    deal = deal_class(**inputs)
+    timings["engine_s"] = time.perf_counter() - start
+
+    report = {"kind": kind, "cases": cases, "seed": seed, "compiled_cells": len(model.order),
+              "outputs": {}, "known_differences": {}, "incremental": [], **timings}
+    for cell, engine_value in outputs.items():
+        mismatches, max_abs, max_rel = compare(evaluation[cell], engine_value(deal), rtol, atol)
+        report["outputs"][cell] = {"mismatches": mismatches, "max_abs_diff": max_abs, "max_rel_diff": max_rel}
+    for cell, (engine_value, reason) in known.items():
+        mismatches, max_abs, max_rel = compare(evaluation[cell], engine_value(deal), rtol, atol)
+        report["known_differences"][cell] = {"mismatches": mismatches, "max_rel_diff": max_rel, "reason": reason}
+
+    # Redraw one input at a time; only the cells downstream of it are recomputed
+    for name in input_map:
+        inputs[name] = random_inputs(kind, cases, rng)[name]
+        start = time.perf_counter()
+        updated = evaluation.recompute(workbook_inputs(inputs, input_map, [name]))
+        seconds = time.perf_counter() - start
+        deal = deal_class(**inputs)
+        mismatches = sum(compare(evaluation[cell], outputs[cell](deal), rtol, atol)[0]
+                         for cell in outputs if cell in updated)
+        report["incremental"].append({
+            "input": name,
+            "cell": input_map[name][0],
+            "cells_recomputed": len(updated) - 1,
+            "outputs_checked": sum(cell in updated for cell in outputs),
+            "mismatches": mismatches,
+            "seconds": seconds,
+        })
+
+    report["passed"] = (all(entry["mismatches"] == 0 for entry in report["outputs"].values())
+                        and all(entry["mismatches"] == 0 for entry in report["incremental"]))
+    return report
+
+
+def print_report(report):
+    print(f"{report['kind'].title()} workbook: {report['cases']:,} cases, {report['compiled_cells']} compiled cells "
+          f"(compile {report['compile_s']:.2f}s, workbook {report['workbook_s']:.2f}s, engine {report['engine_s']:.2f}s)")
+    for cell, entry in report["outputs"].items():
+        status = "ok" if entry["mismatches"] == 0 else f"{entry['mismatches']:,} MISMATCHES"
+        print(f"  {cell:<5} max rel diff {entry['max_rel_diff']:.2e}  {status}")
+    for entry in report["incremental"]:
+        status = "ok" if entry["mismatches"] == 0 else f"{entry['mismatches']:,} MISMATCHES"
+        print(f"  {entry['input']:<20} -> {entry['cells_recomputed']:>2} cells recomputed "
+              f"in {entry['seconds']:.3f}s, {entry['outputs_checked']} outputs checked  {status}")
+    for cell, entry in report["known_differences"].items():
+        print(f"  {cell:<5} known difference ({entry['mismatches']:,} cases differ): {entry['reason']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the calculation engine against the bundled workbooks")
+    parser.add_argument("--kind", choices=sorted(CHECKS), nargs="+", default=sorted(CHECKS))
+    parser.add_argument("--cases", type=int, default=100_000, help="random deals per workbook")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rtol", type=float, default=1e-9)
+    args = parser.parse_args(argv)
+
+    try:
+        import openpyxl  # noqa: F401
+    except ImportError:
+        sys.exit("Workbook parity checks need openpyxl: pip install openpyxl")
+
+    passed = True
+    for kind in args.kind:
+        report = check(kind, cases=args.cases, seed=args.seed, rtol=args.rtol)
+        print_report(report)
+        passed = passed and report["passed"]
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,241 @@
+"""Portfolio roll-ups: month-by-month cash flow, debt service, loan balance and equity across many deals.
+
+    python -m calculator.portfolio --by state property_type     # every deal in the deal library
+    python -m calculator.portfolio deals.csv --by vintage --months 120
+
+Each series is one contiguous ``(properties, months)`` float32 array on a
+shared calendar (a property is zero before the month it was acquired), so 10k
+properties over 360 months is about 14 MB per series instead of millions of
+row objects. Series are filled a block of properties at a time with the same
+growth assumptions as the pro forma (:mod:`calculator.proforma`), applied
+monthly: rents and expenses step up each year of ownership, value compounds
+monthly at the appreciation rate and the loan follows its own amortization.
+Roll-ups sort the properties by group once and sum each series with one
+``np.add.reduceat`` pass, accumulating in float64.
+
+Deals are dicts shaped like :meth:`DealLibrary.get` rows (``property_type``,
+``inputs``, optional ``name``) plus an optional ``acquired`` month
+(``"2021-06"``, a date, or a ``saved_at`` timestamp), which sets the vintage.
+"""
+import argparse
+import datetime
+import sys
+
+import numpy as np
+
+from calculator.amortization import balance_after
+from calculator.deals import COMMERCIAL_PM_FEE_RATE, RESIDENTIAL_PM_FEE_RATE
+from calculator.params import (COMMERCIAL_DEFAULTS, PROPERTY_TYPES, RESIDENTIAL_DEFAULTS, commercial_deal,
+                               param_columns, residential_deal)
+from calculator.proforma import DEFAULT_ASSUMPTIONS
+
+DEFAULT_MONTHS = 360
+SERIES = ("income", "expenses", "noi", "debt_service", "cash_flow", "loan_balance", "property_value", "equity")
+GROUPS = ("property_type", "state", "vintage")
+BALANCES = ("loan_balance", "property_value", "equity")  # point-in-time; the rest are monthly flows
+BLOCK_SIZE = 2_048  # properties filled per pass; bounds the float64 temporaries
+
+BUILDERS = {"Residential": residential_deal, "Commercial": commercial_deal}
+DEFAULTS = {"Residential": RESIDENTIAL_DEFAULTS, "Commercial": COMMERCIAL_DEFAULTS}
+
+
+def month_of(value, default=None):
+    """Acquisition month as ``numpy.datetime64[M]`` from text, a date or a Unix timestamp"""
+    if value is None or value == "":
+        return np.datetime64(default or datetime.date.today(), "M")
+    if isinstance(value, (int, float, np.number)):
+        return np.datetime64(datetime.datetime.fromtimestamp(float(value)).date(), "M")
+    return np.datetime64(str(value)[:7] if isinstance(value, str) else value, "M")
+
+
+def _monthly(deal, property_type, age, a):
+    """Income, expenses, debt service, balance and value for ``age`` (months owned, 1-based; <1 not owned)"""
+    owned = age >= 1
+    years = np.maximum(age - 1, 0) // 12
+    rent_growth = (1 + a["rent_growth"]) ** years
+    expense_growth = (1 + a["expense_growth"]) ** years
+    col = lambda value: np.asarray(value, dtype=float)[:, None]
+
+    if property_type == "Residential":
+        rent = col(deal.monthly_rent) * rent_growth
+        income = rent * a["occupancy"]
+        fixed = col(np.asarray(deal.monthly_insurance) + np.asarray(deal.monthly_tax) + deal.maintenance)
+        expenses = fixed * expense_growth + rent * RESIDENTIAL_PM_FEE_RATE
+        payment = col(deal.monthly_pi)
+    else:
+        gross = col(deal.annual_gross_rents) / 12 * rent_growth
+        income = gross * (1 - col(deal.vacancy_rate))
+        fixed = col(np.asarray(deal.annual_insurance) + np.asarray(deal.annual_property_tax)
+                    + np.asarray(deal.other_expenses)) / 12
+        expenses = fixed * expense_growth + gross * COMMERCIAL_PM_FEE_RATE
+        payment = col(deal.monthly_payment)
+
+    months_paid = np.clip(age, 0, None)
+    debt_service = np.where(owned & (age <= col(deal.loan_years) * 12), payment, 0.0)
+    balance = balance_after(col(deal.loan_amount), col(deal.interest_rate), col(deal.loan_years), months_paid)
+    value = col(deal.purchase_price) * (1 + a["appreciation"]) ** (months_paid / 12)
+    return {
+        "income": np.where(owned, income, 0.0),
+        "expenses": np.where(owned, expenses, 0.0),
+        "debt_service": debt_service,
+        "loan_balance": np.where(owned, balance, 0.0),
+        "property_value": np.where(owned, value, 0.0),
+    }
+
+
+class Portfolio:
+    """Monthly series for a set of deals, one ``(properties, months)`` array per entry of ``SERIES``
+
+    ``calendar`` holds the months (``datetime64[M]``) of the columns, starting at
+    the earliest acquisition. ``property_type``, ``state`` and ``vintage``
+    (acquisition year) are per-property arrays used for roll-ups.
+    """
+
+    def __init__(self, deals, months=DEFAULT_MONTHS, start=None, assumptions=None, dtype=np.float32):
+        a = {**DEFAULT_ASSUMPTIONS, **(assumptions or {})}
+        deals = list(deals)
+        count = len(deals)
+        acquired = np.array([month_of(deal.get("acquired", deal.get("saved_at"))) for deal in deals],
+                            dtype="datetime64[M]")
+        self.start = np.datetime64(start, "M") if start is not None else (acquired.min() if count else
+                                                                          month_of(None))
+        self.calendar = self.start + np.arange(months)
+        self.names = np.array([deal.get("name") or "" for deal in deals], dtype=object)
+        self.property_type = np.array([deal["property_type"] for deal in deals], dtype=str)
+        self.state = np.empty(count, dtype="<U2")
+        self.vintage = acquired.astype("datetime64[Y]").astype(int) + 1970
+        self.acquired = acquired
+        for name in SERIES:
+            setattr(self, name, np.zeros((count, months), dtype=dtype))
+
+        unknown = set(self.property_type) - set(PROPERTY_TYPES)
+        if unknown:
+            raise ValueError(f"Unknown property_type values: {sorted(unknown)}")
+        offsets = (acquired - self.start).astype(int)
+        t = np.arange(months)
+        for property_type in PROPERTY_TYPES:
+            rows = np.flatnonzero(self.property_type == property_type)
+            for block in range(0, len(rows), BLOCK_SIZE):
+                index = rows[block:block + BLOCK_SIZE]
+                deal = BUILDERS[property_type](param_columns([deals[i].get("inputs") or {} for i in index],
+                                                             DEFAULTS[property_type]))
+                self.state[index] = np.broadcast_to(deal.state, len(index))
+                values = _monthly(deal, property_type, t - offsets[index, None] + 1, a)
+                values["noi"] = values["income"] - values["expenses"]
+                values["cash_flow"] = values["noi"] - values["debt_service"]
+                values["equity"] = values["property_value"] - values["loan_balance"]
+                for name in SERIES:
+                    getattr(self, name)[index] = values[name]
+
+    def __len__(self):
+        return len(self.property_type)
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in SERIES)
+
+    def totals(self, series=SERIES):
+        """Whole-portfolio monthly totals (float64), one array per series"""
+        return {name: getattr(self, name).sum(axis=0, dtype=np.float64) for name in series}
+
+    def rollup(self, by=("property_type",), series=SERIES):
+        """Monthly totals per group: (list of group key tuples, {series: (groups, months) float64 array})
+
+        ``by`` names any of ``GROUPS``; properties are sorted by group once and
+        every series is summed with one ``reduceat`` pass.
+        """
+        unknown = set(by) - set(GROUPS)
+        if unknown:
+            raise ValueError(f"by must name {GROUPS}, got {sorted(unknown)}")
+        if not len(self):
+            return [], {name: np.zeros((0, len(self.calendar))) for name in series}
+        labels, codes = [], []
+        for name in by:
+            values, code = np.unique(getattr(self, name), return_inverse=True)
+            labels.append(values)
+            codes.append(code)
+        shape = [len(values) for values in labels]
+        group = np.ravel_multi_index(codes, shape) if by else np.zeros(len(self), dtype=int)
+        order = np.argsort(group, kind="stable")
+        sorted_group = group[order]
+        starts = np.flatnonzero(np.r_[True, sorted_group[1:] != sorted_group[:-1]])
+        indices = np.unravel_index(sorted_group[starts], shape) if by else ()
+        keys = list(zip(*(values[index].tolist() for values, index in zip(labels, indices)))) if by else [()]
+        return keys, {
+            name: np.add.reduceat(getattr(self, name)[order], starts, axis=0, dtype=np.float64) for name in series
+        }
+
+    def annual(self, sums):
+        """Calendar-year roll-up of monthly sums: (years, sums) with flows totalled and balances at year end
+
+        ``sums`` maps series names to arrays whose last axis is ``calendar``,
+        as returned by :meth:`totals` and :meth:`rollup`.
+        """
+        years = self.calendar.astype("datetime64[Y]").astype(int) + 1970
+        starts = np.flatnonzero(np.r_[True, years[1:] != years[:-1]])
+        ends = np.r_[starts[1:], len(years)] - 1
+        result = {}
+        for name, values in sums.items():
+            if name in BALANCES:
+                result[name] = np.asarray(values, dtype=np.float64)[..., ends]
+            else:
+                result[name] = np.add.reduceat(np.asarray(values, dtype=np.float64), starts, axis=-1)
+        return years[starts], result
+
+    def frame(self, by=("property_type",), series=("cash_flow", "debt_service", "loan_balance", "equity"),
+              annual=False):
+        """Long DataFrame of a roll-up: one row per group and month (or calendar year)"""
+        import pandas as pd
+        keys, sums = self.rollup(by, series)
+        if annual:
+            periods, sums = self.annual(sums)
+        else:
+            periods = self.calendar.astype("datetime64[M]").astype("datetime64[ns]")
+        frames = []
+        for i, key in enumerate(keys):
+            frame = pd.DataFrame({name: sums[name][i] for name in series})
+            frame.insert(0, "year" if annual else "month", periods)
+            for position, (name, value) in enumerate(zip(by, key)):
+                frame.insert(position, name, value)
+            frames.append(frame)
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=[*by, *series])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Roll saved or listed deals up into monthly portfolio series")
+    parser.add_argument("input", nargs="?", help="CSV of deals (query-param columns, optional property_type, "
+                                                 "name and acquired); default: the deal library")
+    parser.add_argument("--by", nargs="*", choices=GROUPS, default=["property_type"], help="group columns")
+    parser.add_argument("--months", type=int, default=DEFAULT_MONTHS)
+    parser.add_argument("--annual", action="store_true", help="calendar-year totals instead of months")
+    parser.add_argument("-o", "--output", help="CSV to write (default: print the first year of each group)")
+    args = parser.parse_args(argv)
+
+    if args.input:
+        from calculator.export import read_deals
+        import pandas as pd
+        deals = read_deals(args.input)
+        acquired = pd.read_csv(args.input, dtype=str, keep_default_na=False).get("acquired")
+        if acquired is not None:
+            for deal, month in zip(deals, acquired):
+                deal["acquired"] = month
+    else:
+        from calculator.library import DealLibrary
+        deals = DealLibrary().deals()
+
+    import time
+    start = time.perf_counter()
+    portfolio = Portfolio(deals, months=args.months)
+    built = time.perf_counter() - start
+    frame = portfolio.frame(args.by, annual=args.annual)
+    print(f"{len(portfolio):,} properties x {args.months} months in {built:.2f}s "
+          f"({portfolio.nbytes / 2**20:,.1f} MB of series)", file=sys.stderr)
+    if args.output:
+        frame.to_csv(args.output, index=False)
+    else:
+        print(frame.groupby(list(args.by)).head(1 if args.annual else 12).to_string(index=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+"""Opt-in per-rerun profiling: section timings, process RSS and session-state size.
+
+The page starts a :class:`RerunProfiler` at the top of each script run, wraps
+its work in ``with section("calculations"):`` blocks and calls ``lap("inputs")``
+to charge straight-line script time to a name. Section times are exclusive
+(a nested section's time is not counted twice). ``section`` and ``lap`` find
+the profiler for the current script thread, so cached helpers can time
+themselves without it being passed around; with profiling off they do nothing.
+"""
+import json
+import logging
+import os
+import pickle
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger("property_calculator.profile")
+
+_current = threading.local()
+
+
+def enabled(environ, query_params):
+    """Profiling is on for every session via ``APP_PROFILING=1``, or per session via ``?debug=1``"""
+    def truthy(value):
+        return str(value).strip().lower() in ("1", "true", "yes", "on")
+    return truthy(environ.get("APP_PROFILING", "")) or truthy(query_params.get("debug", ""))
+
+
+def rss_bytes(pid=None):
+    """Resident set size of process ``pid`` (default: this one), or None without psutil"""
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process(pid).memory_info().rss
+
+
+def object_size(value):
+    """Approximate size of one value: its pickled length, or sys.getsizeof when it can't be pickled"""
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(value)
+
+
+def state_size(state, exclude=()):
+    """Total and per-key size in bytes of a session-state style mapping"""
+    sizes = {str(key): object_size(state[key]) for key in list(state.keys()) if key not in exclude}
+    return sum(sizes.values()), sizes
+
+
+class RerunProfiler:
+    """Timings and memory for one script run"""
+
+    def __init__(self, label="", clock=time.perf_counter):
+        self.label = label
+        self._clock = clock
+        self.started = clock()
+        self.timestamp = time.time()
+        self.sections = {}
+        self.calls = {}
+        self._stack = []
+        self._attributed = 0.0
+        self._lap_start = self.started
+        self._lap_attributed = 0.0
+        self.rss_start = rss_bytes()
+        self.rss_end = None
+        self.state_bytes = None
+        self.state_keys = {}
+        self.extra = {}
+        self.total = None
+
+    def activate(self):
+        """Make this the profiler ``section`` reports to on the current thread"""
+        _current.profiler = self
+        return self
+
+    def _add(self, name, seconds):
+        self.sections[name] = self.sections.get(name, 0.0) + seconds
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    @contextmanager
+    def section(self, name):
+        start = self._clock()
+        self._stack.append(0.0)
+        try:
+            yield
+        finally:
+            elapsed = self._clock() - start
+            self._add(name, elapsed - self._stack.pop())
+            if self._stack:
+                self._stack[-1] += elapsed
+            else:
+                self._attributed += elapsed
+
+    def lap(self, name):
+        """Charge the time since the previous lap, minus any sections inside it, to ``name``"""
+        now = self._clock()
+        self._add(name, now - self._lap_start - (self._attributed - self._lap_attributed))
+        self._lap_start, self._lap_attributed = now, self._attributed
+
+    def finish(self, session_state=None, exclude=(), **extra):
+        """Stop the clock, sample RSS and session-state size; returns the report dict"""
+        self.total = self._clock() - self.started
+        self.rss_end = rss_bytes()
+        if session_state is not None:
+            self.state_bytes, self.state_keys = state_size(session_state, exclude)
+        self.extra.update(extra)
+        if getattr(_current, "profiler", None) is self:
+            _current.profiler = None
+        return self.report()
+
+    def report(self):
+        total = self.total if self.total is not None else self._clock() - self.started
+        return {
+            "label": self.label,
+            "timestamp": self.timestamp,
+            "total_s": total,
+            "sections_s": dict(self.sections),
+            "section_calls": dict(self.calls),
+            "unattributed_s": max(total - sum(self.sections.values()), 0.0),
+            "rss_start_bytes": self.rss_start,
+            "rss_end_bytes": self.rss_end,
+            "session_state_bytes": self.state_bytes,
+            "session_state_keys": dict(sorted(self.state_keys.items(), key=lambda item: -item[1])),
+            **self.extra,
+        }
+
+    def log(self):
+        """Emit the report as one JSON line on the ``property_calculator.profile`` logger
+
+        Lines go to stderr, or are appended to the file named by ``APP_PROFILING_LOG``.
+        """
+        _ensure_handler()
+        logger.info(json.dumps(self.report(), default=str))
+
+
+def current():
+    """Profiler active on this thread, or None"""
+    return getattr(_current, "profiler", None)
+
+
+@contextmanager
+def section(name):
+    """Time a block against the active profiler; a no-op when profiling is off"""
+    profiler = current()
+    if profiler is None:
+        yield
+    else:
+        with profiler.section(name):
+            yield
+
+
+def lap(name):
+    """``RerunProfiler.lap`` on the active profiler; a no-op when profiling is off"""
+    profiler = current()
+    if profiler is not None:
+        profiler.lap(name)
+
+
+def _ensure_handler():
+    # Streamlit doesn't route third-party INFO logs anywhere, so profile lines get their own handler:
+    # JSON lines appended to APP_PROFILING_LOG when set, stderr otherwise
+    if not logger.handlers:
+        path = os.environ.get("APP_PROFILING_LOG")
+        handler = logging.FileHandler(path) if path else logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
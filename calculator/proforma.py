@@ -0,0 +1,195 @@
+"""Hold-period pro forma: yearly cash flow, loan paydown, sale proceeds, IRR, NPV and equity multiple.
+
+Rents grow at ``rent_growth``, operating expenses (insurance, tax, maintenance
+and other expenses) at ``expense_growth`` and the property value at
+``appreciation``, compounding from year one. The loan amortizes on its own
+schedule and its remaining balance is paid off from the sale at the end of
+the hold. Every deal in a batch is projected together as
+``deal_shape + (years,)`` arrays, and IRR is solved for all of them at once by
+Newton steps kept inside a shrinking sign-change bracket (bisection when a
+step would leave it), so thousands of deals cost a few dozen NumPy passes
+instead of one root-finder loop per deal.
+"""
+import numpy as np
+
+from calculator.amortization import balance_after
+from calculator.deals import COMMERCIAL_PM_FEE_RATE, RESIDENTIAL_PM_FEE_RATE, _scalar
+
+DEFAULT_HOLD_YEARS = 10
+HOLD_YEARS_RANGE = (5, 30)  # hold periods the app offers
+
+# Per-deal results of a projection (the rest are yearly series)
+SUMMARY = ("initial_investment", "sale_price", "sale_proceeds", "irr", "npv", "equity_multiple", "total_profit")
+
+DEFAULT_ASSUMPTIONS = {
+    "rent_growth": 0.03,  # decimals per year
+    "expense_growth": 0.03,
+    "appreciation": 0.03,
+    "selling_costs": 0.06,  # broker and closing costs at sale, share of the sale price
+    "discount_rate": 0.08,  # for NPV
+    "occupancy": 0.90,  # residential only; commercial uses the deal's own vacancy rate
+}
+
+
+def _expand(value):
+    """A deal attribute (scalar or array) with a trailing year axis"""
+    return np.asarray(value, dtype=float)[..., None]
+
+
+def growth_index(rate, years):
+    """``(1 + rate) ** (year - 1)`` for years 1..``years``, shaped ``rate.shape + (years,)``"""
+    return (1 + _expand(rate)) ** np.arange(years)
+
+
+def npv(rate, cash_flows):
+    """Net present value at ``rate`` of yearly ``cash_flows`` (year 0 first, along the last axis)"""
+    cash_flows = np.asarray(cash_flows, dtype=float)
+    return _scalar((cash_flows / (1 + _expand(rate)) ** np.arange(cash_flows.shape[-1])).sum(axis=-1))
+
+
+def irr(cash_flows, low=-0.99, high=10.0, tol=1e-10, max_iter=100):
+    """Internal rate of return (decimal) of yearly ``cash_flows`` (year 0 first, along the last axis)
+
+    ``nan`` where NPV doesn't change sign between ``low`` and ``high``, e.g. a
+    deal whose cash flows are all negative.
+    """
+    cash_flows = np.asarray(cash_flows, dtype=float)
+    shape = cash_flows.shape[:-1]
+    flows = cash_flows.reshape(-1, cash_flows.shape[-1])
+
+    def value_and_slope(years, rate):
+        # Horner's rule in v = 1 / (1 + rate): one multiply-add per year, no powers
+        v = 1 / (1 + rate)
+        value, slope = years[-1].copy(), np.zeros_like(rate)
+        for flow in years[-2::-1]:
+            slope = slope * v + value
+            value = value * v + flow
+        return value, -slope * v * v
+
+    lo, hi = np.full(len(flows), float(low)), np.full(len(flows), float(high))
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        f_lo, _ = value_and_slope(flows.T, lo)
+        f_hi, _ = value_and_slope(flows.T, hi)
+        bracketed = np.sign(f_lo) * np.sign(f_hi) <= 0
+
+        # Iterate only the deals still moving; converged ones drop out of the arrays
+        rate = np.full(len(flows), np.nan)
+        active = np.flatnonzero(bracketed)
+        lo, hi, f_lo, flows = lo[active], hi[active], f_lo[active], flows[active]
+        # Start from the growth rate that turns the money in into the money out over the
+        # gap between their cash-weighted average dates
+        t = np.arange(flows.shape[1])
+        paid_in, paid_out = np.maximum(-flows, 0.0), np.maximum(flows, 0.0)
+        total_in, total_out = paid_in.sum(axis=1), paid_out.sum(axis=1)
+        span = np.maximum(paid_out @ t / total_out - paid_in @ t / total_in, 1.0)
+        r = np.clip(np.nan_to_num((total_out / total_in) ** (1 / span) - 1, nan=0.10), lo, hi)
+        years = np.ascontiguousarray(flows.T)
+        for _ in range(max_iter):
+            f, slope = value_and_slope(years, r)
+            # Keep [lo, hi] around the root: the end with the same sign as f moves to r
+            same = np.sign(f) == np.sign(f_lo)
+            lo, f_lo = np.where(same, r, lo), np.where(same, f, f_lo)
+            hi = np.where(same, hi, r)
+
+            newton = r - f / slope
+            step = np.where((newton >= lo) & (newton <= hi), newton, (lo + hi) / 2)
+            step = np.where(f == 0, r, step)
+            done = np.abs(step - r) <= tol * (1 + np.abs(r))
+            rate[active[done]] = step[done]
+            keep = ~done
+            if not keep.any():
+                break
+            active, r, lo, hi, f_lo, years = active[keep], step[keep], lo[keep], hi[keep], f_lo[keep], years[:, keep]
+        else:
+            rate[active] = r
+    return _scalar(rate.reshape(shape))
+
+
+def equity_multiple(cash_flows):
+    """Total distributions over total equity contributed (year-0 outlay plus any negative years)"""
+    cash_flows = np.asarray(cash_flows, dtype=float)
+    distributions = np.maximum(cash_flows, 0.0).sum(axis=-1)
+    contributions = np.maximum(-cash_flows, 0.0).sum(axis=-1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return _scalar(np.where(contributions > 0, distributions / contributions, np.inf))
+
+
+def _hold_years(hold_years):
+    years = int(hold_years)
+    if years < 1 or years != hold_years:
+        raise ValueError(f"hold_years must be a whole number of years >= 1, got {hold_years!r}")
+    return years
+
+
+def _project(deal, monthly_debt_payment, income, expenses, investment, years, a):
+    """Loan paydown, value, sale and return metrics shared by both property types"""
+    year = np.arange(1, years + 1)
+    loan_months = _expand(deal.loan_years) * 12
+    months_paid = np.clip(loan_months - 12 * (year - 1), 0, 12)
+    debt_service = _expand(monthly_debt_payment) * months_paid
+    noi = income - expenses
+    cash_flow = noi - debt_service
+
+    balance = balance_after(_expand(deal.loan_amount), _expand(deal.interest_rate), _expand(deal.loan_years),
+                            12 * year)
+    value = _expand(deal.purchase_price) * growth_index(a["appreciation"], years + 1)[..., 1:]
+    balance, value = np.broadcast_arrays(balance, value)
+    sale_price = value[..., -1]
+    sale_proceeds = sale_price * (1 - np.asarray(a["selling_costs"])) - balance[..., -1]
+
+    # Year 0 is the cash into the deal; the sale lands in the final year
+    investment = np.asarray(investment, dtype=float)
+    flows = np.concatenate([np.broadcast_to(-investment[..., None], cash_flow.shape[:-1] + (1,)), cash_flow],
+                           axis=-1)
+    flows[..., -1] += sale_proceeds
+
+    return {
+        "year": year,
+        "income": income,
+        "operating_expenses": expenses,
+        "noi": noi,
+        "debt_service": debt_service,
+        "cash_flow": cash_flow,
+        "loan_balance": balance,
+        "property_value": value,
+        "equity": value - balance,
+        "initial_investment": _scalar(investment),
+        "sale_price": _scalar(sale_price),
+        "sale_proceeds": _scalar(sale_proceeds),
+        "cash_flows": flows,
+        "irr": _scalar(np.asarray(irr(flows)) * 100),
+        "npv": npv(a["discount_rate"], flows),
+        "equity_multiple": equity_multiple(flows),
+        "total_profit": _scalar(flows.sum(axis=-1)),
+    }
+
+
+def residential_proforma(deal, hold_years=DEFAULT_HOLD_YEARS, assumptions=None):
+    """Yearly projection and hold-period returns for a :class:`ResidentialDeal`
+
+    Series (``income``, ``cash_flow``, ``loan_balance``, ``equity``, ...) are
+    annual dollars shaped ``deal_shape + (hold_years,)``; ``irr`` is in
+    percent. The equity in is the down payment, as in Annual ROI.
+    """
+    a = {**DEFAULT_ASSUMPTIONS, **(assumptions or {})}
+    years = _hold_years(hold_years)
+    rent = _expand(deal.monthly_rent) * 12 * growth_index(a["rent_growth"], years)
+    fixed = _expand(deal.monthly_insurance + deal.monthly_tax + deal.maintenance) * 12
+    income = rent * _expand(a["occupancy"])
+    expenses = fixed * growth_index(a["expense_growth"], years) + rent * RESIDENTIAL_PM_FEE_RATE
+    return _project(deal, deal.monthly_pi, income, expenses, deal.amount_down, years, a)
+
+
+def commercial_proforma(deal, hold_years=DEFAULT_HOLD_YEARS, assumptions=None):
+    """Yearly projection and hold-period returns for a :class:`CommercialDeal`
+
+    Same outputs as :func:`residential_proforma`; the equity in is the total
+    cash down (down payment plus closing costs), as in cash-on-cash return.
+    """
+    a = {**DEFAULT_ASSUMPTIONS, **(assumptions or {})}
+    years = _hold_years(hold_years)
+    gross = _expand(deal.annual_gross_rents) * growth_index(a["rent_growth"], years)
+    fixed = _expand(deal.annual_insurance + deal.annual_property_tax + deal.other_expenses)
+    income = gross * (1 - _expand(deal.vacancy_rate))
+    expenses = fixed * growth_index(a["expense_growth"], years) + gross * COMMERCIAL_PM_FEE_RATE
+    return _project(deal, deal.monthly_payment, income, expenses, deal.total_cash_down, years, a)
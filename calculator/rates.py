@@ -0,0 +1,299 @@
+"""Property tax and insurance rates by state, county and ZIP code.
+
+    python -m calculator.rates build --counties counties.csv --zips zips.csv
+    python -m calculator.rates info
+    python -m calculator.rates lookup AZ 85001 85251-1234
+
+State rates are the Excel lookup tables and always apply. County and ZIP
+rates come from an optional store directory (``data/rates``, or the one named
+by ``RATE_STORE_DIR``) of ``.npy`` arrays built from CSV files with
+``python -m calculator.rates build``. The store is memory-mapped once per
+process and shared by every session; lookups are binary searches over sorted
+integer keys, so a whole column of ZIP codes resolves in one call. A rate
+missing at one level falls back to the next: ZIP, then county, then state.
+
+CSV columns (rates are decimals, blanks fall back):
+
+    counties.csv  county_fips, state, tax_rate, commercial_tax_rate, commercial_insurance_rate
+    zips.csv      zip, county_fips, tax_rate, commercial_tax_rate, commercial_insurance_rate
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from functools import lru_cache
+
+import numpy as np
+
+STATES = ["AZ", "CA", "IN", "NV", "TX", "MI"]
+
+# Property tax by state; the Commercial workbook's SUMIF(P2:P7,H1,O2:O7) table has the same rates
+TAX_RATES = {
+    "AZ": 0.0062,
+    "CA": 0.0125,
+    "IN": 0.0137,
+    "NV": 0.0065,
+    "TX": 0.0170,
+    "MI": 0.0321
+}
+
+COMMERCIAL_TAX_RATES = TAX_RATES
+
+# Commercial insurance (Excel Q2:Q7)
+COMMERCIAL_INSURANCE_RATES = {
+    "AZ": 0.005,
+    "CA": 0.0125,
+    "IN": 0.005,
+    "NV": 0.005,
+    "TX": 0.005,
+    "MI": 0.005
+}
+
+# Rate kinds in store column order, with the state table each falls back to
+KINDS = ("tax", "commercial_tax", "commercial_insurance")
+STATE_TABLES = {
+    "tax": TAX_RATES,
+    "commercial_tax": COMMERCIAL_TAX_RATES,
+    "commercial_insurance": COMMERCIAL_INSURANCE_RATES,
+}
+CSV_COLUMNS = {kind: f"{kind}_rate" for kind in KINDS}
+
+FORMAT_VERSION = 1
+DEFAULT_STORE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "rates")
+
+
+def _scalar(value):
+    return value[()] if isinstance(value, np.ndarray) and value.ndim == 0 else value
+
+
+# Sorted key/rate arrays per rate table, built on first use (or by calculator.startup.prewarm)
+# and kept with a copy of the table they were built from
+_RATE_ARRAYS = {}
+
+
+def rate_arrays(table):
+    """Sorted state codes and matching rates for a rate table
+
+    Rebuilt whenever the table's contents change, so edited rates (e.g.
+    ``TAX_RATES["TX"] = ...``) show up on the next lookup.
+    """
+    cached = _RATE_ARRAYS.get(id(table))
+    if cached is None or cached[0] != table:
+        keys = np.array(sorted(table))
+        cached = _RATE_ARRAYS[id(table)] = (dict(table), keys, np.array([table[k] for k in keys], dtype=float))
+    return cached[1:]
+
+
+def lookup_rate(table, states, strict=True):
+    """Vectorized dict lookup of a per-state rate for one state or an array of states
+
+    Unknown states raise KeyError, or come back as NaN with ``strict=False``.
+    """
+    if isinstance(states, str):
+        if states not in table:
+            if not strict:
+                return np.float64(np.nan)
+            raise KeyError(f"No rate for state(s): {states!r}")
+        return np.float64(table[states])
+    keys, values = rate_arrays(table)
+    states = np.asarray(states)
+    idx = np.searchsorted(keys, states)
+    idx = np.clip(idx, 0, len(keys) - 1)
+    found = keys[idx] == states
+    if not np.all(found):
+        if not strict:
+            return _scalar(np.where(found, values[idx], np.nan))
+        missing = np.unique(states[~found]).tolist() if states.ndim else states.item()
+        raise KeyError(f"No rate for state(s): {missing!r}")
+    return _scalar(values[idx])
+
+
+def code_keys(codes):
+    """5-digit ZIP or county FIPS codes as uint32 keys; 0 where blank or malformed
+
+    Accepts strings (``"85001"``, ``"85001-1234"``, ``"04011"``), numbers, or
+    arrays/columns of either.
+    """
+    codes = np.asarray(codes)
+    if codes.dtype.kind in "iuf":
+        with np.errstate(invalid="ignore"):
+            valid = np.isfinite(codes) & (codes > 0) & (codes < 100_000) & (codes == np.floor(codes))
+        return np.where(valid, np.nan_to_num(codes), 0).astype(np.uint32)
+    head = np.char.strip(codes.astype(str)).astype("U5")
+    valid = np.char.isdigit(head) & (np.char.str_len(head) == 5)
+    return np.where(valid, head, "0").astype(np.uint32)
+
+
+def _blank(codes):
+    return codes is None or (isinstance(codes, str) and not codes.strip())
+
+
+def _search(keys, rates, query, column):
+    """Rates for ``query`` keys from one sorted level; NaN where the key is absent"""
+    if not len(keys):
+        return np.full(query.shape, np.nan)
+    idx = np.clip(np.searchsorted(keys, query), 0, len(keys) - 1)
+    found = (keys[idx] == query) & (query != 0)
+    return np.where(found, rates[idx, column], np.nan)
+
+
+class RateStore:
+    """County and ZIP rate arrays with state fallback
+
+    ``zip_keys``/``county_keys`` are sorted uint32 codes; ``zip_rates`` and
+    ``county_rates`` hold one row per key and one column per entry of ``KINDS``
+    (NaN where that level has no rate). ZIP rows are filled from their county
+    when the store is built, so a lookup needs one search per level.
+    """
+
+    def __init__(self, zip_keys=None, zip_rates=None, county_keys=None, county_rates=None, path=None):
+        empty_keys, empty_rates = np.zeros(0, dtype=np.uint32), np.zeros((0, len(KINDS)))
+        self.zip_keys = empty_keys if zip_keys is None else zip_keys
+        self.zip_rates = empty_rates if zip_rates is None else zip_rates
+        self.county_keys = empty_keys if county_keys is None else county_keys
+        self.county_rates = empty_rates if county_rates is None else county_rates
+        self.path = path
+
+    @classmethod
+    def open(cls, path):
+        """Memory-map a store directory written by :func:`build_store`"""
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        if meta.get("format") != FORMAT_VERSION:
+            raise ValueError(f"Rate store {path} has format {meta.get('format')}, expected {FORMAT_VERSION}")
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+                  for name in ("zip_keys", "zip_rates", "county_keys", "county_rates")}
+        return cls(**arrays, path=path)
+
+    def __repr__(self):
+        return f"RateStore({len(self.zip_keys)} ZIP codes, {len(self.county_keys)} counties, path={self.path!r})"
+
+    def lookup(self, kind, states, zip_codes=None, counties=None, strict=True):
+        """Rate of ``kind`` for each listing: its ZIP code, else its county, else its state"""
+        column = KINDS.index(kind)
+        shape = np.broadcast(*[np.asarray(value) for value in (states, zip_codes, counties)
+                               if value is not None]).shape
+        rates = np.full(shape, np.nan)
+        if not _blank(counties):
+            county = _search(self.county_keys, self.county_rates, code_keys(counties), column)
+            rates = np.broadcast_to(county, shape).copy()
+        if not _blank(zip_codes):
+            by_zip = np.broadcast_to(_search(self.zip_keys, self.zip_rates, code_keys(zip_codes), column), shape)
+            rates = np.where(np.isnan(by_zip), rates, by_zip)
+        missing = np.isnan(rates)
+        if missing.any():
+            states = np.broadcast_to(np.asarray(states), shape)
+            rates[missing] = lookup_rate(STATE_TABLES[kind], states[missing], strict)
+        return _scalar(rates)
+
+
+@lru_cache(maxsize=None)
+def rate_store(path=None):
+    """The process-wide store; state rates only when no store directory exists"""
+    path = path or os.environ.get("RATE_STORE_DIR") or DEFAULT_STORE_DIR
+    if not os.path.exists(os.path.join(path, "meta.json")):
+        return RateStore()
+    return RateStore.open(path)
+
+
+def lookup(kind, states, zip_codes=None, counties=None, strict=True):
+    """Rate of ``kind`` ("tax", "commercial_tax", "commercial_insurance") by ZIP, county or state
+
+    With no ZIP codes or counties this is a plain state lookup and the store is
+    never opened. ``strict=False`` gives NaN for listings with no rate at any
+    level instead of a KeyError.
+    """
+    if _blank(zip_codes) and _blank(counties):
+        return lookup_rate(STATE_TABLES[kind], states, strict)
+    return rate_store().lookup(kind, states, zip_codes, counties, strict)
+
+
+def _read_rates(path, key_column):
+    """``{key: (row dict, [rate per kind])}`` from one CSV file"""
+    rows = {}
+    with open(path, newline="") as f:
+        for line, row in enumerate(csv.DictReader(f), start=2):
+            key = int(code_keys(row.get(key_column, "")))
+            if not key:
+                raise ValueError(f"{path}:{line}: bad {key_column} {row.get(key_column)!r}")
+            if key in rows:
+                raise ValueError(f"{path}:{line}: duplicate {key_column} {row[key_column]}")
+            rates = []
+            for kind in KINDS:
+                text = (row.get(CSV_COLUMNS[kind]) or "").strip()
+                rate = float(text) if text else np.nan
+                if not (np.isnan(rate) or 0 <= rate < 1):
+                    raise ValueError(f"{path}:{line}: {CSV_COLUMNS[kind]} {text} is not a decimal rate")
+                rates.append(rate)
+            rows[key] = (row, rates)
+    return rows
+
+
+def _write_level(output, name, rows):
+    keys = np.array(sorted(rows), dtype=np.uint32)
+    rates = np.array([rows[key] for key in keys], dtype=float).reshape(len(keys), len(KINDS))
+    np.save(os.path.join(output, f"{name}_keys.npy"), keys)
+    np.save(os.path.join(output, f"{name}_rates.npy"), rates)
+    return len(keys)
+
+
+def build_store(output, zips=None, counties=None):
+    """Write a store directory from ZIP and/or county CSV files and return it opened"""
+    county_rows = _read_rates(counties, "county_fips") if counties else {}
+    zip_rows = _read_rates(zips, "zip") if zips else {}
+
+    # Fill ZIP gaps from the ZIP's county now so lookups don't chase it later
+    zip_rates = {}
+    for key, (row, rates) in zip_rows.items():
+        county = county_rows.get(int(code_keys(row.get("county_fips", ""))))
+        if county:
+            rates = [rate if not np.isnan(rate) else fallback for rate, fallback in zip(rates, county[1])]
+        zip_rates[key] = rates
+
+    os.makedirs(output, exist_ok=True)
+    meta = {
+        "format": FORMAT_VERSION,
+        "kinds": list(KINDS),
+        "built": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "sources": [os.path.basename(path) for path in (zips, counties) if path],
+        "zip_codes": _write_level(output, "zip", zip_rates),
+        "counties": _write_level(output, "county", {key: rates for key, (row, rates) in county_rows.items()}),
+    }
+    with open(os.path.join(output, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=1)
+    rate_store.cache_clear()
+    return RateStore.open(output)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m calculator.rates", description="County/ZIP rate store")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="build the store from CSV files")
+    build.add_argument("--zips", help="CSV with zip, county_fips and rate columns")
+    build.add_argument("--counties", help="CSV with county_fips, state and rate columns")
+    build.add_argument("-o", "--output", default=None, help=f"store directory (default: {DEFAULT_STORE_DIR})")
+    commands.add_parser("info", help="describe the active store")
+    find = commands.add_parser("lookup", help="resolve rates for ZIP codes in one state")
+    find.add_argument("state", choices=STATES)
+    find.add_argument("zip_codes", nargs="*")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        if not (args.zips or args.counties):
+            parser.error("build needs --zips and/or --counties")
+        output = args.output or os.environ.get("RATE_STORE_DIR") or DEFAULT_STORE_DIR
+        print(build_store(output, zips=args.zips, counties=args.counties))
+    elif args.command == "info":
+        print(rate_store())
+    else:
+        codes = np.array(args.zip_codes or [""])
+        for kind in KINDS:
+            rates = np.atleast_1d(lookup(kind, args.state, codes))
+            print(f"{kind:<22}" + "  ".join(f"{code or args.state}={rate:.4%}" for code, rate in zip(codes, rates)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""Score DataFrames of listings with the residential and commercial formulas.
+
+Input columns use the query-param names from ``calculator.params``; missing
+columns or blank cells fall back to the app defaults. A ``property_type``
+column ("Residential"/"Commercial") picks the formulas per row. With
+``exact=True`` the dollar outputs come from the integer-cents kernel in
+:mod:`calculator.money` instead of the float formulas; rates, ratios and the
+pro forma stay float. With ``errors="coerce"`` a bad row (unknown
+property_type, or a state with no tax rate) gets NaN outputs and a message in
+an ``error`` column instead of failing the whole frame.
+"""
+import numpy as np
+import pandas as pd
+
+from calculator import money, rates
+from calculator.deals import OCCUPANCY_RATES
+from calculator.params import COMMERCIAL_DEFAULTS, RESIDENTIAL_DEFAULTS, commercial_deal, residential_deal
+from calculator.proforma import commercial_proforma, residential_proforma
+from calculator.solver import commercial_targets, residential_targets
+
+# Hold-period returns over the default 10-year pro forma
+PROFORMA_OUTPUTS = ["irr", "npv", "equity_multiple"]
+
+RESIDENTIAL_OUTPUTS = (
+    ["loan_amount", "monthly_pi", "total_monthly"]
+    + [f"cash_flow_{int(round(r * 100))}" for r in OCCUPANCY_RATES]
+    + [f"annual_roi_{int(round(r * 100))}" for r in OCCUPANCY_RATES]
+    + ["max_price_target_return", "break_even_occupancy", "min_down_payment", "max_interest_rate"]
+    + PROFORMA_OUTPUTS
+)
+
+COMMERCIAL_OUTPUTS = [
+    "noi_estimated",
+    "annual_debt_service",
+    "annual_cash_flow",
+    "total_cash_down",
+    "cash_on_cash_return",
+    "dscr",
+    "max_price_target_return",
+    "max_price_target_dscr",
+    "break_even_occupancy",
+    "min_down_payment",
+    "max_interest_rate",
+] + PROFORMA_OUTPUTS
+
+# Solver and pro forma outputs shared by both property types get one column
+OUTPUT_COLUMNS = list(dict.fromkeys(RESIDENTIAL_OUTPUTS + COMMERCIAL_OUTPUTS))
+
+# (state column, ZIP column, rate kinds looked up, defaults) per property type
+RATE_INPUTS = {
+    "Residential": ("state", "zip_code", ["tax"], RESIDENTIAL_DEFAULTS),
+    "Commercial": ("comm_state", "comm_zip_code", ["commercial_tax", "commercial_insurance"], COMMERCIAL_DEFAULTS),
+}
+
+
+def score_residential(df, exact=False):
+    """Residential outputs for every row of ``df``, indexed like ``df``"""
+    deal = residential_deal(df)
+    projection = residential_proforma(deal)
+    metrics = {**deal.metrics(), **residential_targets(deal), **{name: projection[name] for name in PROFORMA_OUTPUTS}}
+    if exact:
+        metrics.update({name: money.to_dollars(cents) for name, cents in money.residential(deal).items()})
+    return pd.DataFrame(
+        {name: np.broadcast_to(metrics[name], len(df)) for name in RESIDENTIAL_OUTPUTS},
+        index=df.index,
+    )
+
+
+def score_commercial(df, exact=False):
+    """Commercial outputs for every row of ``df``, indexed like ``df``"""
+    deal = commercial_deal(df)
+    projection = commercial_proforma(deal)
+    metrics = {**deal.metrics(), **commercial_targets(deal), **{name: projection[name] for name in PROFORMA_OUTPUTS}}
+    if exact:
+        metrics.update({name: money.to_dollars(cents) for name, cents in money.commercial(deal).items()})
+    return pd.DataFrame(
+        {name: np.broadcast_to(metrics[name], len(df)) for name in COMMERCIAL_OUTPUTS},
+        index=df.index,
+    )
+
+
+def unrated(df, property_type, rows):
+    """Positions among ``rows`` (a boolean mask of ``df``) with no rate by ZIP or state, and their states"""
+    state_column, zip_column, kinds, defaults = RATE_INPUTS[property_type]
+    default = defaults[state_column]
+    if state_column in df.columns:
+        states = df[state_column][rows].fillna(default)
+    else:
+        states = pd.Series(default, index=df.index[rows])
+    # Only rows whose state is missing from a table can lack a rate; a ZIP-level rate may still cover them
+    rated = set.intersection(*(set(rates.STATE_TABLES[kind]) for kind in kinds))
+    candidates = np.flatnonzero(~states.isin(rated).to_numpy())
+    states = states.to_numpy()[candidates].astype(str)
+    zip_codes = df[zip_column][rows].fillna("").to_numpy()[candidates] if zip_column in df.columns else None
+    missing = np.zeros(len(candidates), dtype=bool)
+    for kind in kinds:
+        missing |= np.isnan(rates.lookup(kind, states, zip_codes, strict=False))
+    return candidates[missing], states[missing]
+
+
+def score_frame(df, property_type="Residential", exact=False, errors="raise"):
+    """Input columns plus every output column; outputs not applicable to a row are NaN
+
+    ``errors="raise"`` fails on the first bad row; ``errors="coerce"`` adds an
+    ``error`` column and leaves the bad rows' outputs NaN.
+    """
+    if "property_type" in df.columns:
+        kinds = df["property_type"].fillna(property_type).astype(str).str.capitalize()
+    else:
+        kinds = pd.Series(property_type, index=df.index)
+
+    scored = pd.DataFrame(np.nan, index=df.index, columns=OUTPUT_COLUMNS)
+    residential = (kinds == "Residential").to_numpy(copy=True)
+    commercial = (kinds == "Commercial").to_numpy(copy=True)
+    unknown = ~(residential | commercial)
+    if errors == "coerce":
+        messages = np.full(len(df), None, dtype=object)
+        messages[unknown] = [f"Unknown property_type {kind!r}" for kind in kinds[unknown]]
+        for name, rows in (("Residential", residential), ("Commercial", commercial)):
+            if rows.any():
+                positions, states = unrated(df, name, rows)
+                bad = np.flatnonzero(rows)[positions]
+                messages[bad] = [f"No rate for state {state!r}" for state in states.tolist()]
+                rows[bad] = False
+    elif unknown.any():
+        raise ValueError(f"Unknown property_type values: {sorted(kinds[unknown].unique())}")
+
+    if residential.any():
+        scored.loc[residential, RESIDENTIAL_OUTPUTS] = score_residential(df[residential], exact)
+    if commercial.any():
+        scored.loc[commercial, COMMERCIAL_OUTPUTS] = score_commercial(df[commercial], exact)
+
+    result = df.drop(columns=OUTPUT_COLUMNS + ["error"], errors="ignore")
+    result["property_type"] = kinds
+    if errors == "coerce":
+        result["error"] = messages
+    return pd.concat([result, scored], axis=1)
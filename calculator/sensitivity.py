@@ -0,0 +1,47 @@
+"""Sensitivity grids over price x interest rate x vacancy/occupancy.
+
+The deal classes broadcast, so a grid is just the axes reshaped onto
+orthogonal dimensions and pushed through the formulas once.
+"""
+import numpy as np
+
+from calculator.deals import CommercialDeal, ResidentialDeal
+
+
+def grid_axis(low, high, points):
+    """Evenly spaced axis values from ``low`` to ``high`` inclusive"""
+    return np.linspace(float(low), float(high), int(points))
+
+
+def _axes(prices, rates, third):
+    prices = np.asarray(prices, dtype=float)
+    rates = np.asarray(rates, dtype=float)
+    third = np.asarray(third, dtype=float)
+    return prices[:, None, None], rates[None, :, None], third[None, None, :]
+
+
+def commercial_grid(prices, rates, vacancies, down_payment, annual_gross_rents,
+                    other_expenses, loan_years, state):
+    """Annual cash flow and cash-on-cash over prices x rates (%) x vacancy rates (%)
+
+    Returns ``(annual_cash_flow, cash_on_cash_return)``, each shaped
+    ``(len(prices), len(rates), len(vacancies))``.
+    """
+    p, r, v = _axes(prices, rates, vacancies)
+    deal = CommercialDeal(p, down_payment, annual_gross_rents, v, other_expenses, r, loan_years, state)
+    shape = (p.shape[0], r.shape[1], v.shape[2])
+    return (np.broadcast_to(deal.annual_cash_flow, shape),
+            np.broadcast_to(deal.cash_on_cash_return, shape))
+
+
+def residential_grid(prices, rates, occupancies, down_payment, monthly_rent, loan_years, state):
+    """Monthly cash flow and annual ROI over prices x rates (%) x occupancy rates (0-1)
+
+    Returns ``(monthly_cash_flow, annual_roi)``, each shaped
+    ``(len(prices), len(rates), len(occupancies))``.
+    """
+    p, r, o = _axes(prices, rates, occupancies)
+    deal = ResidentialDeal(p, down_payment, r, loan_years, monthly_rent, state)
+    shape = (p.shape[0], r.shape[1], o.shape[2])
+    return (np.broadcast_to(deal.cash_flow(o), shape),
+            np.broadcast_to(deal.annual_return(o), shape))
@@ -0,0 +1,178 @@
+"""Compact, versioned, checksummed share tokens for the app's deal state, and server-side short IDs.
+
+A shared link carries the whole deal as one query param instead of one param
+per input:
+
+    ?d=1AQrH...                     instead of  ?property_type=...&purchase_price=...&down_payment=...
+    ?s=Xk3f9QbZ                     short ID of a stored token (``SnapshotStore``)
+
+Token layout, version 1: ``"1" + base64url(flag + crc32 + body)`` without
+padding. The body is the values of ``FIELDS_V1`` in that order, joined by
+``\\x1f``, with defaults left blank and trailing blanks dropped, so a deal
+that only changes the price is a dozen characters. ``flag`` is 1 when the body
+is raw-deflated (worth it once a listing URL is in it) and the CRC-32 of the
+body catches truncated or hand-edited links. Links from before tokens (one
+query param per input) are still read.
+"""
+import base64
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+from calculator.cache import canonical
+from calculator.params import COMMERCIAL_DEFAULTS, PROPERTY_TYPES, RESIDENTIAL_DEFAULTS
+
+TOKEN_PARAM = "d"
+SHORT_PARAM = "s"
+VERSION = "1"
+
+# Field order of version 1 tokens; new fields may only be appended
+FIELDS_V1 = (
+    "property_type",
+    "purchase_price", "down_payment", "interest_rate", "loan_years", "monthly_rent", "state", "zip_code",
+    "property_url",
+    "comm_state", "comm_purchase_price", "comm_down_payment", "comm_annual_gross_rents", "comm_annual_noi_listing",
+    "comm_vacancy_rate", "comm_other_expenses", "comm_loan_years", "comm_interest_rate", "comm_zip_code",
+    "comm_property_url",
+)
+DEFAULTS = {"property_type": PROPERTY_TYPES[0], **RESIDENTIAL_DEFAULTS, **COMMERCIAL_DEFAULTS}
+TYPE_CODES = {"Residential": "R", "Commercial": "C"}
+SEPARATOR = "\x1f"
+
+DEFAULT_SNAPSHOT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data",
+                                     "snapshots.sqlite3")
+SHORT_ID_LENGTH = 8
+BASE62 = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+
+
+class TokenError(ValueError):
+    pass
+
+
+def _text(value):
+    """Query-param text of a value: numbers canonical ("650000", "6.5"), strings stripped"""
+    if isinstance(value, str):
+        return value.strip()
+    return str(canonical(value))
+
+
+def default_state():
+    """Every shareable param at its default, as query-param text"""
+    return {name: _text(DEFAULTS[name]) for name in FIELDS_V1}
+
+
+def encode(state):
+    """Share token for a mapping of query-param names to values (missing names are defaults)"""
+    values = []
+    for name in FIELDS_V1:
+        value, default = _text(state.get(name, DEFAULTS[name])), _text(DEFAULTS[name])
+        if name == "property_type":
+            value, default = TYPE_CODES.get(value, value), TYPE_CODES[default]
+        values.append("" if value == default else value)
+    while values and not values[-1]:
+        values.pop()
+    body = SEPARATOR.join(values).encode()
+    packed, flag = body, b"\x00"
+    compressor = zlib.compressobj(9, zlib.DEFLATED, -15)
+    deflated = compressor.compress(body) + compressor.flush()
+    if len(deflated) < len(body):
+        packed, flag = deflated, b"\x01"
+    payload = flag + zlib.crc32(body).to_bytes(4, "big") + packed
+    return VERSION + base64.urlsafe_b64encode(payload).rstrip(b"=").decode()
+
+
+def decode(token):
+    """Full state (every field, query-param text) from a share token; raises TokenError if it is damaged"""
+    token = (token or "").strip()
+    if not token:
+        raise TokenError("Empty share token")
+    if token[0] != VERSION:
+        raise TokenError(f"Share token version {token[0]!r} is not supported")
+    try:
+        payload = base64.urlsafe_b64decode(token[1:] + "=" * (-len(token[1:]) % 4))
+    except ValueError:
+        raise TokenError("Share token is not valid base64") from None
+    if len(payload) < 5 or payload[0] not in (0, 1):
+        raise TokenError("Share token is truncated")
+    try:
+        body = zlib.decompress(payload[5:], -15) if payload[0] else payload[5:]
+    except zlib.error:
+        raise TokenError("Share token is corrupted") from None
+    if zlib.crc32(body).to_bytes(4, "big") != payload[1:5]:
+        raise TokenError("Share token checksum does not match")
+    try:
+        values = body.decode().split(SEPARATOR) if body else []
+    except UnicodeDecodeError:
+        raise TokenError("Share token is corrupted") from None
+    if len(values) > len(FIELDS_V1):
+        raise TokenError("Share token has more fields than version 1 allows")
+
+    state = default_state()
+    for name, value in zip(FIELDS_V1, values):
+        if value:
+            state[name] = value
+    codes = {code: name for name, code in TYPE_CODES.items()}
+    state["property_type"] = codes.get(state["property_type"], state["property_type"])
+    if state["property_type"] not in PROPERTY_TYPES:
+        raise TokenError(f"Unknown property type {state['property_type']!r} in share token")
+    return state
+
+
+def from_query(query, snapshots=None):
+    """Deal state from a link's query params: a token, a short ID (needs ``snapshots``), or one param per input"""
+    if query.get(TOKEN_PARAM):
+        return decode(query[TOKEN_PARAM])
+    if query.get(SHORT_PARAM) and snapshots is not None:
+        token = snapshots.get(query[SHORT_PARAM])
+        if token is None:
+            raise TokenError(f"No saved snapshot {query[SHORT_PARAM]!r}")
+        return decode(token)
+    state = default_state()
+    state.update({name: _text(query[name]) for name in FIELDS_V1 if query.get(name) not in (None, "")})
+    return state
+
+
+def short_id(token, length=SHORT_ID_LENGTH):
+    """Content-derived base62 ID of a token: the same deal always gets the same ID"""
+    number = int.from_bytes(hashlib.sha256(token.encode()).digest()[:16], "big")
+    chars = []
+    for _ in range(length):
+        number, digit = divmod(number, 62)
+        chars.append(BASE62[digit])
+    return "".join(chars)
+
+
+class SnapshotStore:
+    """Short ID -> share token table in SQLite, safe to share across threads"""
+
+    def __init__(self, path=None):
+        self.path = path or os.environ.get("SNAPSHOT_STORE_PATH") or DEFAULT_SNAPSHOT_PATH
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS snapshots "
+                             "(id TEXT PRIMARY KEY, token TEXT NOT NULL, created_at REAL NOT NULL)")
+
+    def put(self, token):
+        """Store a token (validated) and return its short ID"""
+        decode(token)
+        # On the rare ID collision with a different token, lengthen the ID until it is free
+        for length in range(SHORT_ID_LENGTH, 2 * SHORT_ID_LENGTH + 1):
+            snapshot_id = short_id(token, length)
+            with self._lock, self._db:
+                self._db.execute("INSERT OR IGNORE INTO snapshots (id, token, created_at) VALUES (?, ?, ?)",
+                                 (snapshot_id, token, time.time()))
+            if self.get(snapshot_id) == token:
+                return snapshot_id
+        raise RuntimeError(f"No free short ID for token {token!r}")
+
+    def get(self, snapshot_id):
+        with self._lock:
+            row = self._db.execute("SELECT token FROM snapshots WHERE id = ?", (snapshot_id,)).fetchone()
+        return row[0] if row else None
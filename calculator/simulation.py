@@ -0,0 +1,168 @@
+"""Monte Carlo risk simulation for vacancy, rent growth, expense inflation and rate resets.
+
+Each path draws a yearly vacancy rate, rent growth and expense inflation for
+every year of the horizon, plus a random-walk interest rate that the loan
+resets to at ``reset_year`` (the remaining balance is re-amortized over the
+remaining term). All paths are computed together as ``(paths, years)`` arrays;
+large runs can be split into chunks and spread across a process pool.
+"""
+import numpy as np
+
+from calculator.amortization import balance_after
+from calculator.deals import (
+    COMMERCIAL_PM_FEE_RATE,
+    RESIDENTIAL_PM_FEE_RATE,
+    CommercialDeal,
+    ResidentialDeal,
+    monthly_payment,
+)
+
+DEFAULT_ASSUMPTIONS = {
+    "vacancy_mean": 0.05,  # decimal; commercial defaults to the deal's own vacancy rate
+    "vacancy_sd": 0.03,
+    "rent_growth_mean": 0.03,
+    "rent_growth_sd": 0.02,
+    "expense_inflation_mean": 0.03,
+    "expense_inflation_sd": 0.015,
+    "rate_shock_sd": 0.75,  # percentage points per year
+    "reset_year": 5,  # years until the rate resets / loan is refinanced
+}
+# Long enough that the default reset shows up in the paths (years after ``reset_year`` pay the new rate)
+DEFAULT_YEARS = 10
+
+
+def _beta(rng, mean, sd, size):
+    """Beta draws with the given mean and standard deviation, clamped to a valid shape"""
+    mean = float(np.clip(mean, 0.0, 1.0))
+    if mean in (0.0, 1.0) or sd <= 0:
+        return np.full(size, mean)
+    variance = min(sd ** 2, mean * (1 - mean) * 0.99)
+    k = mean * (1 - mean) / variance - 1
+    return rng.beta(mean * k, (1 - mean) * k, size)
+
+
+def _growth_index(rates):
+    """Cumulative growth factor for each year, starting at 1.0 in year one"""
+    index = np.ones_like(rates)
+    index[:, 1:] = np.cumprod(1 + rates[:, :-1], axis=1)
+    return index
+
+
+def _draw(rng, paths, years, a):
+    """Draw every random input for ``paths`` paths over ``years`` years"""
+    size = (paths, years)
+    return {
+        "vacancy": _beta(rng, a["vacancy_mean"], a["vacancy_sd"], size),
+        "rent_index": _growth_index(rng.normal(a["rent_growth_mean"], a["rent_growth_sd"], size)),
+        "expense_index": _growth_index(rng.normal(a["expense_inflation_mean"], a["expense_inflation_sd"], size)),
+        "rate_walk": np.cumsum(rng.normal(0.0, a["rate_shock_sd"], size), axis=1),
+    }
+
+
+def _debt_service(loan_amount, interest_rate, loan_years, rate_walk, reset_year, years):
+    """Monthly P&I per path and year, with a one-time reset to the simulated rate after ``reset_year``
+
+    Years ``reset_year + 1`` onward pay the reset rate, so a reset at or past the
+    end of the horizon (or of the loan) leaves every path at the quoted payment.
+    """
+    base = monthly_payment(loan_amount, interest_rate / 100, loan_years)
+    payment = np.full(rate_walk.shape, float(base))
+    if 0 < reset_year < min(years, loan_years):
+        reset_rate = np.maximum(interest_rate + rate_walk[:, reset_year - 1], 0.0) / 100
+        balance = balance_after(loan_amount, interest_rate / 100, loan_years, reset_year * 12)
+        payment[:, reset_year:] = np.asarray(
+            monthly_payment(balance, reset_rate, loan_years - reset_year)
+        )[:, None]
+    return payment
+
+
+def _residential_chunk(inputs, a, paths, years, seed):
+    rng = np.random.default_rng(seed)
+    d = _draw(rng, paths, years, a)
+    deal = ResidentialDeal(**inputs)
+
+    rent = deal.monthly_rent * d["rent_index"]
+    income = rent * (1 - d["vacancy"])
+    fixed = (deal.monthly_insurance + deal.monthly_tax + deal.maintenance) * d["expense_index"]
+    pi = _debt_service(deal.loan_amount, inputs["interest_rate"], inputs["loan_years"],
+                       d["rate_walk"], a["reset_year"], years)
+    cash_flow = income - (pi + fixed + rent * RESIDENTIAL_PM_FEE_RATE)
+    cash_down = deal.purchase_price * deal.down_payment_pct
+    returns = cash_flow * 12 / cash_down * 100 if cash_down > 0 else np.zeros_like(cash_flow)
+    return cash_flow, returns
+
+
+def _commercial_chunk(inputs, a, paths, years, seed):
+    rng = np.random.default_rng(seed)
+    d = _draw(rng, paths, years, a)
+    deal = CommercialDeal(**inputs)
+
+    gross = deal.annual_gross_rents * d["rent_index"]
+    fixed = (deal.annual_insurance + deal.annual_property_tax + deal.other_expenses) * d["expense_index"]
+    noi = gross * (1 - d["vacancy"]) - (fixed + gross * COMMERCIAL_PM_FEE_RATE)
+    pi = _debt_service(deal.loan_amount, inputs["interest_rate"], inputs["loan_years"],
+                       d["rate_walk"], a["reset_year"], years)
+    cash_flow = noi - pi * 12
+    cash_down = deal.total_cash_down
+    returns = cash_flow / cash_down * 100 if cash_down > 0 else np.zeros_like(cash_flow)
+    return cash_flow, returns
+
+
+def _run(chunk_fn, inputs, assumptions, paths, years, seed, executor, chunks):
+    chunks = max(1, int(chunks or 1))
+    sizes = [paths // chunks + (1 if i < paths % chunks else 0) for i in range(chunks)]
+    seeds = np.random.SeedSequence(seed).spawn(chunks)
+    args = [(inputs, assumptions, size, years, s) for size, s in zip(sizes, seeds) if size]
+    if executor is None:
+        results = [chunk_fn(*arg) for arg in args]
+    else:
+        results = list(executor.map(chunk_fn, *zip(*args)))
+    return {
+        "cash_flow": np.concatenate([r[0] for r in results]),
+        "return": np.concatenate([r[1] for r in results]),
+    }
+
+
+def simulate_residential(purchase_price, down_payment, interest_rate, loan_years, monthly_rent, state,
+                         paths=100_000, years=DEFAULT_YEARS, assumptions=None, seed=None, executor=None, chunks=None):
+    """Monthly cash flow and annual ROI (%) per path and year, each shaped ``(paths, years)``
+
+    Pass a ``concurrent.futures`` executor and ``chunks`` to spread paths over workers.
+    """
+    a = {**DEFAULT_ASSUMPTIONS, "vacancy_mean": 0.10, **(assumptions or {})}
+    inputs = {"purchase_price": purchase_price, "down_payment": down_payment, "interest_rate": interest_rate,
+              "loan_years": loan_years, "monthly_rent": monthly_rent, "state": state}
+    return _run(_residential_chunk, inputs, a, paths, years, seed, executor, chunks)
+
+
+def simulate_commercial(purchase_price, down_payment, annual_gross_rents, vacancy_rate, other_expenses,
+                        interest_rate, loan_years, state, paths=100_000, years=DEFAULT_YEARS, assumptions=None,
+                        seed=None, executor=None, chunks=None):
+    """Annual cash flow and cash-on-cash (%) per path and year, each shaped ``(paths, years)``
+
+    Pass a ``concurrent.futures`` executor and ``chunks`` to spread paths over workers.
+    """
+    a = {**DEFAULT_ASSUMPTIONS, "vacancy_mean": vacancy_rate / 100, **(assumptions or {})}
+    inputs = {"purchase_price": purchase_price, "down_payment": down_payment,
+              "annual_gross_rents": annual_gross_rents, "vacancy_rate": vacancy_rate,
+              "other_expenses": other_expenses, "interest_rate": interest_rate,
+              "loan_years": loan_years, "state": state}
+    return _run(_commercial_chunk, inputs, a, paths, years, seed, executor, chunks)
+
+
+def summarize(result, percentiles=(5, 25, 50, 75, 95)):
+    """Distribution summary of a simulation: per-year percentiles and the odds of losing money"""
+    cash_flow = result["cash_flow"]
+    summary = {
+        "paths": cash_flow.shape[0],
+        "prob_negative_year1": float(np.mean(cash_flow[:, 0] < 0)),
+        "prob_negative_any_year": float(np.mean((cash_flow < 0).any(axis=1))),
+        "mean_cash_flow": cash_flow.mean(axis=0),
+        "mean_return": result["return"].mean(axis=0),
+    }
+    cf_pct = np.percentile(cash_flow, percentiles, axis=0)
+    ret_pct = np.percentile(result["return"], percentiles, axis=0)
+    for i, p in enumerate(percentiles):
+        summary[f"cash_flow_p{p}"] = cf_pct[i]
+        summary[f"return_p{p}"] = ret_pct[i]
+    return summary
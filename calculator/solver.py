@@ -0,0 +1,136 @@
+"""Inverse questions for a deal: the most you can pay, the least you can put down, the worst rate you can take.
+
+Cash flow is linear in the purchase price, the down payment and the occupancy,
+so those targets have closed forms. Only the maximum interest rate needs a
+root: the amortizing payment is convex and increasing in the rate, so Newton's
+method started above the root converges monotonically, vectorized over every
+deal at once.
+
+Outputs use the query-param units: prices in dollars, everything else in
+percent. ``nan`` means the target can't be reached at any value (e.g. no down
+payment gives positive cash flow); ``inf`` means any value works (e.g. an
+all-cash deal tolerates any interest rate).
+"""
+import numpy as np
+
+from calculator.deals import (
+    CLOSING_COST_RATE,
+    COMMERCIAL_PM_FEE_RATE,
+    RESIDENTIAL_INSURANCE_RATE,
+    RESIDENTIAL_MAINTENANCE,
+    RESIDENTIAL_PM_FEE_RATE,
+    _scalar,
+    monthly_payment,
+)
+
+DEFAULT_TARGET_RETURN = 8.0  # % cash-on-cash (commercial) or annual ROI (residential)
+DEFAULT_TARGET_DSCR = 1.25  # typical commercial lender minimum
+DEFAULT_OCCUPANCY = 0.90  # residential targets use the middle occupancy scenario
+MAX_RATE = 1.0  # rates above 100% a year are reported as inf
+
+
+def max_rate_for_payment(loan_amount, payment, loan_years, max_rate=MAX_RATE, tol=1e-10, max_iter=60):
+    """Highest annual rate (decimal) whose monthly P&I on ``loan_amount`` fits within ``payment``
+
+    ``nan`` when even a 0% loan costs more, ``inf`` when there is no loan or the
+    rate would exceed ``max_rate``.
+    """
+    loan_amount, payment, loan_years = np.broadcast_arrays(
+        np.asarray(loan_amount, dtype=float), np.asarray(payment, dtype=float), np.asarray(loan_years, dtype=float))
+    n = loan_years * 12
+    no_loan = loan_amount <= 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        feasible = payment >= loan_amount / n
+        beyond = loan_amount * monthly_payment(1.0, max_rate, loan_years) <= payment
+    active = feasible & ~no_loan & ~beyond
+
+    # Newton on f(m) = L * m g / (g - 1) - payment with g = (1 + m)^n, from m = max_rate / 12 downwards
+    m = np.full(loan_amount.shape, max_rate / 12)
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        for _ in range(max_iter):
+            g = (1 + m) ** n
+            factor = m * g / (g - 1)
+            slope = (g * (g - 1) - m * n * (1 + m) ** (n - 1)) / (g - 1) ** 2
+            step = np.where(active, (loan_amount * factor - payment) / (loan_amount * slope), 0.0)
+            step = np.nan_to_num(step)
+            m = np.maximum(m - step, 1e-15)
+            if not np.any(np.abs(step) > tol):
+                break
+
+    rate = np.where(no_loan | beyond, np.inf, np.where(feasible, m * 12, np.nan))
+    return _scalar(rate)
+
+
+def min_down_for_cash_flow(purchase_price, available, annual_rate, loan_years):
+    """Smallest down payment (decimal) whose P&I fits within ``available`` per month; nan if none does"""
+    purchase_price = np.asarray(purchase_price, dtype=float)
+    per_dollar = np.asarray(monthly_payment(1.0, annual_rate, loan_years), dtype=float)
+    available = np.asarray(available, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        down = 1 - available / (purchase_price * per_dollar)
+    return _scalar(np.where(available < 0, np.nan, np.clip(down, 0.0, 1.0)))
+
+
+def residential_targets(deal, target_return=DEFAULT_TARGET_RETURN, occupancy=DEFAULT_OCCUPANCY):
+    """Max price for ``target_return`` % annual ROI, break-even occupancy, min down % and max rate
+
+    ROI, the down payment and the rate are evaluated at ``occupancy`` (0-1).
+    """
+    price = np.asarray(deal.purchase_price, dtype=float)
+    rent = np.asarray(deal.monthly_rent, dtype=float)
+    down = np.asarray(deal.down_payment_pct, dtype=float)
+    per_dollar = np.asarray(monthly_payment(1.0, deal.interest_rate, deal.loan_years), dtype=float)
+
+    # Monthly cash flow = rent income - price * (costs per dollar of price)
+    income = rent * (occupancy - RESIDENTIAL_PM_FEE_RATE) - RESIDENTIAL_MAINTENANCE
+    price_costs = (RESIDENTIAL_INSURANCE_RATE + np.asarray(deal.tax_rate)) / 12 + (1 - down) * per_dollar
+    # P&I budget at the current price
+    available = income - price * (RESIDENTIAL_INSURANCE_RATE + np.asarray(deal.tax_rate)) / 12
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        max_price = income / (price_costs + target_return / 100 * down / 12)
+        break_even = np.asarray(deal.total_monthly) / rent * 100
+    return {
+        "max_price_target_return": _scalar(np.where(down > 0, np.maximum(max_price, 0.0), np.nan)),
+        "break_even_occupancy": _scalar(break_even),
+        "min_down_payment": _scalar(np.asarray(min_down_for_cash_flow(price, available, deal.interest_rate,
+                                                                      deal.loan_years)) * 100),
+        "max_interest_rate": _scalar(np.asarray(max_rate_for_payment(deal.loan_amount, available,
+                                                                     deal.loan_years)) * 100),
+    }
+
+
+def commercial_targets(deal, target_return=DEFAULT_TARGET_RETURN, target_dscr=DEFAULT_TARGET_DSCR):
+    """Max price for ``target_return`` % cash-on-cash and for ``target_dscr``, break-even occupancy, min down % and max rate
+
+    Down payment and rate are the limits for non-negative annual cash flow.
+    """
+    price = np.asarray(deal.purchase_price, dtype=float)
+    rents = np.asarray(deal.annual_gross_rents, dtype=float)
+    down = np.asarray(deal.down_payment_pct, dtype=float)
+    noi = np.asarray(deal.noi_estimated, dtype=float)
+    debt_service = np.asarray(deal.annual_debt_service, dtype=float)
+    per_dollar = np.asarray(monthly_payment(1.0, deal.interest_rate, deal.loan_years), dtype=float)
+
+    # NOI = operating income - price * (tax + insurance); debt service = price * (1 - down) * 12 * per_dollar
+    operating = rents * (1 - np.asarray(deal.vacancy_rate) - COMMERCIAL_PM_FEE_RATE) - np.asarray(deal.other_expenses)
+    price_costs = np.asarray(deal.tax_rate) + np.asarray(deal.insurance_rate)
+    debt_per_dollar = 12 * (1 - down) * per_dollar
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        max_price_return = operating / (price_costs + debt_per_dollar
+                                        + target_return / 100 * (down + CLOSING_COST_RATE))
+        max_price_dscr = operating / (price_costs + target_dscr * debt_per_dollar)
+        dscr = np.where(debt_service > 0, noi / debt_service, np.inf)
+        fixed_costs = rents * COMMERCIAL_PM_FEE_RATE + np.asarray(deal.other_expenses) + price * price_costs
+        break_even = (fixed_costs + debt_service) / rents * 100
+    return {
+        "max_price_target_return": _scalar(np.maximum(max_price_return, 0.0)),
+        "max_price_target_dscr": _scalar(np.maximum(max_price_dscr, 0.0)),
+        "dscr": _scalar(dscr),
+        "break_even_occupancy": _scalar(break_even),
+        "min_down_payment": _scalar(np.asarray(min_down_for_cash_flow(price, noi / 12, deal.interest_rate,
+                                                                      deal.loan_years)) * 100),
+        "max_interest_rate": _scalar(np.asarray(max_rate_for_payment(deal.loan_amount, noi / 12,
+                                                                     deal.loan_years)) * 100),
+    }
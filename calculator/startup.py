@@ -0,0 +1,149 @@
+"""Cold-start helpers: boot-time prewarming and an import-time report.
+
+    python -m calculator.startup            # import-time report for the app's dependencies
+    python -m calculator.startup --top 25   # show more modules
+
+``serve.py`` calls :func:`prewarm_in_background` so the heavy imports and the
+static tables are loaded while the server waits for its first session, and
+logs how long the server took to become healthy after the process started.
+"""
+import argparse
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+# Imported by the page on first render; the report and prewarm both cover these
+HEAVY_MODULES = ["numpy", "pandas", "plotly.graph_objects", "streamlit"]
+
+
+def _log(message):
+    print(f"[startup] {message}", flush=True)
+
+
+def prewarm():
+    """Import heavy modules, build static tables and run every calculation path once
+
+    Returns ``{step: seconds}``.
+    """
+    timings = {}
+
+    def step(name, func):
+        start = time.perf_counter()
+        func()
+        timings[name] = time.perf_counter() - start
+
+    for module in HEAVY_MODULES:
+        step(f"import {module}", lambda module=module: __import__(module))
+
+    def tables():
+        from calculator import rates
+        for table in rates.STATE_TABLES.values():
+            rates.rate_arrays(table)
+        rates.rate_store()
+
+    def calculations():
+        import numpy as np
+
+        from calculator.amortization import annual_summary, schedule
+        from calculator.params import commercial_deal, residential_deal
+        from calculator.sensitivity import commercial_grid
+        from calculator.simulation import simulate_commercial, summarize
+
+        residential_deal({})
+        deal = commercial_deal({})
+        annual_summary(schedule(deal.loan_amount, deal.interest_rate, deal.loan_years))
+        commercial_grid(np.linspace(1e6, 2e6, 5), np.linspace(5, 8, 4), np.linspace(0, 10, 3),
+                        30, 152195, 5000, 25, "CA")
+        summarize(simulate_commercial(1970000, 30, 152195, 3, 5000, 6.5, 25, "CA", paths=1000, seed=0))
+
+    step("static tables", tables)
+    step("calculation paths", calculations)
+    return timings
+
+
+def wait_until_healthy(port, process_start, timeout=120):
+    """Poll Streamlit's health endpoint; returns seconds from process start to healthy, or None"""
+    url = f"http://127.0.0.1:{port}/_stcore/health"
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=2) as response:
+                if response.status == 200:
+                    return time.time() - process_start
+        except OSError:
+            pass
+        time.sleep(0.1)
+    return None
+
+
+def prewarm_in_background(port, process_start=None):
+    """Start a daemon thread that prewarms and then logs time-to-healthy"""
+    if process_start is None:
+        try:
+            import psutil
+            process_start = psutil.Process().create_time()
+        except ImportError:
+            process_start = time.time()
+
+    def run():
+        timings = prewarm()
+        _log("prewarm " + ", ".join(f"{name} {seconds:.3f}s" for name, seconds in timings.items()))
+        ready = wait_until_healthy(port, process_start)
+        if ready is None:
+            _log(f"server on port {port} not healthy yet, giving up on the readiness timer")
+        else:
+            _log(f"server healthy {ready:.2f}s after process start")
+
+    thread = threading.Thread(target=run, name="prewarm", daemon=True)
+    thread.start()
+    return thread
+
+
+def import_times(module):
+    """Per-module import times for ``import module`` in a fresh interpreter
+
+    Returns ``(total_seconds, [(cumulative_seconds, self_seconds, name), ...])``.
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True, check=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us) / 1e6, int(self_us) / 1e6, name.strip()))
+    total = max((row[0] for row in rows if not row[2].startswith(" ")), default=0.0)
+    return total, rows
+
+
+def import_report(modules=None, top=15):
+    """Text report of cold import cost per heavy module and the slowest modules overall"""
+    modules = modules or HEAVY_MODULES
+    lines = ["Cold import time (fresh interpreter each):"]
+    slowest = {}
+    for module in modules:
+        total, rows = import_times(module)
+        lines.append(f"  {module:<16} {total:7.3f}s")
+        for cumulative, self_time, name in rows:
+            slowest[name] = max(slowest.get(name, 0.0), self_time)
+    lines.append(f"Top {top} modules by self time:")
+    for name, self_time in sorted(slowest.items(), key=lambda item: -item[1])[:top]:
+        lines.append(f"  {self_time:7.3f}s  {name}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report import-time cost of the app's heavy dependencies")
+    parser.add_argument("--top", type=int, default=15, help="how many of the slowest modules to list")
+    parser.add_argument("--prewarm", action="store_true", help="also time an in-process prewarm")
+    args = parser.parse_args(argv)
+    print(import_report(top=args.top))
+    if args.prewarm:
+        for name, seconds in prewarm().items():
+            print(f"  prewarm {name:<24} {seconds:7.3f}s")
+
+
+if __name__ == "__main__":
+    main()
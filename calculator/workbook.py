@@ -0,0 +1,513 @@
+"""Compiled, vectorized evaluation of the bundled screening workbooks.
+
+Each workbook is read once. The formula of every cell an output depends on is
+tokenized (openpyxl), translated into a NumPy expression and compiled into a
+Python callable, so one pass evaluates a whole batch of cases when the input
+cells are given as arrays. :meth:`Evaluation.recompute` re-evaluates only
+the cells downstream of the inputs that changed.
+
+Excel's "" (blank text) and error values both evaluate to NaN in numeric
+context, which covers the ``IFERROR(IF(...,""),"")`` pattern the workbooks use.
+Needs ``openpyxl``.
+"""
+import datetime
+import os
+import re
+import warnings
+from functools import lru_cache
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Workbook file and sheet holding the screening model
+WORKBOOKS = {
+    "commercial": (os.path.join(ROOT, "Commercial_Prop_Screening_Tool.xlsx"), "Apartment Investment"),
+    "residential": (os.path.join(ROOT, "Residential_Prop_Screening_Tool.xlsx"), "BuyRent Calculator"),
+}
+
+EXCEL_EPOCH = np.datetime64("1899-12-30", "D")
+
+_SHEET = r"(?:(?:'(?P<quoted>[^']+)'|(?P<plain>[^'!:$]+))!)?"
+_CELL_RANGE = re.compile(_SHEET + r"\$?(?P<c1>[A-Z]{1,3})\$?(?P<r1>\d+)(?::\$?(?P<c2>[A-Z]{1,3})\$?(?P<r2>\d+))?$")
+_ROW_RANGE = re.compile(_SHEET + r"\$?(?P<r1>\d+):\$?(?P<r2>\d+)$")
+
+
+def column_index(letters):
+    """1-based column number for column letters (``"A"`` -> 1, ``"AA"`` -> 27)"""
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - 64
+    return index
+
+
+def column_letters(index):
+    letters = ""
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def split_cell(coord):
+    """``"AB12"`` -> ``("AB", 12)``"""
+    match = re.match(r"^([A-Z]+)(\d+)$", coord)
+    return match.group(1), int(match.group(2))
+
+
+def excel_serial(value):
+    """Excel date serial number for a date or datetime"""
+    if isinstance(value, datetime.datetime):
+        value = value.date()
+    return float((np.datetime64(value, "D") - EXCEL_EPOCH).astype(int))
+
+
+# Excel functions, vectorized
+
+def _num(value):
+    """Numeric view of a value: "" becomes NaN, other text is left alone"""
+    if isinstance(value, str):
+        return np.nan if value == "" else value
+    return value
+
+
+def _flatten(args):
+    for arg in args:
+        if isinstance(arg, list):
+            yield from _flatten(arg)
+        else:
+            yield arg
+
+
+def _SUM(*args):
+    total = 0.0
+    for value in _flatten(args):
+        if not isinstance(value, str):
+            total = total + value
+    return total
+
+
+def _IF(condition, if_true=True, if_false=False):
+    condition, if_true, if_false = _num(condition), _num(if_true), _num(if_false)
+    if np.ndim(condition) == 0 and not isinstance(condition, np.ndarray):
+        if np.isnan(condition):
+            return np.nan
+        return if_true if condition else if_false
+    condition = np.asarray(condition, dtype=float)
+    return np.where(np.isnan(condition), np.nan, np.where(condition != 0, if_true, if_false))
+
+
+def _IFERROR(value, fallback):
+    value, fallback = _num(value), _num(fallback)
+    if isinstance(value, str):
+        return value
+    if np.ndim(value) == 0 and not isinstance(value, np.ndarray):
+        return value if np.isfinite(value) else fallback
+    return np.where(np.isfinite(value), value, fallback)
+
+
+def _matches(value, criterion):
+    """SUMIF equality criterion; text compares case-insensitively like Excel"""
+    if isinstance(value, str) or np.asarray(criterion).dtype.kind in "US":
+        return np.char.upper(np.asarray(criterion, dtype=str)) == str(value).upper()
+    return np.asarray(value) == criterion
+
+
+def _SUMIF(criteria_range, criterion, sum_range=None):
+    sum_range = criteria_range if sum_range is None else sum_range
+    total = 0.0
+    for value, addend in zip(_flatten([criteria_range]), _flatten([sum_range])):
+        total = total + np.where(_matches(value, criterion), _num(addend), 0.0)
+    return total
+
+
+def _PMT(rate, nper, pv, fv=0.0, when=0.0):
+    rate, nper, pv = np.asarray(rate, dtype=float), np.asarray(nper, dtype=float), np.asarray(pv, dtype=float)
+    growth = (1 + rate) ** nper
+    annuity = -(rate * (pv * growth + fv)) / ((1 + rate * when) * (growth - 1))
+    return np.where(rate == 0, -(pv + fv) / nper, annuity)
+
+
+def _FV(rate, nper, pmt, pv=0.0, when=0.0):
+    rate, nper = np.asarray(rate, dtype=float), np.asarray(nper, dtype=float)
+    growth = (1 + rate) ** nper
+    annuity = -(pv * growth + pmt * (1 + rate * when) * (growth - 1) / rate)
+    return np.where(rate == 0, -(pv + pmt * nper), annuity)
+
+
+def _IPMT(rate, per, nper, pv, fv=0.0):
+    return _FV(rate, np.asarray(per, dtype=float) - 1, _PMT(rate, nper, pv, fv), pv) * rate
+
+
+def _PPMT(rate, per, nper, pv, fv=0.0):
+    return _PMT(rate, nper, pv, fv) - _IPMT(rate, per, nper, pv, fv)
+
+
+def _TODAY():
+    return float((np.datetime64("today", "D") - EXCEL_EPOCH).astype(int))
+
+
+def _EOMONTH(start, months):
+    days = EXCEL_EPOCH + np.asarray(start, dtype=float).astype(int).astype("timedelta64[D]")
+    month_start = days.astype("datetime64[M]") + np.asarray(months, dtype=int) + 1
+    return (month_start.astype("datetime64[D]") - 1 - EXCEL_EPOCH).astype(int).astype(float)
+
+
+def _eq(left, right):
+    if isinstance(left, str) or isinstance(right, str):
+        return np.char.upper(np.asarray(left, dtype=str)) == np.char.upper(np.asarray(right, dtype=str))
+    return np.asarray(left) == np.asarray(right)
+
+
+def _concat(left, right):
+    return np.char.add(np.asarray(left, dtype=str), np.asarray(right, dtype=str))
+
+
+FUNCTIONS = {
+    "SUM": _SUM, "IF": _IF, "IFERROR": _IFERROR, "SUMIF": _SUMIF,
+    "PMT": _PMT, "FV": _FV, "IPMT": _IPMT, "PPMT": _PPMT, "TODAY": _TODAY, "EOMONTH": _EOMONTH,
+}
+_NAMESPACE = {"np": np, "_num": _num, "_eq": _eq, "_concat": _concat,
+              **{f"_{name}": func for name, func in FUNCTIONS.items()}}
+
+
+# Parsing: openpyxl tokens -> small tuples -> Python source
+
+class FormulaError(ValueError):
+    """A formula uses syntax or a function the compiler doesn't support"""
+
+
+class _Parser:
+    """Recursive-descent parser over openpyxl formula tokens, Excel operator precedence"""
+
+    COMPARISONS = ("=", "<>", "<", ">", "<=", ">=")
+
+    def __init__(self, formula):
+        from openpyxl.formula import Tokenizer
+        from openpyxl.formula.tokenizer import Token
+        self.Token = Token
+        text = formula if formula.startswith("=") else "=" + formula
+        self.tokens = [t for t in Tokenizer(text).items if t.type != Token.WSPACE]
+        self.pos = 0
+
+    def parse(self):
+        node = self.comparison()
+        if self.pos != len(self.tokens):
+            raise FormulaError(f"unexpected token {self.tokens[self.pos].value!r}")
+        return node
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def take(self):
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def infix(self, operators, operand):
+        node = operand()
+        while (token := self.peek()) is not None and token.type == self.Token.OP_IN and token.value in operators:
+            self.take()
+            node = ("binary", token.value, node, operand())
+        return node
+
+    def comparison(self):
+        return self.infix(self.COMPARISONS, self.concat)
+
+    def concat(self):
+        return self.infix(("&",), self.additive)
+
+    def additive(self):
+        return self.infix(("+", "-"), self.multiplicative)
+
+    def multiplicative(self):
+        return self.infix(("*", "/"), self.power)
+
+    def power(self):
+        return self.infix(("^",), self.unary)
+
+    def unary(self):
+        token = self.peek()
+        if token is not None and token.type == self.Token.OP_PRE:
+            self.take()
+            return ("unary", token.value, self.unary())
+        return self.postfix()
+
+    def postfix(self):
+        node = self.primary()
+        while (token := self.peek()) is not None and token.type == self.Token.OP_POST:
+            self.take()
+            node = ("percent", node)
+        return node
+
+    def primary(self):
+        Token = self.Token
+        token = self.take()
+        if token.type == Token.OPERAND:
+            if token.subtype == Token.NUMBER:
+                return ("num", float(token.value))
+            if token.subtype == Token.TEXT:
+                return ("str", token.value[1:-1].replace('""', '"'))
+            if token.subtype == Token.LOGICAL:
+                return ("num", 1.0 if token.value.upper() == "TRUE" else 0.0)
+            if token.subtype == Token.RANGE:
+                return ("ref", token.value)
+            raise FormulaError(f"unsupported operand {token.value!r}")
+        if token.type == Token.FUNC and token.subtype == Token.OPEN:
+            name, args = token.value[:-1].upper(), []
+            if self.peek().type == Token.FUNC and self.peek().subtype == Token.CLOSE:
+                self.take()
+                return ("func", name, args)
+            while True:
+                args.append(self.comparison())
+                token = self.take()
+                if token.type == Token.FUNC and token.subtype == Token.CLOSE:
+                    return ("func", name, args)
+                if token.type != Token.SEP:
+                    raise FormulaError(f"expected ',' or ')' in {name}(), got {token.value!r}")
+        if token.type == Token.PAREN and token.subtype == Token.OPEN:
+            node = self.comparison()
+            if self.take().type != Token.PAREN:
+                raise FormulaError("unbalanced parentheses")
+            return node
+        raise FormulaError(f"unexpected token {token.value!r}")
+
+
+@lru_cache(maxsize=None)
+def parse(formula):
+    """Parse tree for one formula (cached; named formulas are shared by every cell using them)"""
+    return _Parser(formula).parse()
+
+
+class WorkbookModel:
+    """Compiled formula graph for the cells a set of outputs depends on
+
+    The model itself is immutable once built; ``evaluate`` returns an
+    :class:`Evaluation` holding the values, which can be updated incrementally.
+    """
+
+    def __init__(self, cells, names, sheet, outputs):
+        self.sheet = sheet
+        self.outputs = tuple(outputs)
+        self._cells = cells
+        self._names = names
+        self.constants = {}
+        self.code = {}
+        self.functions = {}
+        self.dependencies = {}
+        self._compile_reachable(self.outputs)
+        self.order = self._topological_order()
+        self.dependents = {coord: set() for coord in self.dependencies}
+        for coord, deps in self.dependencies.items():
+            for dep in deps:
+                self.dependents.setdefault(dep, set()).add(coord)
+
+    # Compilation
+
+    def _compile_reachable(self, outputs):
+        pending = list(outputs)
+        while pending:
+            coord = pending.pop()
+            if coord in self.dependencies or coord in self.constants:
+                continue
+            value = self._cells.get(coord)
+            if isinstance(value, str) and value.startswith("="):
+                deps = set()
+                self.code[coord] = self._codegen(parse(value), coord, deps)
+                self.functions[coord] = eval(compile(f"lambda v: {self.code[coord]}",
+                                                     f"<{self.sheet}!{coord}>", "eval"), _NAMESPACE)
+                self.dependencies[coord] = deps
+                pending.extend(deps)
+            else:
+                self.constants[coord] = self._constant(value)
+
+    @staticmethod
+    def _constant(value):
+        if value is None:
+            return 0.0
+        if isinstance(value, (datetime.date, datetime.datetime)):
+            return excel_serial(value)
+        if isinstance(value, bool):
+            return float(value)
+        if isinstance(value, (int, float)):
+            return float(value)
+        return value
+
+    def _reference(self, text):
+        """('cells', [coords], is_range) or ('rows', first_row) for a reference, or None for a name"""
+        for pattern in (_CELL_RANGE, _ROW_RANGE):
+            match = pattern.match(text)
+            if not match:
+                continue
+            sheet = match.group("quoted") or match.group("plain")
+            if sheet is not None and sheet != self.sheet:
+                raise FormulaError(f"cross-sheet reference {text!r} is not supported")
+            if pattern is _ROW_RANGE:
+                return ("rows", int(match.group("r1")))
+            c1, r1 = column_index(match.group("c1")), int(match.group("r1"))
+            c2, r2 = (column_index(match.group("c2")), int(match.group("r2"))) if match.group("c2") else (c1, r1)
+            coords = [f"{column_letters(c)}{r}" for r in range(r1, r2 + 1) for c in range(c1, c2 + 1)]
+            return ("cells", coords, match.group("c2") is not None)
+        return None
+
+    def _resolve_name(self, text):
+        definition = self._names.get(text.upper())
+        if definition is None:
+            raise FormulaError(f"unknown name or reference {text!r}")
+        return definition
+
+    def _row_of(self, node, host):
+        if node is None:
+            return split_cell(host)[1]
+        if node[0] == "ref":
+            reference = self._reference(node[1])
+            if reference is None:
+                return self._row_of(parse(self._resolve_name(node[1])), host)
+            return reference[1] if reference[0] == "rows" else split_cell(reference[1][0])[1]
+        raise FormulaError("ROW() needs a reference")
+
+    def _codegen(self, node, host, deps):
+        kind = node[0]
+        if kind == "num":
+            return repr(node[1])
+        if kind == "str":
+            return repr(node[1])
+        if kind == "ref":
+            reference = self._reference(node[1])
+            if reference is None:
+                # Named formulas are inlined so ROW() inside them sees the host cell
+                return f"({self._codegen(parse(self._resolve_name(node[1])), host, deps)})"
+            if reference[0] == "rows":
+                raise FormulaError(f"row range {node[1]!r} is only supported inside ROW()")
+            coords = reference[1]
+            deps.update(coords)
+            cells = ", ".join(f"v[{coord!r}]" for coord in coords)
+            return f"[{cells}]" if reference[2] else cells
+        if kind == "unary":
+            operand = self._codegen(node[2], host, deps)
+            return f"(-_num({operand}))" if node[1] == "-" else f"_num({operand})"
+        if kind == "percent":
+            return f"(_num({self._codegen(node[1], host, deps)}) / 100)"
+        if kind == "binary":
+            op, left, right = node[1], self._codegen(node[2], host, deps), self._codegen(node[3], host, deps)
+            if op == "=":
+                return f"_eq({left}, {right})"
+            if op == "<>":
+                return f"(~_eq({left}, {right}))"
+            if op == "&":
+                return f"_concat({left}, {right})"
+            python_op = {"^": "**"}.get(op, op)
+            return f"(_num({left}) {python_op} _num({right}))"
+        if kind == "func":
+            name, args = node[1], node[2]
+            if name == "ROW":
+                return repr(float(self._row_of(args[0] if args else None, host)))
+            if name not in FUNCTIONS:
+                raise FormulaError(f"{self.sheet}!{host}: unsupported function {name}()")
+            return f"_{name}({', '.join(self._codegen(arg, host, deps) for arg in args)})"
+        raise FormulaError(f"unsupported node {kind}")
+
+    def _topological_order(self):
+        order, state = [], {}
+
+        def visit(coord):
+            if state.get(coord) == "done" or coord not in self.dependencies:
+                return
+            if state.get(coord) == "visiting":
+                raise FormulaError(f"circular reference through {coord}")
+            state[coord] = "visiting"
+            for dep in sorted(self.dependencies[coord]):
+                visit(dep)
+            state[coord] = "done"
+            order.append(coord)
+
+        for coord in sorted(self.dependencies):
+            visit(coord)
+        return order
+
+    # Evaluation
+
+    @property
+    def inputs(self):
+        """Constant cells the outputs depend on; any of these (or a formula cell) can be overridden"""
+        return sorted(self.constants, key=lambda coord: split_cell(coord)[::-1])
+
+    @staticmethod
+    def _input(value):
+        if isinstance(value, str):
+            return value
+        array = np.asarray(value)
+        if array.dtype.kind in "US":
+            return array
+        return array.astype(float) if array.ndim else float(array)
+
+    def evaluate(self, inputs=None):
+        """Evaluate every compiled cell with ``inputs`` (``{coord: scalar or array}``) overriding cells"""
+        inputs = {coord: self._input(value) for coord, value in (inputs or {}).items()}
+        values = {**self.constants, **inputs}
+        with np.errstate(all="ignore"):
+            for coord in self.order:
+                if coord not in inputs:
+                    values[coord] = self.functions[coord](values)
+        return Evaluation(self, values, set(inputs))
+
+    def affected(self, changed):
+        """Formula cells downstream of ``changed``, in evaluation order"""
+        seen, pending = set(), list(changed)
+        while pending:
+            for dependent in self.dependents.get(pending.pop(), ()):
+                if dependent not in seen:
+                    seen.add(dependent)
+                    pending.append(dependent)
+        return [coord for coord in self.order if coord in seen]
+
+
+
+class Evaluation:
+    """Cell values from one :meth:`WorkbookModel.evaluate`, updatable in place"""
+
+    def __init__(self, model, values, overridden):
+        self.model = model
+        self.values = values
+        self.overridden = overridden
+
+    def __getitem__(self, coord):
+        return self.values[coord]
+
+    def recompute(self, changes):
+        """Apply ``changes`` and re-run only the cells downstream of them
+
+        Returns ``{coord: value}`` for the changed and recomputed cells.
+        """
+        model = self.model
+        changes = {coord: model._input(value) for coord, value in changes.items()}
+        self.values.update(changes)
+        self.overridden |= set(changes)
+        updated = dict(changes)
+        with np.errstate(all="ignore"):
+            for coord in model.affected(changes):
+                if coord not in self.overridden:
+                    self.values[coord] = updated[coord] = model.functions[coord](self.values)
+        return updated
+
+
+@lru_cache(maxsize=None)
+def read_workbook(path, sheet):
+    """``({coord: value or "=formula"}, {NAME: definition})`` for one sheet, read once per process"""
+    import openpyxl
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")  # header/footer parsing noise
+        workbook = openpyxl.load_workbook(path)
+    worksheet = workbook[sheet]
+    cells = {cell.coordinate: cell.value for row in worksheet.iter_rows() for cell in row if cell.value is not None}
+    names = {name.upper(): workbook.defined_names[name].attr_text for name in workbook.defined_names}
+    names.update({name.upper(): worksheet.defined_names[name].attr_text for name in worksheet.defined_names})
+    return cells, names
+
+
+@lru_cache(maxsize=32)
+def load_model(kind, outputs):
+    """Compiled model of the ``"commercial"`` or ``"residential"`` workbook for a tuple of output cells"""
+    path, sheet = WORKBOOKS[kind]
+    cells, names = read_workbook(path, sheet)
+    return WorkbookModel(cells, names, sheet, outputs)
@@ -0,0 +1,145 @@
+"""Headless portfolio screening: stream a CSV/Parquet file of listings through the deal formulas.
+
+    python screen.py listings.csv scored.csv
+    python screen.py listings.parquet scored.parquet --chunk-size 200000
+    python screen.py listings.csv scored.csv --exact      # dollar outputs exact to the cent
+
+Columns use the same names as the app's query params (``purchase_price``,
+``monthly_rent``, ``comm_annual_gross_rents``, ``comm_vacancy_rate``, ...) plus
+an optional ``property_type`` column. Input is read and written one chunk at a
+time, so memory stays flat regardless of file size. A row that can't be scored
+(an unknown ``property_type``, or a state with no tax rate) is written with
+blank outputs and the reason in an ``error`` column, and the run carries on.
+Throughput and the number of such rows are reported on stderr.
+"""
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+from calculator.params import COMMERCIAL_DEFAULTS, PROPERTY_TYPES, RESIDENTIAL_DEFAULTS
+from calculator.screening import score_frame
+
+
+# Fixed dtypes keep every CSV chunk on the same schema, even when a chunk has blanks
+CSV_DTYPES = {
+    name: str if isinstance(default, str) else float
+    for name, default in {**RESIDENTIAL_DEFAULTS, **COMMERCIAL_DEFAULTS}.items()
+}
+CSV_DTYPES["property_type"] = str
+
+
+def _is_parquet(path):
+    return os.path.splitext(path)[1].lower() in (".parquet", ".pq")
+
+
+def read_chunks(path, chunk_size):
+    """Yield DataFrames of at most ``chunk_size`` rows from a CSV or Parquet file"""
+    if _is_parquet(path):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            sys.exit("Reading Parquet needs pyarrow: pip install pyarrow")
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        # Pass-through columns are read as text, so one that is blank for a whole chunk keeps its type
+        columns = pd.read_csv(path, nrows=0).columns
+        dtype = {name: CSV_DTYPES.get(name, str) for name in columns}
+        yield from pd.read_csv(path, chunksize=chunk_size, dtype=dtype)
+
+
+class ChunkWriter:
+    """Append scored chunks to a CSV or Parquet file
+
+    Uses pyarrow's streaming writers when available (an order of magnitude faster
+    than ``DataFrame.to_csv`` for float-heavy output) and falls back to pandas.
+    """
+
+    def __init__(self, path, decimals=2):
+        self.path = path
+        self.decimals = decimals
+        self.parquet = _is_parquet(path)
+        self._writer = None
+        self._schema = None
+        self._started = False
+        try:
+            import pyarrow  # noqa: F401
+            self._arrow = True
+        except ImportError:
+            self._arrow = False
+            if self.parquet:
+                sys.exit("Writing Parquet needs pyarrow: pip install pyarrow")
+
+    def write(self, df):
+        if self.decimals is not None:
+            df = df.round(self.decimals)
+        if self._arrow:
+            import pyarrow as pa
+
+            table = pa.Table.from_pandas(df, schema=self._schema, preserve_index=False)
+            if self._writer is None:
+                # A column that is empty in the first chunk has no type yet; later chunks fill it with text
+                self._schema = pa.schema([field.with_type(pa.string()) if pa.types.is_null(field.type) else field
+                                          for field in table.schema], metadata=table.schema.metadata)
+                table = table.cast(self._schema)
+                if self.parquet:
+                    import pyarrow.parquet as pq
+                    self._writer = pq.ParquetWriter(self.path, self._schema)
+                else:
+                    import pyarrow.csv as pc
+                    self._writer = pc.CSVWriter(self.path, self._schema)
+            self._writer.write_table(table)
+        else:
+            df.to_csv(self.path, mode="a" if self._started else "w", header=not self._started, index=False)
+        self._started = True
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def screen(input_path, output_path, chunk_size=100_000, property_type="Residential",
+           decimals=2, quiet=False, exact=False):
+    """Score every listing in ``input_path`` into ``output_path``; returns (rows, seconds)"""
+    writer = ChunkWriter(output_path, decimals)
+    rows = failed = 0
+    start = time.perf_counter()
+    try:
+        for chunk in read_chunks(input_path, chunk_size):
+            scored = score_frame(chunk, property_type=property_type, exact=exact, errors="coerce")
+            writer.write(scored)
+            rows += len(chunk)
+            failed += int(scored["error"].notna().sum())
+            if not quiet:
+                elapsed = time.perf_counter() - start
+                print(f"{rows:,} rows  {rows / elapsed:,.0f} rows/sec  {failed:,} errors", file=sys.stderr)
+    finally:
+        writer.close()
+    return rows, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Screen a file of listings with the residential/commercial formulas")
+    parser.add_argument("input", help="CSV or Parquet file of listings")
+    parser.add_argument("output", help="CSV or Parquet file to write (format picked by extension)")
+    parser.add_argument("--chunk-size", type=int, default=100_000, help="rows per chunk (default 100000)")
+    parser.add_argument("--property-type", choices=PROPERTY_TYPES, default="Residential",
+                        help="formulas for rows without a property_type column/value")
+    parser.add_argument("--decimals", type=int, default=2,
+                        help="round outputs to this many decimals; -1 keeps full precision (default 2)")
+    parser.add_argument("--quiet", action="store_true", help="only print the final summary")
+    parser.add_argument("--exact", action="store_true",
+                        help="compute dollar outputs in integer cents, rounded like a lender (see calculator/money.py)")
+    args = parser.parse_args(argv)
+
+    rows, seconds = screen(args.input, args.output, args.chunk_size, args.property_type,
+                           None if args.decimals < 0 else args.decimals, args.quiet, args.exact)
+    rate = rows / seconds if seconds else 0
+    print(f"Screened {rows:,} listings in {seconds:.2f}s ({rate:,.0f} rows/sec) -> {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
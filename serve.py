@@ -0,0 +1,51 @@
+"""Production entry point: prewarms the calculator while Streamlit boots.
+
+    python serve.py --server.port 8000 --server.address 0.0.0.0
+
+Any Streamlit flags are passed through; the file watcher, usage stats and
+browser launch are turned off unless explicitly set.
+"""
+import os
+import sys
+
+from calculator.startup import prewarm_in_background
+
+PRODUCTION_FLAGS = {
+    "--server.fileWatcherType": "none",
+    "--server.headless": "true",
+    "--browser.gatherUsageStats": "false",
+}
+
+
+def streamlit_args(args):
+    """Pass-through args with the production defaults added for any flag not given"""
+    given = {arg.split("=", 1)[0] for arg in args if arg.startswith("--")}
+    extra = []
+    for flag, value in PRODUCTION_FLAGS.items():
+        if flag not in given:
+            extra += [flag, value]
+    return [*args, *extra]
+
+
+def server_port(args):
+    """Port from ``--server.port N`` / ``--server.port=N``, falling back to Streamlit's default"""
+    for i, arg in enumerate(args):
+        if arg.startswith("--server.port="):
+            return int(arg.split("=", 1)[1])
+        if arg == "--server.port" and i + 1 < len(args):
+            return int(args[i + 1])
+    return int(os.environ.get("STREAMLIT_SERVER_PORT", 8501))
+
+
+def main():
+    args = sys.argv[1:]
+    prewarm_in_background(server_port(args))
+
+    from streamlit.web import cli
+    app = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+    sys.argv = ["streamlit", "run", app, *streamlit_args(args)]
+    sys.exit(cli.main())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+from calculator.addresses import ListingIndex, parse_url
+
+ZILLOW = "https://www.zillow.com/homedetails/{}/{}_zpid/"
+
+
+def test_encoded_unit_stays_with_the_street():
+    parsed = parse_url(ZILLOW.format("123-Main-St-%234-Phoenix-AZ-85001", 1))
+    assert parsed["street"] == "123 Main St #4"
+    assert parsed["city"] == "Phoenix"
+    assert parsed["address"] == "123 Main St #4, Phoenix, AZ 85001"
+    assert parsed["url"].endswith("/123-Main-St-%234-Phoenix-AZ-85001/1_zpid")
+
+
+def test_units_are_separate_listings_whatever_the_marker():
+    index = ListingIndex()
+    numbers = index.add_many([
+        ZILLOW.format("123-Main-St-%234-Phoenix-AZ-85001", 1),
+        ZILLOW.format("123-Main-St-%235-Phoenix-AZ-85001", 2),
+        ZILLOW.format("123-Main-St-Apt-4-Phoenix-AZ-85001", 3),
+        "https://www.realtor.com/realestateandhomes-detail/123-Main-St-Unit-5_Phoenix_AZ_85001_M1-2",
+    ])
+    assert numbers == [0, 1, 0, 1]
+
+
+def test_unsplittable_loopnet_slug_dedupes_on_the_street_key():
+    loopnet = parse_url("https://www.loopnet.com/Listing/500-W-Broadway-Tucson-AZ/31234567/")
+    assert loopnet["city"] is None and loopnet["address"] == "500 W Broadway Tucson, AZ"
+    assert loopnet["key"] == loopnet["street_key"] == "500 W BROADWAY TUCSON|AZ"
+
+    index = ListingIndex()
+    numbers = index.add_many([
+        "https://www.realtor.com/realestateandhomes-detail/500-W-Broadway_Tucson_AZ_85701_M9-9",
+        "https://www.loopnet.com/Listing/500-W-Broadway-Tucson-AZ/31234567/",
+        "https://www.loopnet.com/Listing/500-W-Broadway-Phoenix-AZ/31234568/",
+    ])
+    assert numbers == [0, 0, 1]
@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+import api
+
+
+def test_single_deal_sections_are_opt_in():
+    status, result = api.handle("GET", "/v1/score?purchase_price=410000&state=MI", b"")
+    assert status == 200
+    assert "metrics" in result and "targets" not in result and "projection" not in result
+
+    _, result = api.handle("GET", "/v1/score?purchase_price=410000&state=MI&include=targets,projection", b"")
+    assert result["targets"]["target_return"] == api.DEFAULT_TARGET_RETURN
+    assert result["projection"]["hold_years"] == api.DEFAULT_HOLD_YEARS
+
+    with pytest.raises(api.ApiError):
+        api.handle("GET", "/v1/score?include=irr", b"")
+
+
+def test_batch_rows_match_single_deals():
+    deals = [{"purchase_price": 410000, "state": "MI"}, {"property_type": "Commercial", "comm_state": "TX"}]
+    options = {"include": "targets,projection", "target_return": "9"}
+    batch = api.score_batch(deals, options=options)["results"]
+
+    for deal, row in zip(deals, batch):
+        single = api.score({**deal, **options})
+        for section in ("metrics", "targets", "projection"):
+            assert row[section] == pytest.approx(single[section])
+    assert batch[0]["targets"]["target_return"] == 9.0
+
+
+def test_bad_deals_fail_alone_in_a_batch():
+    deals = [{"purchase_price": 410000, "state": "MI"}, {"state": "FL"}, {"property_type": "Condo"},
+             {"purchase_price": "lots"}, "not a deal", {"property_type": "Commercial", "comm_state": "TX"}]
+    batch = api.score_batch(deals)
+
+    assert batch["count"] == 6 and batch["errors"] == 4
+    good = [row for row in batch["results"] if "error" not in row]
+    assert [row["metrics"] for row in good] == pytest.approx([api.score(deals[0])["metrics"],
+                                                             api.score(deals[5])["metrics"]])
+    errors = [row.get("error") for row in batch["results"]]
+    assert errors[1] == "No rate for state 'FL'"
+    assert "property_type" in errors[2] and "purchase_price" in errors[3] and "JSON object" in errors[4]
+
+
+@pytest.mark.parametrize("head, status", [
+    ("Content-Length: abc\r\n", 400),
+    ("Content-Length: -5\r\n", 400),
+    ("", 411),
+    ("Transfer-Encoding: chunked\r\n", 411),
+    (f"Content-Length: {api.MAX_BODY_BYTES + 1}\r\n", 413),
+])
+def test_bad_content_length_gets_a_status(head, status):
+    async def post():
+        server = await asyncio.start_server(api.serve_connection, "127.0.0.1", 0)
+        async with server:
+            reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+            writer.write(f"POST /v1/batch HTTP/1.1\r\nHost: test\r\n{head}\r\n".encode())
+            status_line = await reader.readline()
+            writer.close()
+        return int(status_line.split()[1])
+
+    assert asyncio.run(post()) == status
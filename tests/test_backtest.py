@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from calculator.backtest import backtest, build_history, deal_summary, fetch_history, monthly_rates, regimes
+
+# Two weekly readings a month in Freddie Mac's PMMS_history.csv layout, peaking in July 1981
+WEEKLY = "date,pmms30,pmms15\n" + "\n".join(
+    f"{month}/{day}/{year},{10 - abs((year - 1980) * 12 + month - 19) / 4 + offset:.2f},"
+    for year in (1980, 1981, 1982) for month in range(1, 13) for day, offset in ((3, -0.1), (17, 0.1)))
+
+
+@pytest.fixture
+def history(tmp_path):
+    source = tmp_path / "PMMS_history.csv"
+    source.write_text(WEEKLY)
+    csv_path = tmp_path / "mortgage_rates.csv"
+    fetch_history(str(source), str(csv_path))
+    return build_history(str(csv_path), str(tmp_path / "mortgage_rates.npy"))
+
+
+def test_weekly_rates_average_to_months(history):
+    assert len(history) == 36
+    assert str(history.first) == "1980-01" and str(history.last) == "1982-12"
+    assert history.index(["1981-03", "1981-03-20"]).tolist() == [14, 14]
+    assert history.rates("Residential", "1980-02") == pytest.approx(10 - 17 / 4)
+    with pytest.raises(KeyError, match="Months outside"):
+        history.index("1979-12")
+
+
+def test_missing_month_is_an_error(tmp_path):
+    source = tmp_path / "gap.csv"
+    source.write_text("month,residential_30y\n1990-01,9.1\n1990-03,9.3\n")
+    with pytest.raises(ValueError, match="1990-01"):
+        monthly_rates(str(source))
+
+
+def test_worst_month_and_regime_counts_are_in_months(history):
+    result = backtest("Residential", [{"purchase_price": 410000}, {"purchase_price": 600000}],
+                      "1981-01", "1982-06", history)
+    assert len(result["months"]) == 18
+
+    summary = deal_summary(result)
+    highest = result["months"][np.argmax(result["rates"])]
+    assert (summary["worst_month"] == highest).all()
+    assert str(highest) == "1981-07"
+    assert regimes(result)["months"].sum() == 18
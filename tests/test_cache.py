@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import pytest
+
+from calculator.cache import ResultCache, copy_value, memoize
+
+
+def test_copying_cache_hands_out_independent_tables_and_figures():
+    cache = ResultCache(copy=copy_value)
+    df = pd.DataFrame({"Year": [1, 2], "Balance": [2.0, 1.0]})
+    cache.put("k", (df, px.line(df, x="Year", y="Balance"), np.arange(3)))
+
+    table, fig, values = cache.get("k")
+    table.loc[0, "Balance"] = -1.0
+    fig.update_layout(title="changed")
+    with pytest.raises(ValueError):
+        values[0] = 5
+
+    table, fig, values = cache.get("k")
+    assert table.loc[0, "Balance"] == 2.0
+    assert fig.layout.title.text is None
+    assert values[0] == 0
+
+
+def test_memoized_result_is_a_copy_on_the_first_call_too():
+    cache = ResultCache(copy=copy_value)
+
+    @memoize(cache)
+    def table(n):
+        return pd.DataFrame({"x": range(n)})
+
+    first = table(3)
+    first["x"] = 0
+    assert table(3)["x"].tolist() == [0, 1, 2]
+    assert cache.hits == 1 and len(cache) == 1
+
+
+def test_ttl_expires_entries():
+    now = [0.0]
+    cache = ResultCache(ttl=10, clock=lambda: now[0])
+    cache.put("k", 1)
+    assert cache.get("k") == 1
+    now[0] = 11.0
+    assert cache.get("k") is None
+    assert cache.stats()["expirations"] == 1 and len(cache) == 0
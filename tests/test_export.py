@@ -0,0 +1,29 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from calculator.export import export_deals
+
+
+def deal(property_type, name):
+    return {"property_type": property_type, "name": name, "inputs": {}}
+
+
+@pytest.mark.parametrize("workers", [None, 2])
+def test_paths_come_back_in_input_order(tmp_path, workers):
+    deals = [deal("Commercial", "a"), deal("Residential", "b"), deal("Commercial", "c")]
+    if workers:
+        with ThreadPoolExecutor(workers) as pool:
+            paths = export_deals(deals, str(tmp_path), "pdf", executor=pool, chunk_size=1)
+    else:
+        paths = export_deals(deals, str(tmp_path), "pdf")
+
+    assert [os.path.basename(path)[:6] for path in paths] == ["0001-c", "0002-r", "0003-c"]
+    assert all(os.path.exists(path) for path in paths)
+
+
+def test_unknown_property_type_fails_before_writing(tmp_path):
+    with pytest.raises(ValueError, match="Condo"):
+        export_deals([deal("Residential", "a"), deal("Condo", "b")], str(tmp_path / "out"))
+    assert not (tmp_path / "out").exists()
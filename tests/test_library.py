@@ -0,0 +1,24 @@
+from calculator import rates
+from calculator.library import DealLibrary
+
+
+def test_refresh_recomputes_after_a_rate_table_edit(monkeypatch):
+    library = DealLibrary(":memory:")
+    texas, michigan = library.save([{"purchase_price": 410000, "state": "TX"},
+                                    {"purchase_price": 410000, "state": "MI"}])
+    before = {deal_id: library.get(deal_id)["outputs"] for deal_id in (texas, michigan)}
+
+    monkeypatch.setitem(rates.TAX_RATES, "TX", rates.TAX_RATES["TX"] * 2)
+    assert library.refresh() == 1
+
+    assert library.get(texas)["outputs"] != before[texas]
+    assert library.get(michigan)["outputs"] == before[michigan]
+    library.close()
+
+
+def test_rate_lookups_follow_table_edits(monkeypatch):
+    states = ["TX", "CA"]
+    old = rates.lookup_rate(rates.TAX_RATES, states)
+    monkeypatch.setitem(rates.TAX_RATES, "TX", 0.5)
+    new = rates.lookup_rate(rates.TAX_RATES, states)
+    assert new[0] == 0.5 and new[0] != old[0] and new[1] == old[1]
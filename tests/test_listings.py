@@ -0,0 +1,98 @@
+import asyncio
+import os
+import threading
+
+import pytest
+
+from calculator.listings import (HttpJsonBackend, ListingError, ListingImporter, ResponseCache, StandInServer,
+                                 normalize_url)
+
+LISTING = "https://www.zillow.com/homedetails/123-Main-St-Phoenix-AZ-85001/1_zpid/"
+
+
+@pytest.fixture
+def server():
+    server = StandInServer({LISTING: {"price": "$450,000", "monthly_rent": 2500, "state": "az"}},
+                           latency=0.05).start()
+    yield server
+    server.stop()
+
+
+def fetch_many(importer, urls):
+    try:
+        return asyncio.run(importer.fetch_many(urls))
+    finally:
+        importer.backend.close()
+
+
+def test_bad_urls_raise_listing_error():
+    for url in ("http://[::1", "ftp://example.com/x", "not a url"):
+        with pytest.raises(ListingError):
+            normalize_url(url)
+
+
+def test_duplicate_urls_share_one_fetch(server):
+    importer = ListingImporter(HttpJsonBackend(server.endpoint))
+    results = fetch_many(importer, [LISTING, LISTING + "?utm_source=x", LISTING.replace("www.", "").rstrip("/")])
+
+    assert server.requests == 1
+    assert importer.stats["fetched"] == 1
+    assert all(result == results[0] for result in results)
+    assert results[0]["price"] == 450000.0 and results[0]["state"] == "AZ"
+    assert results[0]["annual_gross_rents"] == 30000
+
+
+def test_bad_and_unknown_urls_fail_alone(server):
+    importer = ListingImporter(HttpJsonBackend(server.endpoint))
+    results = fetch_many(importer, ["http://[::1", LISTING, "https://www.loopnet.com/Listing/1/"])
+
+    assert isinstance(results[0], ListingError)
+    assert results[1]["price"] == 450000.0
+    assert isinstance(results[2], ListingError) and "No listing data" in str(results[2])
+
+
+def test_unreachable_service_becomes_listing_error():
+    dead = StandInServer({})
+    endpoint = dead.endpoint
+    dead.httpd.server_close()
+    importer = ListingImporter(HttpJsonBackend(endpoint, timeout=1.0))
+    results = fetch_many(importer, [LISTING])
+
+    assert isinstance(results[0], ListingError)
+    assert importer.stats["errors"] == 1
+
+
+def test_response_cache_keeps_the_most_recently_used(tmp_path):
+    cache = ResponseCache(str(tmp_path), maxsize=2)
+    for url in ("a", "b"):
+        cache.set(url, {"price": 1.0})
+    assert cache.get("a") == {"price": 1.0}
+    cache.set("c", {"price": 3.0})
+
+    assert cache.get("b") is None and cache.get("a") and cache.get("c")
+    assert len(os.listdir(tmp_path)) == 2 and cache.stats()["evictions"] == 1
+
+    # A new cache over the same directory picks up the files and drops expired ones
+    expired = ResponseCache(str(tmp_path), ttl=-1)
+    assert len(expired) == 2 and expired.get("a") is None
+    assert len(os.listdir(tmp_path)) == 1
+
+
+def test_cache_io_stays_off_the_event_loop(server, tmp_path):
+    threads = []
+
+    class RecordingCache(ResponseCache):
+        def get(self, url):
+            threads.append(threading.current_thread())
+            return super().get(url)
+
+        def set(self, url, listing):
+            threads.append(threading.current_thread())
+            super().set(url, listing)
+
+    cache = RecordingCache(str(tmp_path))
+    first = fetch_many(ListingImporter(HttpJsonBackend(server.endpoint), cache), [LISTING])
+    again = fetch_many(ListingImporter(HttpJsonBackend(server.endpoint), cache), [LISTING])
+
+    assert again == first and server.requests == 1
+    assert len(threads) == 3 and threading.main_thread() not in threads
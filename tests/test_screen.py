@@ -0,0 +1,40 @@
+import pandas as pd
+import pytest
+
+from screen import screen
+
+
+@pytest.mark.parametrize("output", ["scored.csv", "scored.parquet"])
+def test_pass_through_column_blank_in_the_first_chunk(tmp_path, output):
+    listings = tmp_path / "listings.csv"
+    pd.DataFrame({
+        "name": [f"deal {i}" for i in range(10)],
+        "purchase_price": 300000.0,
+        "notes": [None] * 5 + [f"note {i}" for i in range(5, 10)],
+    }).to_csv(listings, index=False)
+
+    rows, _ = screen(str(listings), str(tmp_path / output), chunk_size=3, quiet=True)
+
+    scored = pd.read_parquet(tmp_path / output) if output.endswith(".parquet") else pd.read_csv(tmp_path / output)
+    assert rows == 10
+    assert scored["notes"].isna().sum() == 5
+    assert scored["notes"].iloc[-1] == "note 9"
+
+
+def test_rows_with_unknown_states_fail_alone(tmp_path):
+    listings = tmp_path / "listings.csv"
+    pd.DataFrame({
+        "purchase_price": [300000.0, 310000.0, 320000.0, 330000.0, 2500000.0],
+        "state": ["TX", "FL", None, "MI", None],
+        "property_type": ["Residential", "Residential", "Condo", "Residential", "Commercial"],
+        "comm_state": [None, None, None, None, "XX"],
+    }).to_csv(listings, index=False)
+
+    rows, _ = screen(str(listings), str(tmp_path / "scored.csv"), chunk_size=2, quiet=True)
+
+    scored = pd.read_csv(tmp_path / "scored.csv")
+    assert rows == 5
+    assert scored["error"].tolist()[1:3] == ["No rate for state 'FL'", "Unknown property_type 'Condo'"]
+    assert scored["error"].iloc[4] == "No rate for state 'XX'"
+    assert scored["error"].isna().tolist() == [True, False, False, True, False]
+    assert scored["loan_amount"].notna().tolist() == [True, False, False, True, False]
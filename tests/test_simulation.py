@@ -0,0 +1,33 @@
+import numpy as np
+
+from calculator.simulation import DEFAULT_ASSUMPTIONS, DEFAULT_YEARS, _debt_service, simulate_residential
+
+DEAL = {"purchase_price": 650000, "down_payment": 20, "interest_rate": 6.5, "loan_years": 30,
+        "monthly_rent": 3500, "state": "AZ"}
+
+
+def test_default_reset_falls_inside_the_horizon():
+    assert 0 < DEFAULT_ASSUMPTIONS["reset_year"] < DEFAULT_YEARS
+
+
+def test_rate_shocks_change_debt_service_at_the_defaults():
+    rng = np.random.default_rng(0)
+    walk = np.cumsum(rng.normal(0.0, DEFAULT_ASSUMPTIONS["rate_shock_sd"], (1000, DEFAULT_YEARS)), axis=1)
+    payment = _debt_service(520000, 6.5, 30, walk, DEFAULT_ASSUMPTIONS["reset_year"], DEFAULT_YEARS)
+    reset = DEFAULT_ASSUMPTIONS["reset_year"]
+    assert np.all(payment[:, :reset] == payment[0, 0])
+    assert np.std(payment[:, reset:]) > 0
+
+
+def test_rate_volatility_changes_cash_flow_paths():
+    calm = simulate_residential(**DEAL, paths=2000, assumptions={"rate_shock_sd": 0.0}, seed=1)
+    shocked = simulate_residential(**DEAL, paths=2000, assumptions={"rate_shock_sd": 5.0}, seed=1)
+    reset = DEFAULT_ASSUMPTIONS["reset_year"]
+    np.testing.assert_allclose(calm["cash_flow"][:, :reset], shocked["cash_flow"][:, :reset])
+    assert not np.allclose(calm["cash_flow"][:, reset:], shocked["cash_flow"][:, reset:])
+
+
+def test_reset_at_the_end_of_the_horizon_keeps_the_quoted_payment():
+    walk = np.ones((10, 5))
+    payment = _debt_service(520000, 6.5, 30, walk, 5, 5)
+    assert np.all(payment == payment[0, 0])